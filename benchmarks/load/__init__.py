@@ -0,0 +1,5 @@
+from .scenarios import Scenario
+from .scenarios import SCENARIOS
+from .runner import run_scenario
+from .report import summarize
+from .report import compare
@@ -0,0 +1,157 @@
+import sys
+import asyncio
+import argparse
+import datetime
+from pathlib import Path
+from urllib import parse
+from typing import cast
+
+import aiohttp
+import orjson
+import uvloop
+from sqlalchemy import text
+
+from shared.logging import setup_app_logger
+from shared.config import shared_config as config
+from shared.config import web_api_config
+from shared.db.core import Session
+from shared.dist_tasks.partitions import queue_bindings
+
+from .scenarios import SCENARIOS
+from .scenarios import Scenario
+from .runner import run_scenario
+from .report import summarize
+from .report import compare
+from .report import format_summary
+
+
+logger = setup_app_logger('benchmarks.load', level='INFO')
+
+BASE_URL = f'http://{web_api_config.web_api_host}:{web_api_config.web_api_port}'
+RESULTS_DIR = Path(__file__).parents[2].joinpath('docker_data/benchmarks')
+
+
+def truncate_table_tasks():
+    # SQLite truncate: https://sqlite.org/lang_delete.html#the_truncate_optimization
+    with Session() as dbs:
+        dbs.exec(text('DELETE FROM tasks'))  # type: ignore
+        dbs.commit()
+        dbs.exec(text('VACUUM'))  # type: ignore
+
+
+async def purge_rabbitmq_queue(
+    uri: str=config.rabbitmq_uri,
+    vhost: str=config.rabbitmq_vhost,
+    queue_name: str=config.rabbitmq_queue,
+):
+    if '/' in vhost:
+        vhost = parse.quote(vhost, safe='')
+
+    p = parse.urlparse(uri.rstrip('/'))
+
+    async with aiohttp.ClientSession(
+        auth=aiohttp.BasicAuth(cast(str, p.username), cast(str, p.password)),
+    ) as session:
+        async with session.delete(
+            f'http://{p.hostname}:15672/api/queues/{vhost}/{queue_name}/contents',
+        ) as resp:
+            if not resp.ok:
+                raise Exception(f'Unable to purge RabbitMQ queue "{queue_name}": {resp!r}')
+
+    logger.info('RabbitMQ queue "%s" purged', queue_name)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.load',
+        description='Open-loop load benchmark of web_api and task_processor',
+    )
+    parser.add_argument(
+        'scenario', nargs='?',
+        help=f'Built-in scenario({", ".join(SCENARIOS)}) or a scenario JSON file',
+    )
+    parser.add_argument('--list', action='store_true', help='List the built-in scenarios')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--username', default=web_api_config.username)
+    parser.add_argument('--password', default=web_api_config.password)
+    parser.add_argument('--conn-limit', type=int, default=1000)
+    parser.add_argument('--seed', type=int, help='Overrides the seed of the scenario')
+    parser.add_argument(
+        '--out', type=Path,
+        help=f'Results JSON file(default: {RESULTS_DIR}/{{scenario}}-{{time}}.json)',
+    )
+    parser.add_argument('--baseline', type=Path, help='Results JSON file to compare with')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help='Allowed relative regression against the baseline(default: 0.1)',
+    )
+    parser.add_argument(
+        '--purge', action='store_true',
+        help='Purge the task queue and the tasks table before the run',
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+
+    if args.list:
+        for name, scenario in SCENARIOS.items():
+            print(f'{name:<12}{scenario.duration:>6.0f} s  {scenario.description}')
+
+        return 0
+
+    if not args.scenario:
+        print('A scenario is required, see --list', file=sys.stderr)
+        return 2
+
+    scenario = Scenario.load(args.scenario)
+
+    if args.seed is not None:
+        scenario = scenario.model_copy(update={'seed': args.seed})
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    if args.purge:
+        for queue_name, _ in queue_bindings(
+            config.rabbitmq_queue, config.rabbitmq_routing_key, config.rabbitmq_partitions,
+        ):
+            asyncio.run(purge_rabbitmq_queue(queue_name=queue_name))
+
+        logger.warning('Clearing the tasks table. Note: This may take a few minutes for a large table.')
+        truncate_table_tasks()
+
+    logger.info('Running "%s" for %.0f sec', scenario.name, scenario.duration)
+    results, started_at, duration = run_scenario(
+        scenario=scenario,
+        base_url=args.base_url,
+        username=args.username,
+        password=args.password,
+        conn_limit=args.conn_limit,
+    )
+    summary = summarize(scenario, results, started_at, duration)
+    print(format_summary(summary))
+
+    out = args.out or RESULTS_DIR.joinpath(
+        f'{scenario.name}-{datetime.datetime.now():%Y%m%dT%H%M%S}.json'
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(f'\nresults: {out}')
+
+    if args.baseline:
+        baseline = orjson.loads(args.baseline.read_bytes())
+        regressions = compare(summary, baseline, args.tolerance)
+
+        if regressions:
+            print(f'\nregressions(tolerance {args.tolerance:.0%}):')
+            print('\n'.join(f'  {x}' for x in regressions))
+            return 1
+
+        print(f'\nno regressions against {args.baseline}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import math
+import datetime
+from collections import Counter
+from typing import Any
+from typing import Iterable
+
+from .runner import Outcome
+from .runner import RequestResult
+from .scenarios import Scenario
+
+
+PERCENTILES = (50, 95, 99)
+SUSTAINED_SHARE = 0.99  # Share of completed requests of a sustained phase
+
+# Summary values compared with the baseline: (path, higher is better)
+COMPARED = (
+    (('latency', 'p50'), False),
+    (('latency', 'p95'), False),
+    (('latency', 'p99'), False),
+    (('submit_latency', 'p95'), False),
+    (('throughput',), True),
+    (('completed_share',), True),
+)
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Linear interpolation between the closest ranks, `values` sorted."""
+    if not values:
+        return None
+
+    rank = (len(values) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def _distribution(values: Iterable[float | None]) -> dict[str, float | None]:
+    values = sorted(x for x in values if x is not None)
+    res = {f'p{q}': percentile(values, q) for q in PERCENTILES}
+    res['mean'] = sum(values) / len(values) if values else None
+    res['max'] = values[-1] if values else None
+    return res
+
+
+def _stats(results: list[RequestResult], duration: float) -> dict[str, Any]:
+    outcomes = Counter(x.outcome for x in results)
+    completed = outcomes[Outcome.completed]
+    return {
+        'requests': len(results),
+        'outcomes': dict(outcomes),
+        'completed_share': completed / len(results) if results else None,
+        'offered_rate': len(results) / duration if duration else None,
+        # Completions per second
+        'throughput': completed / duration if duration else None,
+        'latency': _distribution(
+            x.latency for x in results if x.outcome == Outcome.completed
+        ),
+        'submit_latency': _distribution(x.submit_latency for x in results),
+        'lag': _distribution(x.lag for x in results),
+    }
+
+
+def summarize(
+    scenario: Scenario,
+    results: list[RequestResult],
+    started_at: float,
+    duration: float,
+) -> dict[str, Any]:
+    """Latencies are in seconds. The throughput of a phase is the number of
+    its requests completed per second of the phase. The sustainable rate is
+    the highest offered rate of the phases with at least `SUSTAINED_SHARE`
+    of completed requests.
+    """
+    by_type: dict[str, list[RequestResult]] = {}
+    by_phase: dict[int, list[RequestResult]] = {}
+
+    for item in results:
+        by_type.setdefault(item.type, []).append(item)
+        by_phase.setdefault(item.phase, []).append(item)
+
+    phases = []
+
+    for index, phase in enumerate(scenario.phases):
+        stats = _stats(by_phase.get(index, []), phase.duration)
+        stats.update(index=index, rate=phase.rate, rate_end=phase.rate_end)
+        stats['sustained'] = (
+            bool(stats['requests'])
+            and stats['completed_share'] >= SUSTAINED_SHARE
+        )
+        phases.append(stats)
+
+    sustained = [x['offered_rate'] for x in phases if x['sustained']]
+    return {
+        'scenario': scenario.model_dump(mode='json'),
+        'started_at': datetime.datetime.fromtimestamp(started_at, datetime.UTC).isoformat(),
+        'duration': duration,
+        'sustainable_rate': max(sustained) if sustained else None,
+        **_stats(results, duration),
+        'by_type': {k: _stats(v, duration) for k, v in sorted(by_type.items())},
+        'phases': phases,
+    }
+
+
+def _get(summary: dict[str, Any], path: tuple[str, ...]) -> float | None:
+    value: Any = summary
+
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+
+        value = value.get(key)
+
+    return value
+
+
+def compare(
+    summary: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+) -> list[str]:
+    """Returns the regressions: values worse than in the baseline by more
+    than `tolerance`(a share, e.g. 0.1), overall and by text type.
+    """
+    regressions = []
+    sections = [((), summary, baseline)]
+    sections.extend(
+        (('by_type', name), stats, baseline.get('by_type', {}).get(name, {}))
+        for name, stats in summary.get('by_type', {}).items()
+    )
+
+    for prefix, current_stats, baseline_stats in sections:
+        for path, higher_is_better in COMPARED:
+            current = _get(current_stats, path)
+            base = _get(baseline_stats, path)
+
+            if current is None or base is None:
+                continue
+
+            if higher_is_better:
+                worse = current < base * (1 - tolerance)
+            else:
+                worse = current > base * (1 + tolerance)
+
+            if worse:
+                name = '.'.join((*prefix, *path))
+                regressions.append(f'{name}: {current:.4g} (baseline {base:.4g})')
+
+    return regressions
+
+
+def _format_ms(value: float | None) -> str:
+    return '-' if value is None else f'{value * 1000:.1f}'
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    lines = [
+        f'scenario: {summary["scenario"]["name"]}',
+        f'duration: {summary["duration"]:.1f} s',
+        f'requests: {summary["requests"]}',
+        f'outcomes: {summary["outcomes"]}',
+        f'throughput: {summary["throughput"]:.2f} completed/s',
+        f'sustainable rate: {summary["sustainable_rate"]} requests/s',
+        '',
+        f'{"":<12}{"requests":>10}{"done/s":>10}'
+        f'{"p50 ms":>12}{"p95 ms":>12}{"p99 ms":>12}{"submit p95":>12}',
+    ]
+    rows = [('all', summary)]
+    rows.extend(summary['by_type'].items())
+    rows.extend((f'phase {x["index"]}', x) for x in summary['phases'])
+
+    for name, stats in rows:
+        latency = stats['latency']
+        lines.append(
+            f'{name:<12}{stats["requests"]:>10}{stats["throughput"] or 0:>10.2f}'
+            f'{_format_ms(latency["p50"]):>12}{_format_ms(latency["p95"]):>12}'
+            f'{_format_ms(latency["p99"]):>12}'
+            f'{_format_ms(stats["submit_latency"]["p95"]):>12}'
+        )
+
+    return '\n'.join(lines)
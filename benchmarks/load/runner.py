@@ -0,0 +1,228 @@
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import aiohttp
+import orjson
+
+from shared.logging import get_app_logger
+from shared.db.models.tasks import TaskStatus
+
+from ..texts import generate_text
+from .scenarios import Scenario
+
+
+PROCESS_TEXT_PATH = '/process-text'
+RESULTS_PATH = '/results/{task_id}'
+NOT_FOUND_RETRY = 0.1  # sec, the task may be published before it is saved
+
+FINAL_STATUSES = (TaskStatus.completed, TaskStatus.failed_final)
+
+
+class Outcome:
+    completed = 'completed'
+    failed_final = 'failed_final'
+    rejected = 'rejected'  # 429, 503(admission control)
+    error = 'error'  # Other HTTP or connection errors
+    timeout = 'timeout'  # Not final within `Scenario.result_timeout`
+    dropped = 'dropped'  # Not sent: `Scenario.max_in_flight` pending requests
+
+
+@dataclass(slots=True)
+class RequestResult:
+    type: str
+    size: int
+    phase: int
+    scheduled_at: float  # sec from the start of the run
+    lag: float = 0.  # sec, sent later than scheduled(client overload)
+    outcome: str = Outcome.error
+    http_status: int | None = None
+    submit_latency: float | None = None  # sec, `POST /process-text`
+    latency: float | None = None  # sec, submit-to-complete
+    finished_at: float | None = None  # sec from the start of the run
+
+
+class LoadRunner:
+    """Runs a scenario against `web_api`. The requests are sent at the
+    scheduled arrival times regardless of the responses(open loop), so a
+    slow service shows up as growing latencies rather than as a lower
+    request rate.
+    """
+    def __init__(
+        self,
+        scenario: Scenario,
+        base_url: str,
+        username: str,
+        password: str,
+        conn_limit: int=1000,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._scenario = scenario
+        self._base_url = base_url
+        self._auth = aiohttp.BasicAuth(username, password)
+        self._conn_limit = conn_limit
+        self._rng = random.Random(scenario.seed)
+        max_size = max(x.sizes.bounds()[1] for x in scenario.mix)
+        self._text = generate_text(int(min(max_size, 10_000_000)))
+        self._in_flight = 0
+
+    async def run(self) -> tuple[list[RequestResult], float]:
+        """Returns the results and the duration of the run(sec)."""
+        scenario = self._scenario
+        loop = asyncio.get_running_loop()
+        results: list[RequestResult] = []
+        pending: set[asyncio.Task] = set()
+        weights = [x.weight for x in scenario.mix]
+
+        async with aiohttp.ClientSession(
+            self._base_url,
+            connector=aiohttp.TCPConnector(limit=self._conn_limit),
+            auth=self._auth,
+            timeout=aiohttp.ClientTimeout(total=None),
+        ) as session:
+            started = loop.time()
+            offset = 0.
+
+            for index, phase in enumerate(scenario.phases):
+                arrivals = phase.arrivals(self._rng, scenario.arrivals == 'poisson')
+                self._log.info(
+                    'Phase %s: %s requests in %s sec', index, len(arrivals), phase.duration,
+                )
+
+                for at in arrivals:
+                    scheduled_at = offset + at
+                    await asyncio.sleep(max(started + scheduled_at - loop.time(), 0))
+                    traffic_class = self._rng.choices(scenario.mix, weights)[0]
+                    result = RequestResult(
+                        type=traffic_class.type.value,
+                        size=traffic_class.sizes.sample(self._rng),
+                        phase=index,
+                        scheduled_at=scheduled_at,
+                        lag=loop.time() - started - scheduled_at,
+                    )
+                    results.append(result)
+
+                    if self._in_flight >= scenario.max_in_flight:
+                        result.outcome = Outcome.dropped
+                        continue
+
+                    task = asyncio.create_task(self._request(session, result, started))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+
+                offset += phase.duration
+
+            await asyncio.sleep(max(started + offset - loop.time(), 0))
+
+            if pending:
+                self._log.info('Waiting for %s pending requests', len(pending))
+                await asyncio.gather(*pending)
+
+            duration = loop.time() - started
+
+        return results, duration
+
+    async def _request(
+        self,
+        session: aiohttp.ClientSession,
+        result: RequestResult,
+        started: float,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+
+        try:
+            sent_at = loop.time()
+            deadline = sent_at + self._scenario.result_timeout
+            task_id = await self._submit(session, result)
+
+            if task_id is None:
+                return
+
+            result.submit_latency = loop.time() - sent_at
+            result.outcome = await self._wait(session, task_id, deadline) or Outcome.timeout
+
+            if result.outcome != Outcome.timeout:
+                result.latency = loop.time() - sent_at
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            self._log.debug('Request error: %r', exc)
+            result.outcome = Outcome.error
+        finally:
+            result.finished_at = loop.time() - started
+            self._in_flight -= 1
+
+    async def _submit(
+        self,
+        session: aiohttp.ClientSession,
+        result: RequestResult,
+    ) -> str | None:
+        body = orjson.dumps({'text': self._text[:result.size], 'type': result.type})
+
+        async with session.post(
+            PROCESS_TEXT_PATH,
+            data=body,
+            headers={'content-type': 'application/json'},
+        ) as resp:
+            result.http_status = resp.status
+
+            if resp.status in (429, 503):
+                result.outcome = Outcome.rejected
+                return None
+            elif resp.status not in (200, 201):
+                self._log.warning('Submit failed: %s %s', resp.status, await resp.text())
+                result.outcome = Outcome.error
+                return None
+
+            return (await resp.json(loads=orjson.loads))['task_id']
+
+    async def _wait(
+        self,
+        session: aiohttp.ClientSession,
+        task_id: str,
+        deadline: float,
+    ) -> str | None:
+        """Returns the final status, `None` on timeout."""
+        loop = asyncio.get_running_loop()
+        path = RESULTS_PATH.format(task_id=task_id)
+
+        while (remaining := deadline - loop.time()) > 0:
+            wait = min(self._scenario.result_wait, remaining)
+
+            async with session.get(
+                path,
+                params={'wait': f'{wait:.3f}', 'fields': 'status'},
+            ) as resp:
+                if resp.status == 404:
+                    await asyncio.sleep(NOT_FOUND_RETRY)
+                    continue
+
+                resp.raise_for_status()
+                status = (await resp.json(loads=orjson.loads))['status']
+
+            if status in FINAL_STATUSES:
+                return status
+
+        return None
+
+
+def run_scenario(
+    scenario: Scenario,
+    base_url: str,
+    username: str,
+    password: str,
+    conn_limit: int=1000,
+) -> tuple[list[RequestResult], float, float]:
+    """Returns the results, the start time(unix) and the duration(sec)."""
+    started_at = time.time()
+    runner = LoadRunner(
+        scenario=scenario,
+        base_url=base_url,
+        username=username,
+        password=password,
+        conn_limit=conn_limit,
+    )
+    results, duration = asyncio.run(runner.run())
+    return results, started_at, duration
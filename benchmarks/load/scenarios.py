@@ -0,0 +1,207 @@
+import math
+import random
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import model_validator
+
+from shared.config import web_api_config
+from shared.db.models.tasks import TextTypeEnum
+
+
+# Text sizes(characters) accepted by `POST /process-text` by type
+SIZE_LIMITS = {
+    TextTypeEnum.chat_item: (1, 300),
+    TextTypeEnum.summary: (1, 3_000),
+    TextTypeEnum.article: (300_000, web_api_config.article_max_length),
+}
+
+
+class SizeDistribution(BaseModel):
+    """Text sizes(characters):
+     * `fixed` - `size`
+     * `uniform` - between `min` and `max`
+     * `lognormal` - around `median`, the spread is `sigma`, clipped to
+       `min`..`max`
+    """
+    kind: Literal['fixed', 'uniform', 'lognormal'] = 'fixed'
+    size: int | None = Field(default=None, gt=0)
+    min: int | None = Field(default=None, gt=0)
+    max: int | None = Field(default=None, gt=0)
+    median: int | None = Field(default=None, gt=0)
+    sigma: float = Field(default=1., gt=0)
+
+    @model_validator(mode='after')
+    def validate_params(self):
+        match self.kind:
+            case 'fixed' if self.size is None:
+                raise ValueError('"fixed" sizes require "size"')
+            case 'uniform' if self.min is None or self.max is None:
+                raise ValueError('"uniform" sizes require "min" and "max"')
+            case 'lognormal' if self.median is None:
+                raise ValueError('"lognormal" sizes require "median"')
+
+        if self.min and self.max and self.min > self.max:
+            raise ValueError('"min" must not exceed "max"')
+
+        return self
+
+    def bounds(self) -> tuple[int, int]:
+        if self.kind == 'fixed':
+            return self.size, self.size  # type: ignore[return-value]
+
+        return self.min or 1, self.max or math.inf  # type: ignore[return-value]
+
+    def sample(self, rng: random.Random) -> int:
+        low, high = self.bounds()
+
+        match self.kind:
+            case 'fixed':
+                return self.size  # type: ignore[return-value]
+            case 'uniform':
+                return rng.randint(low, high)
+            case _:
+                size = round(rng.lognormvariate(math.log(self.median), self.sigma))  # type: ignore[arg-type]
+                return int(min(max(size, low), high))
+
+
+class TrafficClass(BaseModel):
+    """Requests of one text type. `weight` is the relative share of the
+    requests of the class.
+    """
+    type: TextTypeEnum
+    weight: float = Field(default=1., gt=0)
+    sizes: SizeDistribution
+
+    @model_validator(mode='after')
+    def validate_sizes(self):
+        low, high = self.sizes.bounds()
+        min_size, max_size = SIZE_LIMITS[self.type]
+
+        if low < min_size or high > max_size:
+            raise ValueError(
+                f'Sizes of "{self.type}" must be between {min_size} and {max_size}'
+            )
+
+        return self
+
+
+class Phase(BaseModel):
+    """`rate` requests/s during `duration` seconds or, with `rate_end`, a
+    linear ramp from `rate` to `rate_end`. Consecutive phases of different
+    rates make a step load.
+    """
+    duration: float = Field(gt=0)
+    rate: float = Field(gt=0)
+    rate_end: float | None = Field(default=None, gt=0)
+
+    def rate_at(self, elapsed: float) -> float:
+        if self.rate_end is None:
+            return self.rate
+
+        return self.rate + (self.rate_end - self.rate) * elapsed / self.duration
+
+    def arrivals(self, rng: random.Random, poisson: bool) -> list[float]:
+        """Arrival times(seconds from the start of the phase). Open loop:
+        the arrivals do not depend on the responses.
+        """
+        res = []
+        elapsed = 0.
+
+        if not poisson:
+            while (elapsed := elapsed + 1 / self.rate_at(elapsed)) < self.duration:
+                res.append(elapsed)
+
+            return res
+
+        # Non-homogeneous Poisson process by thinning
+        max_rate = max(self.rate, self.rate_end or self.rate)
+
+        while (elapsed := elapsed + rng.expovariate(max_rate)) < self.duration:
+            if rng.random() * max_rate <= self.rate_at(elapsed):
+                res.append(elapsed)
+
+        return res
+
+
+class Scenario(BaseModel):
+    name: str
+    description: str = ''
+    mix: list[TrafficClass] = Field(min_length=1)
+    phases: list[Phase] = Field(min_length=1)
+    arrivals: Literal['poisson', 'uniform'] = 'poisson'
+    max_in_flight: int = Field(default=2_000, gt=0)  # More pending requests are dropped(client overload)
+    result_wait: float = Field(default=30., gt=0)  # `wait` of `GET /results/{task_id}`(long polling)
+    result_timeout: float = Field(default=300., gt=0)  # Submit-to-complete limit of a request
+    seed: int | None = None  # Same arrivals and sizes for the same seed
+
+    @property
+    def duration(self) -> float:
+        return sum(x.duration for x in self.phases)
+
+    @classmethod
+    def load(cls, name_or_path: str) -> 'Scenario':
+        """A built-in scenario(see `SCENARIOS`) or a JSON file."""
+        if name_or_path in SCENARIOS:
+            return SCENARIOS[name_or_path]
+
+        return cls.model_validate_json(Path(name_or_path).read_bytes())
+
+
+_MIXED = [
+    TrafficClass(
+        type=TextTypeEnum.chat_item,
+        weight=0.7,
+        sizes=SizeDistribution(kind='lognormal', median=100, sigma=0.6, min=1, max=300),
+    ),
+    TrafficClass(
+        type=TextTypeEnum.summary,
+        weight=0.28,
+        sizes=SizeDistribution(kind='uniform', min=300, max=3_000),
+    ),
+    TrafficClass(
+        type=TextTypeEnum.article,
+        weight=0.02,
+        sizes=SizeDistribution(
+            kind='uniform',
+            min=300_000,
+            max=web_api_config.article_max_length,
+        ),
+    ),
+]
+
+SCENARIOS = {
+    x.name: x for x in (
+        Scenario(
+            name='articles',
+            description='1 MB articles at a constant rate',
+            mix=[
+                TrafficClass(
+                    type=TextTypeEnum.article,
+                    sizes=SizeDistribution(size=web_api_config.article_max_length),
+                ),
+            ],
+            phases=[Phase(duration=60, rate=2)],
+        ),
+        Scenario(
+            name='mixed',
+            description='Mostly chat items, some summaries and few articles at a constant rate',
+            mix=_MIXED,
+            phases=[Phase(duration=120, rate=50)],
+        ),
+        Scenario(
+            name='ramp',
+            description='Mixed load ramping up to find the sustainable rate',
+            mix=_MIXED,
+            phases=[Phase(duration=180, rate=10, rate_end=300)],
+        ),
+        Scenario(
+            name='step',
+            description='Mixed load in steps, each step doubles the rate',
+            mix=_MIXED,
+            phases=[Phase(duration=60, rate=x) for x in (25, 50, 100, 200)],
+        ),
+    )
+}
@@ -0,0 +1,3 @@
+from .harness import Case
+from .harness import CaseResult
+from .harness import run_case
@@ -0,0 +1,153 @@
+import sys
+import platform
+import argparse
+import datetime
+import tempfile
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from shared.utils import cpu_count
+
+from .harness import CaseResult
+from .harness import run_case
+from .cases import TempDB
+from .cases import build_cases
+
+
+RESULTS_DIR = Path(__file__).parents[2].joinpath('docker_data/benchmarks')
+
+# Results compared with the baseline: seconds per call and memory
+COMPARED = ('median', 'memory_peak')
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.micro',
+        description='In-process benchmarks of text processing, serialization '
+                    'and DB operations. No services are required.',
+    )
+    parser.add_argument('-k', dest='filter', help='Only the cases containing the substring')
+    parser.add_argument('--list', action='store_true', help='List the cases')
+    parser.add_argument('--warmup', type=int, default=3, help='Calls before timing')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed repeats')
+    parser.add_argument(
+        '--min-time', type=float, default=0.05,
+        help='Min duration(sec) of a repeat, the calls per repeat are calibrated',
+    )
+    parser.add_argument(
+        '--out', type=Path,
+        help=f'Results JSON file(default: {RESULTS_DIR}/micro-{{time}}.json)',
+    )
+    parser.add_argument('--baseline', type=Path, help='Results JSON file to compare with')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help='Allowed relative regression against the baseline(default: 0.1)',
+    )
+    return parser.parse_args()
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """Returns the cases slower or using more memory than in the baseline
+    by more than `tolerance`(a share, e.g. 0.1).
+    """
+    base = {x['name']: x for x in baseline}
+    regressions = []
+
+    for result in results:
+        if (base_result := base.get(result['name'])) is None:
+            continue
+
+        for key in COMPARED:
+            if result[key] > base_result[key] * (1 + tolerance):
+                regressions.append(
+                    f'{result["name"]} {key}: {result[key]:.4g} '
+                    f'(baseline {base_result[key]:.4g})'
+                )
+
+    return regressions
+
+
+def _format_row(result: CaseResult) -> str:
+    return (
+        f'{result.name:<48}{result.median * 1e6:>14.1f}{result.stdev * 1e6:>12.1f}'
+        f'{result.ops_per_sec:>14.1f}{result.mb_per_sec:>10.1f}'
+        f'{result.memory_peak / 1024:>14.1f}'
+    )
+
+
+def main() -> int:
+    args = _parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp_dir:
+        db = TempDB(Path(tmp_dir).joinpath('db.sqlite3'))
+        cases = [
+            x for x in build_cases(db)
+            if not args.filter or args.filter in x.name
+        ]
+
+        if args.list:
+            print('\n'.join(x.name for x in cases))
+            db.close()
+            return 0
+
+        print(
+            f'{"case":<48}{"median us":>14}{"stdev us":>12}'
+            f'{"ops/s":>14}{"MB/s":>10}{"peak KiB":>14}'
+        )
+        results = []
+
+        try:
+            for case in cases:
+                result = run_case(
+                    case,
+                    warmup=args.warmup,
+                    repeat=args.repeat,
+                    min_time=args.min_time,
+                )
+                print(_format_row(result), flush=True)
+                results.append(asdict(result))
+        finally:
+            db.close()
+
+    report = {
+        'created_at': datetime.datetime.now(datetime.UTC).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': cpu_count(),
+        'settings': {
+            'warmup': args.warmup,
+            'repeat': args.repeat,
+            'min_time': args.min_time,
+        },
+        'results': results,
+    }
+    out = args.out or RESULTS_DIR.joinpath(
+        f'micro-{datetime.datetime.now():%Y%m%dT%H%M%S}.json'
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f'\nresults: {out}')
+
+    if args.baseline:
+        baseline = orjson.loads(args.baseline.read_bytes())
+        regressions = compare(results, baseline['results'], args.tolerance)
+
+        if regressions:
+            print(f'\nregressions(tolerance {args.tolerance:.0%}):')
+            print('\n'.join(f'  {x}' for x in regressions))
+            return 1
+
+        print(f'\nno regressions against {args.baseline}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
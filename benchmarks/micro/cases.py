@@ -0,0 +1,158 @@
+import uuid
+from pathlib import Path
+from typing import Any
+from typing import Callable
+
+import orjson
+from sqlmodel import SQLModel
+from sqlmodel import create_engine
+from sqlmodel import Session
+
+from shared.config import web_api_config
+from shared.utils import utcnow
+from shared.db.models import Task
+from shared.db.models.tasks import TaskDTO
+from shared.db.models.tasks import TaskStatus
+from shared.db.models.tasks import TextTypeEnum
+from text_processing.task_processor.task_processor.text_utils import count_words
+from text_processing.task_processor.task_processor.text_utils import detect_language
+from text_processing.task_processor.task_processor.text_utils import clean_text
+from text_processing.web_api.web_api.schemas.process_text import ProcessTextRequest
+
+from ..texts import generate_text
+from .harness import Case
+
+
+# Representative text sizes(characters) of the types
+SIZES = {
+    TextTypeEnum.chat_item: 120,
+    TextTypeEnum.summary: 2_000,
+    TextTypeEnum.article: web_api_config.article_max_length,
+}
+
+
+def _case(
+    name: str,
+    group: str,
+    type_: TextTypeEnum,
+    text: str,
+    setup: Callable[[], Callable[[], Any]],
+) -> Case:
+    return Case(
+        name=f'{group}.{name}[{type_}]',
+        group=group,
+        size_class=type_,
+        input_size=len(text.encode()),
+        setup=setup,
+    )
+
+
+def _text_utils_cases(type_: TextTypeEnum, text: str) -> list[Case]:
+    return [
+        _case(func.__name__, 'text_utils', type_, text, lambda func=func: lambda: func(text))
+        for func in (count_words, detect_language, clean_text)
+    ]
+
+
+def _serialization_cases(type_: TextTypeEnum, text: str) -> list[Case]:
+    message = {'original_text': text, 'type': type_}
+    body = orjson.dumps(message)
+    request_body = orjson.dumps({'text': text, 'type': type_})
+    return [
+        _case('orjson_dumps', 'serialization', type_, text, lambda: lambda: orjson.dumps(message)),
+        _case('orjson_loads', 'serialization', type_, text, lambda: lambda: orjson.loads(body)),
+        _case(
+            'task_dto_validate', 'serialization', type_, text,
+            lambda: lambda: TaskDTO.model_validate(orjson.loads(body)),
+        ),
+        _case(
+            'task_dto_trusted', 'serialization', type_, text,
+            lambda: lambda: TaskDTO.from_trusted(orjson.loads(body)),
+        ),
+        _case(
+            'request_validate_json', 'serialization', type_, text,
+            lambda: lambda: ProcessTextRequest.model_validate_json(request_body),
+        ),
+    ]
+
+
+class TempDB:
+    """SQLite DB file with the tables of the models, independent of the
+    configured DB.
+    """
+    def __init__(self, path: Path) -> None:
+        self.engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False})
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+    def close(self) -> None:
+        self.session.close()
+        self.engine.dispose()
+
+
+def _task_create_case(db: TempDB) -> Case:
+    session = db.session
+
+    def create() -> None:
+        # A new task, as saved by `web_api`
+        Task.create(session, task_id=uuid.uuid4())
+        session.commit()
+
+    return Case(
+        name='db.task_create',
+        group='db',
+        size_class='',
+        input_size=0,
+        setup=lambda: create,
+    )
+
+
+def _db_cases(type_: TextTypeEnum, text: str, db: TempDB) -> list[Case]:
+    session = db.session
+    cleaned = clean_text(text)
+
+    def upsert() -> None:
+        # The result of a task, as saved by `task_processor`
+        Task.upsert(
+            session,
+            task_id=uuid.uuid4(),
+            original_text=text,
+            processed_text=cleaned,
+            word_count=1,
+            language='en',
+            status=TaskStatus.completed,
+            type=type_,
+            updated_at=utcnow(),
+        )
+        session.commit()
+
+    def get_fields() -> Callable[[], Any]:
+        task_id = uuid.uuid4()
+        Task.upsert(
+            session,
+            task_id=task_id,
+            original_text=text,
+            processed_text=cleaned,
+            status=TaskStatus.completed,
+            type=type_,
+        )
+        session.commit()
+        fields = ['status', 'word_count', 'processed_text']
+        return lambda: Task.get_fields(session, task_id, fields)
+
+    return [
+        _case('task_upsert', 'db', type_, text, lambda: upsert),
+        _case('task_get_fields', 'db', type_, text, get_fields),
+    ]
+
+
+def build_cases(db: TempDB) -> list[Case]:
+    cases = [_task_create_case(db)]
+
+    for type_, size in SIZES.items():
+        text = generate_text(size)
+        cases.extend(_text_utils_cases(type_, text))
+        cases.extend(_serialization_cases(type_, text))
+        cases.extend(_db_cases(type_, text, db))
+
+    return cases
@@ -0,0 +1,123 @@
+import gc
+import time
+import statistics
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+
+@dataclass(slots=True)
+class Case:
+    """`setup` returns the function to measure, so the inputs(texts, DB
+    rows) are prepared outside of the measurement.
+    """
+    name: str
+    group: str
+    size_class: str
+    input_size: int  # bytes
+    setup: Callable[[], Callable[[], Any]]
+
+
+@dataclass(slots=True)
+class CaseResult:
+    name: str
+    group: str
+    size_class: str
+    input_size: int
+    number: int  # calls per repeat
+    repeat: int
+    # Seconds per call
+    min: float = 0.
+    median: float = 0.
+    mean: float = 0.
+    stdev: float = 0.
+    max: float = 0.
+    ops_per_sec: float = 0.
+    mb_per_sec: float = 0.
+    memory_peak: int = 0  # bytes allocated at peak by one call(tracemalloc)
+
+
+def _autorange(func: Callable[[], Any], min_time: float) -> int:
+    """Calls per repeat, so a repeat takes at least `min_time`."""
+    number = 1
+
+    while True:
+        started = time.perf_counter()
+
+        for _ in range(number):
+            func()
+
+        if time.perf_counter() - started >= min_time:
+            return number
+
+        number *= 2
+
+
+def _memory_peak(func: Callable[[], Any]) -> int:
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return max(peak - current, 0)
+
+
+def run_case(
+    case: Case,
+    warmup: int=3,
+    repeat: int=7,
+    min_time: float=0.05,
+) -> CaseResult:
+    """Times `repeat` repeats after `warmup` calls. The number of calls per
+    repeat is calibrated to take at least `min_time`. GC is disabled while
+    timing(as in `timeit`); the memory peak is measured in a separate call,
+    since tracing slows the calls down.
+    """
+    func = case.setup()
+
+    for _ in range(warmup):
+        func()
+
+    number = _autorange(func, min_time)
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+
+            for _ in range(number):
+                func()
+
+            times.append((time.perf_counter() - started) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    memory_peak = _memory_peak(func)
+
+    median = statistics.median(times)
+    return CaseResult(
+        name=case.name,
+        group=case.group,
+        size_class=case.size_class,
+        input_size=case.input_size,
+        number=number,
+        repeat=repeat,
+        min=min(times),
+        median=median,
+        mean=statistics.fmean(times),
+        stdev=statistics.stdev(times) if len(times) > 1 else 0.,
+        max=max(times),
+        ops_per_sec=1 / median if median else 0.,
+        mb_per_sec=case.input_size / median / 1e6 if median else 0.,
+        memory_peak=memory_peak,
+    )
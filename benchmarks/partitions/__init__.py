@@ -0,0 +1,2 @@
+from .runner import PartitionsRunner
+from .runner import run_partitions
@@ -0,0 +1,204 @@
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any
+
+import orjson
+
+from shared.logging import get_app_logger
+from shared.db.core import create_db
+from shared.db.models.tasks import TaskStatus
+from shared.db.models.tasks import TextTypeEnum
+from shared.dist_tasks.producer import Producer
+from shared.dist_tasks.events import EventPublisher
+from shared.dist_tasks.events import EventSubscriber
+from shared.dist_tasks.headers import TRUSTED_HEADER
+from shared.dist_tasks.partitions import partition_of
+from shared.dist_tasks.partitions import assign_partitions
+from shared.dist_tasks.transport.memory import reset_brokers
+from text_processing.task_processor.task_processor.consumer import Consumer
+
+from ..texts import generate_text
+from ..pipeline.runner import FINAL_STATUSES
+from ..pipeline.runner import distribution
+
+
+BROKER_URL = 'memory://partitions'
+EXCHANGE = 'partitions_exchange'
+QUEUE = 'partitions_queue'
+ROUTING_KEY = 'partitions'
+EVENTS_EXCHANGE = 'partitions_events'
+
+
+class PartitionsRunner:
+    """Runs `nodes` consumers of `task_processor`(instances with their own
+    pool of `workers_num` workers) in this process, sharing `partitions`
+    partitioned queues(or the single queue if `0`) of the broker. Measures
+    the time until the partitions are assigned, the throughput and the
+    share of the tasks of each node, then stops a node and measures the
+    time until its partitions are taken over.
+    """
+    def __init__(
+        self,
+        nodes: int,
+        partitions: int,
+        messages: int,
+        text_type: TextTypeEnum,
+        size: int,
+        workers_num: int=1,
+        broker_url: str=BROKER_URL,
+        membership_interval: float=0.5,
+        timeout: float=300.,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._nodes = nodes
+        self._partitions = partitions
+        self._messages = messages
+        self._body = orjson.dumps({'original_text': generate_text(size), 'type': text_type})
+        self._workers_num = workers_num
+        self._broker_url = broker_url
+        self._membership_interval = membership_interval
+        self._timeout = timeout
+        self._sent_at: dict[str, float] = {}
+        self._latencies: list[float] = []
+        self._outcomes: dict[str, int] = {}
+        self._finished_at = 0.
+        self._done = asyncio.Event()
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        status = event.get('status')
+
+        if status not in FINAL_STATUSES:
+            return
+
+        if (sent_at := self._sent_at.pop(event.get('task_id', ''), None)) is None:
+            return
+
+        self._finished_at = time.perf_counter()
+        self._latencies.append(self._finished_at - sent_at)
+        self._outcomes[status] = self._outcomes.get(status, 0) + 1
+
+        if sum(self._outcomes.values()) == self._messages:
+            self._done.set()
+
+    def _consumer(self, publisher: EventPublisher) -> Consumer:
+        return Consumer(
+            conn_url=self._broker_url,
+            exchange_name=EXCHANGE,
+            queue_name=QUEUE,
+            routing_key=ROUTING_KEY,
+            workers_num=self._workers_num,
+            graceful_shutdown=False,
+            events_publisher=publisher,
+            prestart_workers=True,
+            partitions=self._partitions,
+            membership_interval=self._membership_interval,
+        )
+
+    async def _wait_assigned(self, consumers: list[Consumer]) -> float:
+        """Waits until the consumers have the partitions assigned to them
+        among all of them, returns the wait time.
+        """
+        started = time.perf_counter()
+
+        if not self._partitions:
+            return 0.
+
+        while time.perf_counter() - started < self._timeout:
+            expected = assign_partitions(self._partitions, [x.member_id for x in consumers])
+
+            if all(x.assigned_partitions == expected[x.member_id] for x in consumers):
+                return time.perf_counter() - started
+
+            await asyncio.sleep(0.01)
+
+        raise TimeoutError('The partitions are not assigned')
+
+    async def run(self) -> dict[str, Any]:
+        if self._broker_url.startswith('memory:'):
+            reset_brokers()
+
+        create_db()
+        subscriber = EventSubscriber(self._broker_url, EVENTS_EXCHANGE, on_event=self._on_event)
+        publisher = EventPublisher(self._broker_url, EVENTS_EXCHANGE)
+        producer = Producer(self._broker_url, EXCHANGE, QUEUE, ROUTING_KEY, partitions=self._partitions)
+        await subscriber.startup()
+        await publisher.startup()
+        await producer.startup()
+        consumers: list[Consumer] = []
+        running: list[asyncio.Task] = []
+
+        try:
+            for _ in range(self._nodes):
+                consumer = self._consumer(publisher)
+                await consumer.startup()
+                consumers.append(consumer)
+                running.append(asyncio.create_task(consumer.run()))
+
+            assign_duration = await self._wait_assigned(consumers)
+            owners = {
+                partition: index
+                for index, consumer in enumerate(consumers)
+                for partition in consumer.assigned_partitions
+            }
+            tasks_per_node = [0] * self._nodes
+            started = time.perf_counter()
+
+            for _ in range(self._messages):
+                task_id = uuid.uuid4().hex
+                self._sent_at[task_id] = time.perf_counter()
+                await producer.send_raw(self._body, task_id, {TRUSTED_HEADER: True})
+                await asyncio.sleep(0)
+
+                if self._partitions:
+                    tasks_per_node[owners[partition_of(task_id, self._partitions)]] += 1
+
+            try:
+                await asyncio.wait_for(self._done.wait(), self._timeout)
+            except asyncio.TimeoutError:
+                self._log.warning('%s tasks are not done in %s sec', len(self._sent_at), self._timeout)
+
+            duration = (self._finished_at or time.perf_counter()) - started
+            rebalance_duration = None
+
+            if self._partitions and self._nodes > 1:
+                # A node leaves: the others take over its partitions.
+                left_at = time.perf_counter()
+                running.pop().cancel()
+                await consumers.pop().shutdown()
+                await self._wait_assigned(consumers)
+                rebalance_duration = time.perf_counter() - left_at
+        finally:
+            for task in running:
+                task.cancel()
+
+            for consumer in consumers:
+                await consumer.shutdown()
+
+            await producer.shutdown()
+            await publisher.shutdown()
+            await subscriber.shutdown()
+
+        completed = self._outcomes.get(TaskStatus.completed, 0)
+        return {
+            'nodes': self._nodes,
+            'partitions': self._partitions,
+            'workers_per_node': self._workers_num,
+            'messages': self._messages,
+            'outcomes': self._outcomes,
+            'not_done': len(self._sent_at),
+            'duration': duration,
+            'throughput': completed / duration if duration else None,
+            'latency': distribution(self._latencies),
+            # Tasks routed to the partitions of each node(not known for a single queue)
+            'tasks_per_node': tasks_per_node if self._partitions else None,
+            'assign_duration': assign_duration,
+            'rebalance_duration': rebalance_duration,
+        }
+
+
+def run_partitions(**kwargs: Any) -> dict[str, Any]:
+    """See `PartitionsRunner` for the arguments. Durations are in seconds."""
+    return asyncio.run(PartitionsRunner(**kwargs).run())
@@ -0,0 +1,2 @@
+from .runner import PipelineRunner
+from .runner import run_pipeline
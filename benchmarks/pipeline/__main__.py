@@ -0,0 +1,167 @@
+import sys
+import platform
+import argparse
+import datetime
+from pathlib import Path
+from typing import Any
+
+import orjson
+import uvloop
+
+from shared.logging import setup_app_logger
+from shared.utils import cpu_count
+from shared.db.models.tasks import TextTypeEnum
+
+from .runner import run_pipeline
+
+
+logger = setup_app_logger('benchmarks.pipeline', level='INFO')
+
+RESULTS_DIR = Path(__file__).parents[2].joinpath('docker_data/benchmarks')
+
+# Results compared with the baseline: (key, higher is better)
+COMPARED = (
+    ('throughput', True),
+    ('latency.p50', False),
+    ('latency.p95', False),
+)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.pipeline',
+        description='Throughput and latency of the producer -> task_processor '
+                    'pipeline in one process over the in-memory broker',
+    )
+    parser.add_argument('-n', '--messages', type=int, default=1000)
+    parser.add_argument(
+        '--type', type=TextTypeEnum, default=TextTypeEnum.summary,
+        choices=list(TextTypeEnum),
+    )
+    parser.add_argument('--size', type=int, default=2000, help='Text length(characters)')
+    parser.add_argument(
+        '--rate', type=float, default=0.,
+        help='Messages per second(default: 0, as fast as possible)',
+    )
+    parser.add_argument('--workers', type=int, help='Pool workers(default: CPUs - 1)')
+    parser.add_argument('--prefetch', type=int, help='Prefetch count(default: 2 * workers)')
+    parser.add_argument('--concurrent-stages-min-size', type=int)
+    parser.add_argument(
+        '--results-via-broker', action='store_true',
+        help='Results are published by the consumer and written in batches by the result ingester',
+    )
+    parser.add_argument('--timeout', type=float, default=300., help='Max wait for the tasks(sec)')
+    parser.add_argument(
+        '--out', type=Path,
+        help=f'Results JSON file(default: {RESULTS_DIR}/pipeline-{{time}}.json)',
+    )
+    parser.add_argument('--baseline', type=Path, help='Results JSON file to compare with')
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help='Allowed relative regression against the baseline(default: 0.1)',
+    )
+    args = parser.parse_args()
+
+    if args.messages < 1:
+        parser.error('--messages must be positive')
+
+    return args
+
+
+def compare(
+    summary: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+) -> list[str]:
+    """Returns the values worse than in the baseline by more than
+    `tolerance`(a share, e.g. 0.1).
+    """
+    regressions = []
+
+    for key, higher_is_better in COMPARED:
+        current, base = summary, baseline
+
+        for part in key.split('.'):
+            current, base = current.get(part), base.get(part)
+
+        if current is None or base is None:
+            continue
+
+        if higher_is_better:
+            worse = current < base * (1 - tolerance)
+        else:
+            worse = current > base * (1 + tolerance)
+
+        if worse:
+            regressions.append(f'{key}: {current:.4g} (baseline {base:.4g})')
+
+    return regressions
+
+
+def _format_ms(value: float | None) -> str:
+    return '-' if value is None else f'{value * 1000:.1f}'
+
+
+def main() -> int:
+    args = _parse_args()
+    uvloop.install()
+
+    logger.info('Processing %s "%s" messages of %s characters', args.messages, args.type, args.size)
+    summary = run_pipeline(
+        messages=args.messages,
+        text_type=args.type,
+        size=args.size,
+        rate=args.rate,
+        workers_num=args.workers,
+        prefetch_count=args.prefetch,
+        concurrent_stages_min_size=args.concurrent_stages_min_size,
+        results_via_broker=args.results_via_broker,
+        timeout=args.timeout,
+    )
+    summary.update(
+        created_at=datetime.datetime.now(datetime.UTC).isoformat(),
+        python=platform.python_version(),
+        cpu_count=cpu_count(),
+        settings={
+            'type': args.type,
+            'size': args.size,
+            'rate': args.rate,
+            'workers': args.workers,
+            'prefetch': args.prefetch,
+            'concurrent_stages_min_size': args.concurrent_stages_min_size,
+            'results_via_broker': args.results_via_broker,
+        },
+    )
+    latency = summary['latency']
+    print(
+        f'outcomes: {summary["outcomes"]}, not done: {summary["not_done"]}\n'
+        f'duration: {summary["duration"]:.2f} s\n'
+        f'throughput: {summary["throughput"] or 0:.1f} completed/s\n'
+        f'latency ms: p50 {_format_ms(latency["p50"])}, p95 {_format_ms(latency["p95"])}, '
+        f'p99 {_format_ms(latency["p99"])}, max {_format_ms(latency["max"])}\n'
+        f'publish p95 ms: {_format_ms(summary["publish_latency"]["p95"])}'
+    )
+
+    out = args.out or RESULTS_DIR.joinpath(
+        f'pipeline-{datetime.datetime.now():%Y%m%dT%H%M%S}.json'
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(f'\nresults: {out}')
+
+    if args.baseline:
+        baseline = orjson.loads(args.baseline.read_bytes())
+        regressions = compare(summary, baseline, args.tolerance)
+
+        if regressions:
+            print(f'\nregressions(tolerance {args.tolerance:.0%}):')
+            print('\n'.join(f'  {x}' for x in regressions))
+            return 1
+
+        print(f'\nno regressions against {args.baseline}')
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
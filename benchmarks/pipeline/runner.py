@@ -0,0 +1,221 @@
+import time
+import uuid
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+
+import orjson
+
+from shared.logging import get_app_logger
+from shared.db.core import create_db
+from shared.db.models.tasks import TaskStatus
+from shared.db.models.tasks import TextTypeEnum
+from shared.dist_tasks.producer import Producer
+from shared.dist_tasks.events import EventPublisher
+from shared.dist_tasks.events import EventSubscriber
+from shared.dist_tasks.results import ResultPublisher
+from shared.dist_tasks.headers import TRUSTED_HEADER
+from shared.dist_tasks.transport.memory import reset_brokers
+from text_processing.task_processor.task_processor.consumer import Consumer
+from text_processing.web_api.web_api.ingester import ResultIngester
+
+from ..texts import generate_text
+from ..load.report import percentile
+
+
+BROKER_URL = 'memory://pipeline'
+EXCHANGE = 'pipeline_exchange'
+QUEUE = 'pipeline_queue'
+ROUTING_KEY = 'pipeline'
+EVENTS_EXCHANGE = 'pipeline_events'
+RESULTS_EXCHANGE = 'pipeline_results'
+RESULTS_QUEUE = 'pipeline_results_queue'
+
+FINAL_STATUSES = (TaskStatus.completed, TaskStatus.failed_final)
+
+
+def distribution(values: list[float]) -> dict[str, float | None]:
+    values = sorted(values)
+    return {
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'mean': sum(values) / len(values) if values else None,
+        'max': values[-1] if values else None,
+    }
+
+
+@asynccontextmanager
+async def running_pipeline(
+    on_event: Callable[[dict[str, Any]], None],
+    workers_num: int | None=None,
+    prefetch_count: int | None=None,
+    concurrent_stages_min_size: int | None=None,
+    results_via_broker: bool=False,
+    **consumer_kwargs: Any,
+) -> AsyncIterator[tuple[Producer, Consumer]]:
+    """Starts the consumer of `task_processor` with its events and the
+    producer over a new in-memory broker. `on_event` gets the completion
+    events of the tasks, `consumer_kwargs` are other `Consumer` arguments.
+    With `results_via_broker`, the results are written by the result
+    ingester of `web_api`.
+    """
+    reset_brokers()
+    create_db()
+    subscriber = EventSubscriber(BROKER_URL, EVENTS_EXCHANGE, on_event=on_event)
+    publisher = EventPublisher(BROKER_URL, EVENTS_EXCHANGE)
+    results_publisher = ingester = None
+
+    if results_via_broker:
+        results_publisher = ResultPublisher(BROKER_URL, RESULTS_EXCHANGE, RESULTS_QUEUE)
+        ingester = ResultIngester(
+            BROKER_URL, RESULTS_EXCHANGE, RESULTS_QUEUE, events_publisher=publisher,
+        )
+
+    consumer = Consumer(
+        conn_url=BROKER_URL,
+        exchange_name=EXCHANGE,
+        queue_name=QUEUE,
+        routing_key=ROUTING_KEY,
+        workers_num=workers_num,
+        prefetch_count=prefetch_count,
+        graceful_shutdown=False,
+        concurrent_stages_min_size=concurrent_stages_min_size,
+        events_publisher=None if results_via_broker else publisher,
+        results_publisher=results_publisher,
+        **consumer_kwargs,
+    )
+    producer = Producer(BROKER_URL, EXCHANGE, QUEUE, ROUTING_KEY)
+
+    await subscriber.startup()
+    await publisher.startup()
+
+    if results_publisher and ingester:
+        await results_publisher.startup()
+        await ingester.startup()
+
+    await consumer.startup()
+    await producer.startup()
+    consuming = asyncio.create_task(consumer.run())
+
+    try:
+        yield producer, consumer
+    finally:
+        consuming.cancel()
+        await consumer.shutdown()
+        await producer.shutdown()
+
+        if results_publisher and ingester:
+            await results_publisher.shutdown()
+            await ingester.shutdown()
+
+        await publisher.shutdown()
+        await subscriber.shutdown()
+
+
+class PipelineRunner:
+    """Runs the producer and the consumer of `task_processor` in one process
+    over the in-memory broker, so only the processing(pool workers, DB) is
+    measured: no network, no broker and no HTTP. A task is done when its
+    final completion event is received.
+    """
+    def __init__(
+        self,
+        messages: int,
+        text_type: TextTypeEnum,
+        size: int,
+        rate: float=0.,
+        workers_num: int | None=None,
+        prefetch_count: int | None=None,
+        concurrent_stages_min_size: int | None=None,
+        results_via_broker: bool=False,
+        timeout: float=300.,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._messages = messages
+        self._body = orjson.dumps({'original_text': generate_text(size), 'type': text_type})
+        self._rate = rate
+        self._workers_num = workers_num
+        self._prefetch_count = prefetch_count
+        self._concurrent_stages_min_size = concurrent_stages_min_size
+        self._results_via_broker = results_via_broker
+        self._timeout = timeout
+        self._sent_at: dict[str, float] = {}
+        self._latencies: list[float] = []
+        self._outcomes: dict[str, int] = {}
+        self._finished_at = 0.
+        self._done = asyncio.Event()
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        status = event.get('status')
+
+        if status not in FINAL_STATUSES:
+            return  # `failed` tasks are redelivered
+
+        if (sent_at := self._sent_at.pop(event.get('task_id', ''), None)) is None:
+            return
+
+        self._finished_at = time.perf_counter()
+        self._latencies.append(self._finished_at - sent_at)
+        self._outcomes[status] = self._outcomes.get(status, 0) + 1
+
+        if sum(self._outcomes.values()) == self._messages:
+            self._done.set()
+
+    async def run(self) -> dict[str, Any]:
+        publish_durations = []
+
+        async with running_pipeline(
+            self._on_event,
+            workers_num=self._workers_num,
+            prefetch_count=self._prefetch_count,
+            concurrent_stages_min_size=self._concurrent_stages_min_size,
+            results_via_broker=self._results_via_broker,
+        ) as (producer, _):
+            started = time.perf_counter()
+
+            for index in range(self._messages):
+                if self._rate:
+                    await asyncio.sleep(
+                        max(started + index / self._rate - time.perf_counter(), 0)
+                    )
+
+                task_id = uuid.uuid4().hex
+                sent_at = self._sent_at[task_id] = time.perf_counter()
+                await producer.send_raw(self._body, task_id, {TRUSTED_HEADER: True})
+                publish_durations.append(time.perf_counter() - sent_at)
+
+                if not self._rate:
+                    await asyncio.sleep(0)  # Lets the consumer start the tasks
+
+            sent = time.perf_counter() - started
+
+            try:
+                await asyncio.wait_for(self._done.wait(), self._timeout)
+            except asyncio.TimeoutError:
+                self._log.warning('%s tasks are not done in %s sec', len(self._sent_at), self._timeout)
+
+        completed = self._outcomes.get(TaskStatus.completed, 0)
+        duration = (self._finished_at or time.perf_counter()) - started
+        return {
+            'messages': self._messages,
+            'input_size': len(self._body),
+            'outcomes': self._outcomes,
+            'not_done': len(self._sent_at),
+            'publish_duration': sent,
+            'duration': duration,
+            'offered_rate': self._messages / sent if sent else None,
+            # Completions per second
+            'throughput': completed / duration if duration else None,
+            'latency': distribution(self._latencies),
+            'publish_latency': distribution(publish_durations),
+        }
+
+
+def run_pipeline(**kwargs: Any) -> dict[str, Any]:
+    """See `PipelineRunner` for the arguments. Latencies are in seconds."""
+    return asyncio.run(PipelineRunner(**kwargs).run())
@@ -0,0 +1,6 @@
+from .sampler import ProcessSampler
+from .sampler import ProcessSample
+from .runner import SoakRunner
+from .report import GrowthLimits
+from .report import growth
+from .report import check
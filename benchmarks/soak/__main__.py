@@ -0,0 +1,165 @@
+import sys
+import asyncio
+import argparse
+import datetime
+from dataclasses import asdict
+from pathlib import Path
+
+import orjson
+import uvloop
+
+from shared.logging import setup_app_logger
+
+from ..load.scenarios import SCENARIOS
+from ..load.scenarios import Scenario
+from .runner import SoakRunner
+from .report import MB
+from .report import GrowthLimits
+from .report import growth
+from .report import check
+from .report import format_growth
+
+
+logger = setup_app_logger('benchmarks.soak', level='INFO')
+
+RESULTS_DIR = Path(__file__).parents[2].joinpath('docker_data/benchmarks')
+UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+
+def _duration(value: str) -> float:
+    """Seconds, or a number with the `s`, `m` or `h` suffix."""
+    if value[-1:] in UNITS:
+        return float(value[:-1]) * UNITS[value[-1]]
+
+    return float(value)
+
+
+def _parse_args() -> argparse.Namespace:
+    limits = GrowthLimits()
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.soak',
+        description='Sustained load of task_processor with the memory, file '
+                    'descriptor and thread growth tracking of the consumer '
+                    'and its pool workers',
+    )
+    parser.add_argument(
+        'scenario', nargs='?', default='mixed',
+        help=f'Text mix of a built-in scenario({", ".join(SCENARIOS)}) or of '
+             f'a scenario JSON file(default: mixed)',
+    )
+    parser.add_argument('--rate', type=float, default=20., help='Tasks per second(default: 20)')
+    parser.add_argument('--duration', type=_duration, default='1h', help='e.g. 3600, 90m, 8h(default: 1h)')
+    parser.add_argument('--interval', type=_duration, default='30s', help='Sampling interval(default: 30s)')
+    parser.add_argument(
+        '--warmup', type=_duration, default='10m',
+        help='Samples ignored by the growth check(default: 10m)',
+    )
+    parser.add_argument(
+        '--pid', type=int,
+        help='PID of a running task_processor: the tasks are published to the '
+             'configured broker. By default the consumer runs in this process '
+             'over the in-memory broker',
+    )
+    parser.add_argument('--workers', type=int, help='Pool workers of the in-process consumer')
+    parser.add_argument('--prefetch', type=int, help='Prefetch count of the in-process consumer')
+    parser.add_argument('--max-in-flight', type=int, default=1000, help='More pending tasks are dropped')
+    parser.add_argument('--seed', type=int, help='Overrides the seed of the scenario')
+    parser.add_argument(
+        '--out', type=Path,
+        help=f'Results file prefix(default: {RESULTS_DIR}/soak-{{time}}), the '
+             f'samples are written to `.jsonl` and the summary to `.json`',
+    )
+    parser.add_argument(
+        '--max-rss-growth', type=float, default=limits.rss / MB,
+        help=f'MB per hour of a process(default: {limits.rss / MB:g})',
+    )
+    parser.add_argument(
+        '--max-uss-growth', type=float, default=limits.uss / MB,
+        help=f'MB per hour of a process(default: {limits.uss / MB:g})',
+    )
+    parser.add_argument(
+        '--max-fds-growth', type=float, default=limits.fds,
+        help=f'Open file descriptors per hour of a process(default: {limits.fds:g})',
+    )
+    parser.add_argument(
+        '--max-threads-growth', type=float, default=limits.threads,
+        help=f'Threads per hour of a process(default: {limits.threads:g})',
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    scenario = Scenario.load(args.scenario)
+
+    if args.seed is not None:
+        scenario = scenario.model_copy(update={'seed': args.seed})
+
+    limits = GrowthLimits(
+        rss=args.max_rss_growth * MB,
+        uss=args.max_uss_growth * MB,
+        fds=args.max_fds_growth,
+        threads=args.max_threads_growth,
+    )
+    prefix = args.out or RESULTS_DIR.joinpath(f'soak-{datetime.datetime.now():%Y%m%dT%H%M%S}')
+    runner = SoakRunner(
+        scenario=scenario,
+        rate=args.rate,
+        duration=args.duration,
+        interval=args.interval,
+        out=prefix.with_suffix('.jsonl'),
+        pid=args.pid,
+        workers_num=args.workers,
+        prefetch_count=args.prefetch,
+        max_in_flight=args.max_in_flight,
+    )
+    logger.info(
+        'Soak: "%s" mix at %s tasks/s for %.0f sec, samples: %s',
+        scenario.name, args.rate, args.duration, prefix.with_suffix('.jsonl'),
+    )
+    uvloop.install()
+
+    try:
+        asyncio.run(runner.run())
+    except KeyboardInterrupt:
+        logger.warning('Interrupted, checking the samples taken so far')
+
+    result = growth(runner.process_samples, args.warmup)
+    violations = check(result, limits)
+    print(format_growth(result))
+
+    loads = runner.load_samples
+    summary = {
+        'scenario': scenario.model_dump(mode='json'),
+        'rate': args.rate,
+        'duration': args.duration,
+        'interval': args.interval,
+        'warmup': args.warmup,
+        'pid': args.pid,
+        'limits': asdict(limits),  # per hour
+        'sent': sum(x.sent for x in loads),
+        'completed': sum(x.completed for x in loads),
+        'failed_final': sum(x.failed_final for x in loads),
+        'dropped': sum(x.dropped for x in loads),
+        'growth': result,  # per hour
+        'violations': violations,
+    }
+    out = prefix.with_suffix('.json')
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(
+        f'\nsent {summary["sent"]}, completed {summary["completed"]}, '
+        f'failed {summary["failed_final"]}, dropped {summary["dropped"]}'
+        f'\nresults: {out}'
+    )
+
+    if violations:
+        print('\ngrowth limits exceeded:')
+        print('\n'.join(f'  {x}' for x in violations))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+from dataclasses import dataclass
+from dataclasses import fields
+from typing import Any
+
+from .sampler import METRICS
+from .sampler import ProcessSample
+from .sampler import slope
+
+
+HOUR = 3600
+MB = 1024 * 1024
+
+
+@dataclass(slots=True)
+class GrowthLimits:
+    """Max growth per hour of each process(the parent and every worker)."""
+    rss: float = 20 * MB  # bytes
+    uss: float = 20 * MB  # bytes
+    fds: float = 5
+    threads: float = 1
+
+
+def growth(samples: list[ProcessSample], warmup: float) -> dict[str, Any]:
+    """Returns the growth per hour(least squares slope) of the metrics of the
+    parent, of each worker(by PID) and the max of the workers. The samples
+    of the first `warmup` seconds(imports, caches, pool start) are ignored.
+    """
+    series: dict[tuple[str, int], list[ProcessSample]] = {}
+
+    for sample in samples:
+        if sample.time >= warmup:
+            series.setdefault((sample.role, sample.pid), []).append(sample)
+
+    def process_growth(items: list[ProcessSample]) -> dict[str, Any]:
+        res: dict[str, Any] = {'samples': len(items)}
+
+        for name, _ in METRICS:
+            points = [(x.time, value) for x in items if (value := getattr(x, name)) is not None]
+            value = slope(points)
+            res[name] = value * HOUR if value is not None else None
+
+        return res
+
+    parent = next(
+        (process_growth(v) for (role, _), v in series.items() if role == 'parent'),
+        None,
+    )
+    workers = {
+        str(pid): process_growth(v)
+        for (role, pid), v in series.items() if role == 'worker'
+    }
+    workers_max = {}
+
+    for name, _ in METRICS:
+        values = [x[name] for x in workers.values() if x[name] is not None]
+        workers_max[name] = max(values) if values else None
+
+    return {'parent': parent, 'workers': workers, 'workers_max': workers_max}
+
+
+def check(result: dict[str, Any], limits: GrowthLimits) -> list[str]:
+    """Returns the growths exceeding the limits."""
+    violations = []
+    processes = [('parent', result['parent'])] if result['parent'] else []
+    processes.extend((f'worker {pid}', x) for pid, x in result['workers'].items())
+
+    for name, values in processes:
+        for field in fields(limits):
+            value = values[field.name]
+            limit = getattr(limits, field.name)
+
+            if value is not None and value > limit:
+                violations.append(
+                    f'{name} {field.name}: {_format(field.name, value)}/h '
+                    f'(limit {_format(field.name, limit)}/h)'
+                )
+
+    return violations
+
+
+def _format(name: str, value: float | None) -> str:
+    if value is None:
+        return '-'
+
+    if dict(METRICS)[name] == 'bytes':
+        return f'{value / MB:.2f} MB'
+
+    return f'{value:.2f}'
+
+
+def format_growth(result: dict[str, Any]) -> str:
+    lines = [
+        f'{"growth per hour":<20}{"samples":>8}'
+        + ''.join(f'{name:>14}' for name, _ in METRICS)
+    ]
+    rows = [('parent', result['parent'])] if result['parent'] else []
+    rows.extend((f'worker {pid}', x) for pid, x in result['workers'].items())
+
+    for name, values in rows:
+        lines.append(
+            f'{name:<20}{values["samples"]:>8}'
+            + ''.join(f'{_format(x, values[x]):>14}' for x, _ in METRICS)
+        )
+
+    return '\n'.join(lines)
@@ -0,0 +1,221 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from typing import AsyncIterator
+from typing import Callable
+
+import orjson
+
+from shared.config import task_processor_config as config
+from shared.logging import get_app_logger
+from shared.db.models.tasks import TaskStatus
+from shared.dist_tasks.producer import Producer
+from shared.dist_tasks.events import EventSubscriber
+from shared.dist_tasks.headers import TRUSTED_HEADER
+
+from ..texts import generate_text
+from ..load.scenarios import Scenario
+from ..pipeline.runner import FINAL_STATUSES
+from ..pipeline.runner import running_pipeline
+from .sampler import ProcessSample
+from .sampler import ProcessSampler
+
+
+@dataclass(slots=True)
+class LoadSample:
+    """Load of the interval ending at `time`."""
+    time: float  # sec from the start of the run
+    sent: int = 0
+    completed: int = 0
+    failed_final: int = 0
+    dropped: int = 0  # Not sent: `max_in_flight` pending tasks
+    in_flight: int = 0
+    latency_mean: float | None = None  # sec, publish-to-completion
+    latency_max: float | None = None
+
+
+@asynccontextmanager
+async def _external_pipeline(
+    on_event: Callable[[dict[str, Any]], None],
+) -> AsyncIterator[tuple[Producer, None]]:
+    """Producer and events of the configured broker, for a `task_processor`
+    running separately.
+    """
+    if not config.rabbitmq_events_exchange:
+        raise RuntimeError('The events exchange is required to track the tasks.')
+
+    subscriber = EventSubscriber(
+        config.rabbitmq_uri,
+        config.rabbitmq_events_exchange,
+        on_event=on_event,
+    )
+    producer = Producer(
+        conn_url=config.rabbitmq_uri,
+        exchange_name=config.rabbitmq_exchange,
+        queue_name=config.rabbitmq_queue,
+        routing_key=config.rabbitmq_routing_key,
+        app_name='soak',
+        partitions=config.rabbitmq_partitions,
+    )
+    await subscriber.startup()
+    await producer.startup()
+
+    try:
+        yield producer, None
+    finally:
+        await producer.shutdown()
+        await subscriber.shutdown()
+
+
+class SoakRunner:
+    """Drives the mixed load of a scenario at a constant rate(Poisson
+    arrivals) for `duration` seconds and samples the consumer process and
+    its pool workers every `interval` seconds. Without `pid` the consumer
+    of `task_processor` runs in this process over the in-memory broker,
+    otherwise the tasks are published to the configured broker for the
+    `task_processor` with that PID.
+
+    The samples are appended to `out`(JSON lines) as they are taken, so
+    the series of an interrupted run are kept. Only the pending tasks are
+    tracked, the memory of the runner does not grow with the run.
+    """
+    def __init__(
+        self,
+        scenario: Scenario,
+        rate: float,
+        duration: float,
+        interval: float,
+        out: Path,
+        pid: int | None=None,
+        workers_num: int | None=None,
+        prefetch_count: int | None=None,
+        max_in_flight: int=1000,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._scenario = scenario
+        self._rate = rate
+        self._duration = duration
+        self._interval = interval
+        self._out = out
+        self._pid = pid
+        self._workers_num = workers_num
+        self._prefetch_count = prefetch_count
+        self._max_in_flight = max_in_flight
+        self._rng = random.Random(scenario.seed)
+        max_size = max(x.sizes.bounds()[1] for x in scenario.mix)
+        self._text = generate_text(int(min(max_size, 10_000_000)))
+        self._sent_at: dict[str, float] = {}
+        self._load = LoadSample(time=0.)
+        self._latency_sum = 0.
+        self.process_samples: list[ProcessSample] = []
+        self.load_samples: list[LoadSample] = []
+
+    def _on_event(self, event: dict[str, Any]) -> None:
+        if (status := event.get('status')) not in FINAL_STATUSES:
+            return  # `failed` tasks are redelivered
+
+        if (sent_at := self._sent_at.pop(event.get('task_id', ''), None)) is None:
+            return
+
+        latency = time.perf_counter() - sent_at
+        load = self._load
+        load.completed += status == TaskStatus.completed
+        load.failed_final += status == TaskStatus.failed_final
+        load.latency_max = max(load.latency_max or 0., latency)
+        self._latency_sum += latency
+
+    async def run(self) -> None:
+        if self._pid is None:
+            pipeline = running_pipeline(
+                self._on_event,
+                workers_num=self._workers_num,
+                prefetch_count=self._prefetch_count,
+            )
+        else:
+            pipeline = _external_pipeline(self._on_event)
+
+        self._out.parent.mkdir(parents=True, exist_ok=True)
+
+        async with pipeline as (producer, _):
+            sampler = ProcessSampler(self._pid or os.getpid())
+            started = time.perf_counter()
+
+            with self._out.open('ab') as file:
+                sampling = asyncio.create_task(self._sample(sampler, started, file))
+
+                try:
+                    await self._send(producer, started)
+                finally:
+                    sampling.cancel()
+
+    async def _send(self, producer: Producer, started: float) -> None:
+        scenario = self._scenario
+        weights = [x.weight for x in scenario.mix]
+        at = 0.
+
+        while (at := at + self._rng.expovariate(self._rate)) < self._duration:
+            await asyncio.sleep(max(started + at - time.perf_counter(), 0))
+
+            if len(self._sent_at) >= self._max_in_flight:
+                self._load.dropped += 1
+                continue
+
+            traffic_class = self._rng.choices(scenario.mix, weights)[0]
+            body = orjson.dumps({
+                'original_text': self._text[:traffic_class.sizes.sample(self._rng)],
+                'type': traffic_class.type,
+            })
+            task_id = uuid.uuid4().hex
+            self._sent_at[task_id] = time.perf_counter()
+
+            try:
+                await producer.send_raw(body, task_id, {TRUSTED_HEADER: True})
+            except Exception as exc:
+                self._sent_at.pop(task_id, None)
+                self._log.warning('Publish error: %r', exc)
+                continue
+
+            self._load.sent += 1
+
+        await asyncio.sleep(max(started + self._duration - time.perf_counter(), 0))
+
+    async def _sample(self, sampler: ProcessSampler, started: float, file: Any) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            elapsed = time.perf_counter() - started
+            # `memory_full_info` reads `/proc/{pid}/smaps`, slow for large processes
+            samples = await loop.run_in_executor(None, sampler.sample, elapsed)
+            load, self._load = self._load, LoadSample(time=elapsed)
+            load.time = elapsed
+            load.in_flight = len(self._sent_at)
+            done = load.completed + load.failed_final
+
+            if done:
+                load.latency_mean = self._latency_sum / done
+
+            self._latency_sum = 0.
+            self.process_samples.extend(samples)
+            self.load_samples.append(load)
+            file.write(b''.join(
+                orjson.dumps({'kind': kind, **asdict(x)}) + b'\n'
+                for kind, x in (*(('process', x) for x in samples), ('load', load))
+            ))
+            file.flush()
+
+            parent = next((x for x in samples if x.role == 'parent'), None)
+            self._log.info(
+                '%.0f s: sent %s, done %s, in flight %s, parent RSS %.1f MB, workers %s',
+                elapsed, load.sent, done, load.in_flight,
+                parent.rss / 2 ** 20 if parent else 0., len(samples) - bool(parent),
+            )
+            await asyncio.sleep(self._interval)
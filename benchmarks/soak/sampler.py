@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+
+import psutil
+
+
+# Sampled values: (name, unit)
+METRICS = (
+    ('rss', 'bytes'),
+    ('uss', 'bytes'),  # Unique memory, what the process would free on exit
+    ('fds', 'count'),
+    ('threads', 'count'),
+)
+
+
+@dataclass(slots=True)
+class ProcessSample:
+    time: float  # sec from the start of the run
+    pid: int
+    role: str  # `parent` or `worker`
+    rss: int
+    uss: int | None = None  # `None` without access to `/proc/{pid}/smaps`
+    fds: int | None = None  # `None` on Windows
+    threads: int = 0
+
+
+class ProcessSampler:
+    """Samples the memory, the open file descriptors and the threads of a
+    process(the consumer) and of its children(the pool workers). Workers
+    started after a crash are picked up by the next sample.
+    """
+    def __init__(self, pid: int) -> None:
+        self.process = psutil.Process(pid)
+
+    def sample(self, time: float) -> list[ProcessSample]:
+        samples = []
+
+        try:
+            children = self.process.children()
+        except psutil.NoSuchProcess:
+            return samples
+
+        for role, process in [('parent', self.process), *(('worker', x) for x in children)]:
+            try:
+                samples.append(self._sample(process, role, time))
+            except psutil.NoSuchProcess:
+                continue  # Exited between the listing and the sample
+
+        return samples
+
+    @staticmethod
+    def _sample(process: psutil.Process, role: str, time: float) -> ProcessSample:
+        with process.oneshot():
+            sample = ProcessSample(
+                time=time,
+                pid=process.pid,
+                role=role,
+                rss=process.memory_info().rss,
+                threads=process.num_threads(),
+            )
+
+            try:
+                sample.uss = process.memory_full_info().uss
+            except psutil.AccessDenied:
+                pass
+
+            if hasattr(process, 'num_fds'):
+                sample.fds = process.num_fds()
+
+        return sample
+
+
+def slope(points: list[tuple[float, float]]) -> float | None:
+    """Least squares slope of `(time, value)` points(value per second),
+    `None` for less than 3 points.
+    """
+    if len(points) < 3:
+        return None
+
+    mean_time = sum(x for x, _ in points) / len(points)
+    mean_value = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_time) ** 2 for x, _ in points)
+
+    if not var:
+        return None
+
+    return sum((x - mean_time) * (y - mean_value) for x, y in points) / var
@@ -0,0 +1,3 @@
+from .runner import import_time
+from .runner import ready_time
+from .runner import first_task
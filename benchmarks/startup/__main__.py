@@ -0,0 +1,102 @@
+import sys
+import platform
+import argparse
+import datetime
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from shared.logging import setup_app_logger
+from shared.utils import cpu_count
+
+from .runner import IMPORTS
+from .runner import SERVICES
+from .runner import import_time
+from .runner import ready_time
+from .runner import first_task
+
+
+logger = setup_app_logger('benchmarks.startup', level='INFO')
+
+RESULTS_DIR = Path(__file__).parents[2].joinpath('docker_data/benchmarks')
+CONTEXTS = ('fork', 'forkserver', 'spawn')
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.startup',
+        description='Startup time of the services: import time of their modules, '
+                    'time-to-ready of web_api and task_processor, time of the first '
+                    'task of fresh pool workers by start method',
+    )
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each measurement(median)')
+    parser.add_argument(
+        '--contexts', default=','.join(CONTEXTS),
+        help=f'Start methods of the pool workers(default: {",".join(CONTEXTS)})',
+    )
+    parser.add_argument('--workers', type=int, default=2, help='Pool workers of the first task runs')
+    parser.add_argument(
+        '--out', type=Path,
+        help=f'Results JSON file(default: {RESULTS_DIR}/startup-{{time}}.json)',
+    )
+    args = parser.parse_args()
+
+    if args.repeat < 1:
+        parser.error('--repeat must be positive')
+
+    return args
+
+
+def _format(value: dict[str, float]) -> str:
+    return f'{value["median"] * 1000:10.1f}{value["min"] * 1000:10.1f}{value["max"] * 1000:10.1f}'
+
+
+def main() -> int:
+    args = _parse_args()
+    contexts = [x for x in args.contexts.split(',') if x]
+    summary: dict[str, Any] = {
+        'created_at': datetime.datetime.now(datetime.UTC).isoformat(),
+        'python': platform.python_version(),
+        'cpu_count': cpu_count(),
+        'repeat': args.repeat,
+        'imports': {},
+        'ready': {},
+        'first_task': {},
+    }
+    lines = [f'{"ms":<44}{"median":>10}{"min":>10}{"max":>10}']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+
+        for module, service in IMPORTS:
+            logger.info('Import time: %s', module)
+            result = summary['imports'][module] = import_time(module, service, tmp_path, args.repeat)
+            lines.append(f'{"import " + module:<44}{_format(result)}')
+
+        for service in SERVICES:
+            logger.info('Time-to-ready: %s', service)
+            result = summary['ready'][service] = ready_time(service, tmp_path, args.repeat)
+            lines.append(f'{"ready " + service:<44}{_format(result)}')
+
+        for context in contexts:
+            for preload in (True, False):
+                name = f'{context}{"" if preload else ", no preload"}'
+                logger.info('First task: %s', name)
+                result = summary['first_task'][name] = first_task(
+                    tmp_path, args.repeat, context=context, preload=preload, workers=args.workers,
+                )
+                lines.append(f'{"consumer ready(" + name + ")":<44}{_format(result["ready"])}')
+                lines.append(f'{"first task(" + name + ")":<44}{_format(result["first_task"])}')
+
+    print('\n'.join(lines))
+    out = args.out or RESULTS_DIR.joinpath(f'startup-{datetime.datetime.now():%Y%m%dT%H%M%S}.json')
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(orjson.dumps(summary, option=orjson.OPT_INDENT_2))
+    print(f'\nresults: {out}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import time
+
+STARTED = time.perf_counter()  # Before the imports of the consumer
+
+import sys
+import uuid
+import asyncio
+import argparse
+from typing import Any
+
+import orjson
+import uvloop
+
+from shared.logging import setup_app_logger
+from shared.db.models.tasks import TextTypeEnum
+from shared.dist_tasks.headers import TRUSTED_HEADER
+
+from ..texts import generate_text
+from ..pipeline.runner import FINAL_STATUSES
+from ..pipeline.runner import running_pipeline
+
+
+PRELOAD = 'text_processing.task_processor.task_processor.preload'
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks.startup.first_task',
+        description='Time-to-ready of the consumer and time of the first task '
+                    'of its fresh workers, prints JSON(run by `benchmarks.startup`)',
+    )
+    parser.add_argument('--context', help='Start method of the workers(default: platform)')
+    parser.add_argument('--no-preload', action='store_true')
+    parser.add_argument('--no-prestart', action='store_true')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--size', type=int, default=5000, help='Article length(characters)')
+    parser.add_argument('--timeout', type=float, default=60.)
+    return parser.parse_args()
+
+
+async def measure(args: argparse.Namespace) -> dict[str, Any]:
+    task_id = uuid.uuid4().hex
+    done = asyncio.Event()
+
+    def on_event(event: dict[str, Any]) -> None:
+        if event.get('task_id') == task_id and event.get('status') in FINAL_STATUSES:
+            done.set()
+
+    pipeline = running_pipeline(
+        on_event,
+        workers_num=args.workers,
+        mp_context=args.context,
+        preload=None if args.no_preload else [PRELOAD],
+        prestart_workers=not args.no_prestart,
+    )
+
+    async with pipeline as (producer, _):
+        ready = time.perf_counter() - STARTED
+        body = orjson.dumps({'original_text': generate_text(args.size), 'type': TextTypeEnum.article})
+        started = time.perf_counter()
+        await producer.send_raw(body, task_id, {TRUSTED_HEADER: True})
+        await asyncio.wait_for(done.wait(), args.timeout)
+        first_task = time.perf_counter() - started
+
+    return {'ready': ready, 'first_task': first_task}
+
+
+def main() -> int:
+    args = _parse_args()
+    setup_app_logger('benchmarks.startup', level='WARNING')
+    uvloop.install()
+    print(orjson.dumps(asyncio.run(measure(args))).decode())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import socket
+import signal
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+
+ROOT = Path(__file__).parents[2]
+SERVICES = {
+    'web_api': ROOT.joinpath('text_processing/web_api'),
+    'task_processor': ROOT.joinpath('text_processing/task_processor'),
+}
+# Modules imported by the services: (module, service)
+IMPORTS = (
+    ('shared.config', 'task_processor'),
+    ('shared.db.core', 'task_processor'),
+    ('web_api.app', 'web_api'),
+    ('task_processor.consumer', 'task_processor'),
+    ('task_processor.preload', 'task_processor'),
+)
+READY_LOG = 'Consumer successfully started'  # `task_processor` is ready
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _env(service: str, tmp: Path, **settings: Any) -> dict[str, str]:
+    """Environment of a service process: the in-memory broker and a
+    temporary DB, so no RabbitMQ is needed.
+    """
+    env = dict(os.environ)
+    env.update(
+        PYTHONPATH=os.pathsep.join(map(str, (SERVICES[service], ROOT.joinpath('shared'), ROOT))),
+        RABBITMQ_URI='memory://startup',
+        DB_PATH=str(tmp.joinpath('db.sqlite3')),
+        LOG_LEVEL='INFO',
+        WEB_API_PORT=str(_free_port()),
+        METRICS_PORT=str(_free_port()),
+    )
+    env.update({k.upper(): str(v) for k, v in settings.items()})
+    return env
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    return {'median': statistics.median(values), 'min': min(values), 'max': max(values)}
+
+
+def import_time(module: str, service: str, tmp: Path, repeat: int) -> dict[str, float]:
+    """Import time of the module in a fresh interpreter(without the
+    interpreter startup).
+    """
+    code = f'import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)'
+    values = []
+
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=SERVICES[service],
+            env=_env(service, tmp),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        values.append(float(out.split()[-1]))
+
+    return _summary(values)
+
+
+def _web_api_ready(env: dict[str, str], timeout: float) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'main.py'],
+        cwd=SERVICES['web_api'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        # uvicorn accepts connections once the lifespan startup is complete.
+        while True:
+            try:
+                with socket.create_connection(('127.0.0.1', int(env['WEB_API_PORT'])), 0.1):
+                    return time.perf_counter() - started
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError(f'web_api exited with {process.returncode}')
+
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError('web_api is not ready')
+
+                time.sleep(0.01)
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.wait(30)
+
+
+def _task_processor_ready(env: dict[str, str], timeout: float) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, 'main.py'],
+        cwd=SERVICES['task_processor'],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    try:
+        for line in process.stderr:  # type: ignore[union-attr]
+            if READY_LOG in line:
+                return time.perf_counter() - started
+
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError('task_processor is not ready')
+
+        raise RuntimeError(f'task_processor exited with {process.wait()}')
+    finally:
+        process.send_signal(signal.SIGINT)
+        process.communicate(timeout=30)
+
+
+def ready_time(
+    service: str,
+    tmp: Path,
+    repeat: int,
+    timeout: float=60.,
+    **settings: Any,
+) -> dict[str, float]:
+    """Time from the start of the service process until it is ready: the
+    API accepts connections, the consumer has started(`settings` override
+    the config, e.g. `consumer_mp_context='forkserver'`).
+    """
+    measure = _web_api_ready if service == 'web_api' else _task_processor_ready
+    return _summary([measure(_env(service, tmp, **settings), timeout) for _ in range(repeat)])
+
+
+def first_task(
+    tmp: Path,
+    repeat: int,
+    context: str | None=None,
+    preload: bool=True,
+    prestart: bool=True,
+    workers: int=2,
+) -> dict[str, dict[str, float]]:
+    """Time-to-ready of the consumer(from the process start) and time of the
+    first task of its fresh workers, see `first_task.py`.
+    """
+    args = [sys.executable, '-m', 'benchmarks.startup.first_task', '--workers', str(workers)]
+
+    if context:
+        args.extend(['--context', context])
+
+    if not preload:
+        args.append('--no-preload')
+
+    if not prestart:
+        args.append('--no-prestart')
+
+    results = []
+
+    for _ in range(repeat):
+        out = subprocess.run(
+            args,
+            cwd=ROOT,
+            env=_env('task_processor', tmp),
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        results.append(orjson.loads(out.splitlines()[-1]))
+
+    return {
+        key: _summary([x[key] for x in results])
+        for key in ('ready', 'first_task')
+    }
@@ -0,0 +1,12 @@
+SAMPLE = (
+    "Hey!/// Just wanted to confirm if we're still meeting for lunch "
+    "tomorrow at 12 pm."
+)
+
+
+def generate_text(length: int, sample: str=SAMPLE) -> str:
+    result = (
+        (sample + ' ') * (length // (len(sample) + 1)) +
+        sample[:length % (len(sample) + 1)]
+    )
+    return result[:length]
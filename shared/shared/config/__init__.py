@@ -1,3 +1,9 @@
-from .config import shared_config
-from .config import web_api_config
-from .config import task_processor_config
+from . import config as _config
+from .config import get_shared_config
+from .config import get_web_api_config
+from .config import get_task_processor_config
+
+
+def __getattr__(name: str):
+    # `shared_config`, `web_api_config`, `task_processor_config` are created on first access.
+    return getattr(_config, name)
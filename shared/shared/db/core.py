@@ -1,35 +1,67 @@
+import os
 from contextlib import contextmanager
+from functools import cache
 from pathlib import Path
 
+from sqlalchemy import Engine
 from sqlmodel import SQLModel
 from sqlmodel import create_engine
 from sqlmodel import Session as SqlModelSession
 
-from shared.config import shared_config as config
+from shared.config import get_shared_config
+from shared.metrics import Histogram
 
 
-db_path = Path(config.db_path).expanduser()
-db_path.parent.mkdir(parents=True, exist_ok=True)
-
-connect_args = {
-    'check_same_thread': False,
-}
-engine = create_engine(
-    f'sqlite:///{db_path}',
-    connect_args=connect_args,
-    echo=config.db_engine_echo
+DB_OPERATION_DURATION = Histogram(
+    'db_operation_duration_seconds',
+    'Duration of DB operations(a session with commit)',
+    ['operation'],
 )
 
 
+@cache
+def get_engine() -> Engine:
+    """Creates the engine(and the DB directory) on first use, not on import."""
+    config = get_shared_config()
+    db_path = Path(config.db_path).expanduser()
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+
+    connect_args = {
+        'check_same_thread': False,
+    }
+    return create_engine(
+        f'sqlite:///{db_path}',
+        connect_args=connect_args,
+        echo=config.db_engine_echo
+    )
+
+
+def _reset_engine() -> None:
+    # The pooled connections inherited by a forked process must not be used
+    # by both processes.
+    if get_engine.cache_info().currsize:
+        get_engine().dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_engine)
+
+
+def __getattr__(name: str):
+    if name == 'engine':
+        return get_engine()
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 def create_db():
     # Loading all models before creating the corresponding tables in the DB
     from . import models
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(get_engine())
 
 
 @contextmanager
 def Session():
-    session = SqlModelSession(engine)
+    session = SqlModelSession(get_engine())
 
     try:
         yield session
@@ -1 +1,2 @@
 from .tasks import Task
+from .timings import TaskTiming
@@ -1,9 +1,18 @@
 import datetime
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import Self
 from uuid import uuid4
 from uuid import UUID
 from enum import StrEnum
 
 from sqlalchemy import DateTime
+from sqlalchemy import LargeBinary
+from sqlalchemy import Table
+from sqlalchemy import case
+from sqlalchemy import cast
+from sqlalchemy import func
 from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 
@@ -14,6 +23,7 @@ from sqlmodel import Field
 from sqlmodel import Enum
 from sqlmodel import Column
 from sqlmodel import Session
+from sqlmodel import delete
 from sqlmodel import insert
 from sqlmodel import select
 
@@ -22,6 +32,21 @@ from shared.utils import utcnow
 from ..exceptions import AlreadyExistsError
 
 
+def _upsert_many(table: Table, session: Session, rows: list[dict]) -> None:
+    groups: dict[tuple[str, ...], list[dict]] = {}
+
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    for columns, group in groups.items():
+        insert_stmt = sqlite_insert(table).values(group)
+        do_update_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=['task_id'],
+            set_={x: insert_stmt.excluded[x] for x in columns if x != 'task_id'},
+        )
+        session.exec(do_update_stmt)  # type: ignore
+
+
 class TaskStatus(StrEnum):
     pending = 'pending'
     completed = 'completed'
@@ -35,6 +60,9 @@ class TextTypeEnum(StrEnum):
     article = 'article'
 
 
+TEXT_FIELDS = ('original_text', 'processed_text')  # Large(up to 1 MB) columns
+
+
 class TaskDTO(BaseModel):
     original_text: str
     type: TextTypeEnum
@@ -42,7 +70,7 @@ class TaskDTO(BaseModel):
 
     @field_validator('original_text')
     def validate_non_empty(cls, value):
-        if value.strip():
+        if value and not value.isspace():  # No copy of the text, unlike `strip()`
             return value
         else:
             raise ValueError(
@@ -50,6 +78,17 @@ class TaskDTO(BaseModel):
             )
 
 
+    @classmethod
+    def from_trusted(cls, data: dict[str, Any]) -> Self:
+        """Creates the DTO without validation from the data validated by the
+        producer: `TaskDTO` fields or a `/process-text` request(`text`).
+        """
+        return cls.model_construct(
+            original_text=data['original_text'] if 'original_text' in data else data['text'],
+            type=TextTypeEnum(data['type']),
+        )
+
+
 class Task(SQLModel, table=True):
     __tablename__: str = 'tasks'  # type: ignore
 
@@ -100,6 +139,36 @@ class Task(SQLModel, table=True):
 
             raise
 
+    @classmethod
+    def create_many(cls, session: Session, rows: list[dict]) -> set[UUID]:
+        """Inserts the rows in one statement, skipping existing tasks.
+        Returns the ids of the inserted tasks.
+        """
+        if not rows:
+            return set()
+
+        # Context-sensitive column defaults do not apply to multi-row
+        # VALUES, so the timestamps are set explicitly.
+        now = utcnow()
+        rows = [{'created_at': now, 'updated_at': now, **x} for x in rows]
+        table = cls.__table__  # type: ignore
+        insert_stmt = (
+            sqlite_insert(table)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=['task_id'])
+            .returning(table.c.task_id)
+        )
+        return set(session.exec(insert_stmt).scalars())  # type: ignore
+
+    @classmethod
+    def delete_many(cls, session: Session, task_ids: list[UUID]) -> None:
+        if not task_ids:
+            return
+
+        session.exec(
+            delete(cls).where(cls.task_id.in_(task_ids))  # type: ignore
+        )
+
     @classmethod
     def upsert(cls, session: Session, **values):
         insert_stmt = sqlite_insert(cls.__table__).values(values)  # type: ignore # type: ignore
@@ -109,6 +178,140 @@ class Task(SQLModel, table=True):
         )
         session.exec(do_update_stmt)  # type: ignore
 
+    @classmethod
+    def upsert_many(cls, session: Session, rows: list[dict]) -> None:
+        """Upserts the rows(one per task) with one statement per set of
+        columns, multi-row VALUES need the same columns.
+        """
+        _upsert_many(cls.__table__, session, rows)  # type: ignore
+
     @classmethod
     def exists(cls, session: Session, task_id: UUID) -> bool:
         return bool(session.execute(select(cls.task_id).where(cls.task_id == task_id)).scalar())
+
+    @classmethod
+    def get_many(cls, session: Session, task_ids: list[UUID]) -> list['Task']:
+        if not task_ids:
+            return []
+
+        return list(session.exec(select(cls).where(cls.task_id.in_(task_ids))))  # type: ignore
+
+    @classmethod
+    def get_fields(
+        cls,
+        session: Session,
+        task_id: UUID,
+        fields: Iterable[str],
+        text_max_size: int | None=None,
+    ) -> dict[str, Any] | None:
+        """Selects only `fields` of the task. With `text_max_size`, the text
+        fields larger than it(bytes) are returned as `None` and the sizes of
+        the text fields are returned as `{field}_size`(see `iter_text`).
+        """
+        table = cls.__table__  # type: ignore
+        columns: list[Any] = []
+
+        for name in fields:
+            column = table.c[name]
+
+            if name in TEXT_FIELDS and text_max_size is not None:
+                size = func.length(cast(column, LargeBinary))
+                columns.append(case((size <= text_max_size, column)).label(name))
+                columns.append(size.label(f'{name}_size'))
+            else:
+                columns.append(column)
+
+        row = session.execute(
+            select(*columns).where(table.c.task_id == task_id)
+        ).first()
+        return row._asdict() if row else None
+
+    @classmethod
+    def iter_text(
+        cls,
+        session: Session,
+        task_id: UUID,
+        field: str,
+        start: int=0,
+        end: int | None=None,
+        chunk_size: int=256 * 1024,
+    ) -> Iterator[bytes]:
+        """Yields UTF-8 bytes `[start, end)` of a text field in chunks, so
+        the whole text is never loaded into the process memory.
+        """
+        table = cls.__table__  # type: ignore
+        column = cast(table.c[field], LargeBinary)
+
+        while end is None or start < end:
+            size = chunk_size if end is None else min(chunk_size, end - start)
+            chunk = session.execute(
+                select(func.substr(column, start + 1, size))
+                .where(table.c.task_id == task_id)
+            ).scalar()
+
+            if not chunk:
+                return
+
+            yield chunk
+            start += len(chunk)
+
+            if len(chunk) < size:
+                return
+
+    @classmethod
+    def iter_many(
+        cls,
+        session: Session,
+        task_ids: list[UUID],
+        updated_since: datetime.datetime | None=None,
+        fields: Iterable[str] | None=None,
+        chunk_size: int=100,
+    ) -> Iterator['Task | dict[str, Any]']:
+        """Yields the tasks(one `IN` query), fetching `chunk_size` rows at a
+        time. With `updated_since`, only the tasks updated after it. With
+        `fields`, only these columns are selected and dicts are yielded.
+        """
+        if not task_ids:
+            return
+
+        if fields is None:
+            statement = select(cls)
+        else:
+            table = cls.__table__  # type: ignore
+            statement = select(*(table.c[x] for x in fields))  # type: ignore
+
+        statement = statement.where(cls.task_id.in_(task_ids))  # type: ignore
+
+        if updated_since is not None:
+            if updated_since.tzinfo:
+                updated_since = updated_since.astimezone(datetime.UTC)
+
+            statement = statement.where(cls.updated_at > updated_since)  # type: ignore
+
+        rows = session.exec(statement.execution_options(yield_per=chunk_size))
+
+        if fields is None:
+            yield from rows
+        else:
+            yield from (x._asdict() for x in rows)  # type: ignore
+
+    @classmethod
+    def count(cls, session: Session) -> int:
+        return session.execute(select(func.count()).select_from(cls)).scalar_one()
+
+    @classmethod
+    def iter_ids(cls, session: Session, chunk_size: int=10_000) -> Iterator[UUID]:
+        """Yields the ids of all tasks, fetching `chunk_size` rows at a time."""
+        statement = select(cls.task_id).execution_options(yield_per=chunk_size)
+        yield from session.execute(statement).scalars()
+
+    @classmethod
+    def existing_ids(cls, session: Session, task_ids: list[UUID]) -> set[UUID]:
+        if not task_ids:
+            return set()
+
+        return set(
+            session.execute(
+                select(cls.task_id).where(cls.task_id.in_(task_ids))  # type: ignore
+            ).scalars()
+        )
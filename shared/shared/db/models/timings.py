@@ -0,0 +1,57 @@
+import datetime
+from uuid import UUID
+from typing import Any
+
+from sqlalchemy import DateTime
+from sqlalchemy import JSON
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from sqlmodel import SQLModel
+from sqlmodel import Field
+from sqlmodel import Column
+from sqlmodel import Session
+
+from .tasks import _upsert_many
+
+
+class TaskTiming(SQLModel, table=True):
+    """Timings of the last processing of the task. Durations are in seconds."""
+    __tablename__: str = 'task_timings'  # type: ignore
+
+    task_id: UUID = Field(primary_key=True, foreign_key='tasks.task_id')
+    published_at: datetime.datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime()),
+    )
+    received_at: datetime.datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime()),
+    )
+    started_at: datetime.datetime | None = Field(
+        default=None,
+        sa_column=Column(DateTime()),
+    )
+    queue_wait: float | None = None  # From publishing to receiving by the consumer
+    executor_wait: float | None = None  # From receiving to starting in a worker
+    wall: float | None = None  # Processing in workers, from start to the DB write
+    cpu: float | None = None
+    db_wall: float | None = None  # Result upsert(its share of the batch upsert if written by the ingester)
+    peak_rss_delta: int | None = None  # KiB, max growth of the worker RSS over its value at the task start(or the stage start in another worker, sampled after each stage)
+    stages: dict[str, Any] | None = Field(
+        default=None,
+        sa_column=Column(JSON()),
+    )  # {stage_name: {"wall": float, "cpu": float, "rss_delta": int}}, `rss_delta` in KiB
+
+    @classmethod
+    def upsert(cls, session: Session, **values):
+        insert_stmt = sqlite_insert(cls.__table__).values(values)  # type: ignore
+        do_update_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=['task_id'],
+            set_=values,
+        )
+        session.exec(do_update_stmt)  # type: ignore
+
+    @classmethod
+    def upsert_many(cls, session: Session, rows: list[dict]) -> None:
+        """Upserts the rows(one per task), see `Task.upsert_many`."""
+        _upsert_many(cls.__table__, session, rows)  # type: ignore
@@ -1,3 +1,4 @@
 from .consumer import Consumer
 from .consumer import ConsumerError
 from .consumer import DeterministicError
+from .consumer import MessageInfo
@@ -1,17 +1,105 @@
 import os
 import abc
+import time
 import asyncio
 import signal
 import logging
+import importlib
+import multiprocessing
+from dataclasses import dataclass
+from dataclasses import field
 from typing import cast
 from typing import Any
 from typing import Self
+from typing import Callable
+from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor
 
-import aio_pika
-
 from shared.utils import cpu_count
 from shared.logging import get_app_logger
+from shared.logging import get_logging_setup
+from shared.logging import setup_worker_logger
+from shared.metrics import Counter
+from shared.metrics import Gauge
+from shared.metrics import Histogram
+from shared.metrics import default_registry
+from shared.tracing import SpanContext
+from shared.tracing import setup_tracing
+from shared.tracing import get_tracing_setup
+from shared.tracing import get_tracer
+from shared.tracing import current_span_context
+from shared.tracing import extract
+from shared.profiling import Profiler
+from shared.profiling import ProfileRequest
+from shared.profiling import start_worker_profiler
+
+from ..headers import PUBLISHED_AT_HEADER
+from ..partitions import Membership
+from ..partitions import assign_partitions
+from ..partitions import member_id
+from ..partitions import partition_name
+from ..partitions import queue_bindings
+from ..transport import Transport
+from ..transport import ExchangeType
+from ..transport import IncomingMessage
+from ..transport import create_transport
+
+
+RECEIVED = Counter(
+    'consumer_messages_received',
+    'Messages received from the broker',
+    ['queue'],
+)
+PROCESSED = Counter(
+    'consumer_messages_processed',
+    'Processed messages by outcome(ack, reject, nack)',
+    ['queue', 'outcome'],
+)
+IN_PROGRESS = Gauge(
+    'consumer_messages_in_progress',
+    'Messages received but not yet acknowledged',
+    ['queue'],
+)
+QUEUE_DEPTH = Gauge(
+    'consumer_queue_depth',
+    'Messages ready in the queue(updated periodically)',
+    ['queue'],
+)
+EXECUTOR_BUSY = Gauge(
+    'consumer_executor_busy',
+    'Calls submitted to the process pool and not yet finished',
+    ['queue'],
+)
+EXECUTOR_SATURATION = Gauge(
+    'consumer_executor_saturation',
+    'Ratio of busy pool workers',
+    ['queue'],
+)
+QUEUE_WAIT = Histogram(
+    'consumer_queue_wait_seconds',
+    'Time from publishing to receiving the message',
+    ['queue'],
+)
+EXECUTOR_WAIT = Histogram(
+    'consumer_executor_wait_seconds',
+    'Time waiting for a free pool slot(semaphore)',
+    ['queue'],
+)
+PARTITIONS_ASSIGNED = Gauge(
+    'consumer_partitions_assigned',
+    'Partitions of the queue consumed by this instance',
+    ['queue'],
+)
+REBALANCES = Counter(
+    'consumer_rebalances',
+    'Reassignments of the partitions on members joining or leaving',
+    ['queue'],
+)
+MESSAGE_DURATION = Histogram(
+    'consumer_message_duration_seconds',
+    'Time from receiving the message to its acknowledgement',
+    ['queue'],
+)
 
 
 class ConsumerError(Exception):
@@ -26,6 +114,86 @@ class DeterministicError(ConsumerError):
     pass
 
 
+@dataclass(slots=True)
+class MessageInfo:
+    """Delivery information of the message passed to the task."""
+    task_id: str
+    received_at: float  # Unix time
+    published_at: float | None = None  # Unix time, set by the producer
+    redelivered: bool = False
+    headers: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def queue_wait(self) -> float | None:
+        if self.published_at is None:
+            return None
+
+        return max(self.received_at - self.published_at, 0.)
+
+    @classmethod
+    def from_message(cls, message: IncomingMessage) -> Self:
+        headers = dict(message.headers or {})
+        published_at = headers.get(PUBLISHED_AT_HEADER)
+
+        if not isinstance(published_at, (int, float)):
+            published_at = message.timestamp.timestamp() if message.timestamp else None
+
+        return cls(
+            task_id=cast(str, message.message_id),
+            received_at=time.time(),
+            published_at=published_at,
+            redelivered=bool(message.redelivered),
+            headers=headers,
+        )
+
+
+def _init_worker(
+    tracing_setup: dict[str, Any] | None,
+    logging_setup: dict[str, Any] | None,
+    profiling_setup: tuple[ProfileRequest, str] | None,
+    preload: list[str],
+) -> None:
+    # A forked worker inherits the metrics of the parent process.
+    default_registry.drain()
+
+    # Already imported unless the worker was spawned.
+    for name in preload:
+        importlib.import_module(name)
+
+    if logging_setup:
+        setup_worker_logger(**logging_setup)
+
+    if tracing_setup:
+        setup_tracing(**tracing_setup)
+
+    if profiling_setup:
+        start_worker_profiler(*profiling_setup)
+
+
+def _call_in_worker(
+    func: Callable[..., Any],
+    traceparent: str | None,
+    *args: Any,
+) -> tuple[Any, Any]:
+    """Calls `func` in a pool worker and returns its result along with the
+    metrics collected by the worker during the call. The metrics are attached
+    to the exception if the call fails. The trace of the caller is continued
+    in the worker.
+    """
+    try:
+        with get_tracer().start_span(
+            f'worker.{func.__name__}',
+            parent=SpanContext.from_traceparent(traceparent),
+            attributes={'pid': os.getpid()},
+        ):
+            result = func(*args)
+    except BaseException as exc:
+        exc.metrics_snapshot = default_registry.drain()  # type: ignore[attr-defined]
+        raise
+
+    return result, default_registry.drain()
+
+
 class Consumer(abc.ABC):
     def __init__(
         self,
@@ -36,6 +204,15 @@ class Consumer(abc.ABC):
         workers_num: int | None=None,
         prefetch_count: int | None=None,
         graceful_shutdown: bool=True,
+        queue_depth_interval: float | None=None,
+        profiling_dir: str | Path | None=None,
+        profiling_duration: float=30.,
+        profiling_interval: float=0.005,
+        mp_context: str | None=None,
+        preload: list[str] | None=None,
+        prestart_workers: bool=False,
+        partitions: int=0,
+        membership_interval: float=2.,
         logger: logging.Logger | None=None,
     ) -> None:
         self._log = logger or get_app_logger()
@@ -43,10 +220,7 @@ class Consumer(abc.ABC):
         self._exchange_name = exchange_name
         self._queue_name = queue_name
         self._routing_key = routing_key
-        self._connection: aio_pika.abc.AbstractConnection | None = None
-        self._channel: aio_pika.abc.AbstractChannel | None = None
-        self._exchange: aio_pika.abc.AbstractExchange | None = None
-        self._queue: aio_pika.abc.AbstractQueue | None = None
+        self._transport: Transport | None = None
         self._workers_num: int = (
             workers_num if workers_num and workers_num > 0 else
             (cpu_count() - 1) or 1
@@ -61,12 +235,52 @@ class Consumer(abc.ABC):
         self._sem: asyncio.Semaphore | None = None
         self._shutdown_event: asyncio.Event | None = None
         self._shutdown_is_pending = False
+        self._queue_depth_interval = queue_depth_interval
+        self._queue_depth_task: asyncio.Task | None = None
+        self._executor_busy = 0
+        self._profiling_dir = profiling_dir
+        self._profiling_duration = profiling_duration
+        self._profiling_interval = profiling_interval
+        self.profiler: Profiler | None = None  # Set on startup if `profiling_dir`
+        self._mp_context = multiprocessing.get_context(mp_context)
+        self._preload = list(preload or ())
+        self._prestart_workers = prestart_workers
+        # Partitioned topology: `{queue_name}.{i}` bound with `{routing_key}.{i}`,
+        # the instances consume the partitions assigned to them.
+        self._partitions = partitions
+        self._membership_interval = membership_interval
+        self._member = member_id()
+        self._membership: Membership | None = None
+        self._partition_tags: dict[int, str] = {}
+        self._rebalances = REBALANCES.labels(queue_name)
+        PARTITIONS_ASSIGNED.labels(queue_name).set_function(lambda: len(self._partition_tags))
+        self._received = RECEIVED.labels(queue_name)
+        self._in_progress = IN_PROGRESS.labels(queue_name)
+        self._queue_wait = QUEUE_WAIT.labels(queue_name)
+        self._executor_wait = EXECUTOR_WAIT.labels(queue_name)
+        self._message_duration = MESSAGE_DURATION.labels(queue_name)
+        self._outcomes = {
+            x: PROCESSED.labels(queue_name, x) for x in ('ack', 'reject', 'nack')
+        }
+        EXECUTOR_BUSY.labels(queue_name).set_function(lambda: self._executor_busy)
+        EXECUTOR_SATURATION.labels(queue_name).set_function(
+            lambda: self._executor_busy / self._workers_num
+        )
 
     @staticmethod
     @abc.abstractmethod
-    def task(task_id: Any, data: bytes) -> Any:
+    def task(task_id: Any, data: bytes, info: MessageInfo) -> Any:
         pass
 
+    @property
+    def member_id(self) -> str:
+        """Id of the instance among the consumers of the partitions."""
+        return self._member
+
+    @property
+    def assigned_partitions(self) -> list[int]:
+        return sorted(self._partition_tags)
+
     async def __aenter__(self) -> Self:
         await self.startup()
         return self
@@ -81,38 +295,59 @@ class Consumer(abc.ABC):
             raise RuntimeError('Consumer already started.')
 
         self._log.info('Connecting to message broker..')
-        self._connection = await aio_pika.connect_robust(self._conn_url)
-
-        self._log.info('Opening the channel..')
-        self._channel = cast(
-            aio_pika.abc.AbstractChannel,
-            await self._connection.channel()
-        )
-        await self._channel.set_qos(prefetch_count=self._prefetch_count)
+        self._transport = transport = create_transport(self._conn_url)
+        await transport.connect()
+        await transport.set_qos(prefetch_count=self._prefetch_count)
 
         self._log.info('Creating the exchange..')
-        self._exchange = await self._channel.declare_exchange(
+        await transport.declare_exchange(
             name=self._exchange_name,
-            type=aio_pika.abc.ExchangeType.DIRECT,
+            type=ExchangeType.direct,
             durable=True,
         )
 
         self._log.info('Creating the queue..')
-        self._queue = await self._channel.declare_queue(
-            name=self._queue_name,
-            durable=True,
-        )
-        await self._queue.bind(self._exchange_name, routing_key=self._routing_key)
+
+        for queue, routing_key in self._queues():
+            await transport.declare_queue(name=queue, durable=True)
+            await transport.bind(queue, self._exchange_name, routing_key)
+
+        profiling_setup = None
+
+        if self._profiling_dir:
+            request = ProfileRequest(self._mp_context)
+            profiling_setup = (request, str(self._profiling_dir))
+            self.profiler = Profiler(
+                self._profiling_dir,
+                request,
+                worker_pids=self._worker_pids,
+                duration=self._profiling_duration,
+                interval=self._profiling_interval,
+                logger=self._log,
+            )
 
         self._log.info('Creating the executor..')
-        self._executor = ProcessPoolExecutor(max_workers=self._workers_num)
+        self._preload_modules()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._workers_num,
+            mp_context=self._mp_context,
+            initializer=_init_worker,
+            initargs=(get_tracing_setup(), get_logging_setup(), profiling_setup, self._preload),
+        )
         self._loop = asyncio.get_running_loop()
         self._shutdown_event = asyncio.Event()
         self._sem = asyncio.Semaphore(self._workers_num + 1)  # according to the size of the ProcessPoolExecutor call queue
 
+        if self._prestart_workers:
+            await self._start_workers()
+
         if self._graceful_shutdown:
             self._set_signal_handlers()
 
+        if self.profiler:
+            # `kill -USR1 {pid}` profiles the consumer and its workers.
+            self._loop.add_signal_handler(signal.SIGUSR1, self.profiler.start)
+
         self._started =True
         self._log.info(
             '[PID: %s] Consumer successfully started with "%s" workers and prefetch_count=%s.',
@@ -129,9 +364,18 @@ class Consumer(abc.ABC):
 
         self._shutdown_is_pending = True
 
-        if self._consumer_tag and self._queue:
+        if self._queue_depth_task:
+            self._queue_depth_task.cancel()
+
+        if self._membership:
+            await self._membership.stop()
+
+        if self._transport:
             self._log.info('Stopping the reception of new messages..')
-            await self._queue.cancel(self._consumer_tag)
+
+            for consumer_tag in [self._consumer_tag, *self._partition_tags.values()]:
+                if consumer_tag:
+                    await self._transport.cancel(consumer_tag)
 
         self._log.info('Waiting for unfinished tasks..')
         await asyncio.gather(*self._pending_tasks)
@@ -140,16 +384,96 @@ class Consumer(abc.ABC):
             self._log.info('Waiting for the executor to finish..')
             self._executor.shutdown(wait=True)
 
-        if self._channel:
-            self._log.info('Channel closing..')
-            await self._channel.close()
-
-        if self._connection:
+        if self._transport:
             self._log.info('Connection closing..')
-            await self._connection.close()
+            await self._transport.close()
 
         self._log.info('Consumer successfully stopped.')
 
+    def _queues(self) -> list[tuple[str, str]]:
+        return queue_bindings(self._queue_name, self._routing_key, self._partitions)
+
+    async def _rebalance(self, members: list[str]) -> None:
+        """Consumes the partitions assigned to this instance among the live
+        `members` and stops consuming the others(the messages already
+        received are processed).
+        """
+        if self._shutdown_is_pending:
+            return
+
+        transport = cast(Transport, self._transport)
+        assigned = set(assign_partitions(self._partitions, members)[self._member])
+        current = set(self._partition_tags)
+
+        if assigned == current:
+            return
+
+        for partition in sorted(current - assigned):
+            await transport.cancel(self._partition_tags.pop(partition))
+
+        # The prefetch count is split across the partitions, so their total
+        # stays `prefetch_count`(at least 1 each). It applies only to the
+        # consumers started after `set_qos`, so the consumers of the kept
+        # partitions are restarted too(their received messages can still be
+        # acknowledged).
+        base, extra = divmod(self._prefetch_count, len(assigned) or 1)
+
+        for index, partition in enumerate(sorted(assigned)):
+            if consumer_tag := self._partition_tags.pop(partition, None):
+                await transport.cancel(consumer_tag)
+
+            await transport.set_qos(prefetch_count=max(base + (index < extra), 1))
+            self._partition_tags[partition] = await transport.consume(
+                partition_name(self._queue_name, partition),
+                self._on_message,
+            )
+
+        self._rebalances.inc()
+        self._log.info(
+            'Partitions of "%s" assigned to %s(%s members): %s',
+            self._queue_name, self._member, len(members), sorted(assigned),
+        )
+
+    def _preload_modules(self) -> None:
+        """Imports the `preload` modules once for all workers: in the fork
+        server(`forkserver`) or in this process(`fork`), so the workers
+        inherit them. Spawned workers import them in the initializer.
+        """
+        if not self._preload:
+            return
+
+        method = self._mp_context.get_start_method()
+
+        if method == 'forkserver':
+            self._mp_context.set_forkserver_preload(self._preload)  # type: ignore[attr-defined]
+        elif method == 'fork':
+            started = time.perf_counter()
+
+            for name in self._preload:
+                importlib.import_module(name)
+
+            self._log.info('Preloaded %s in %.3f sec', self._preload, time.perf_counter() - started)
+
+    async def _start_workers(self) -> None:
+        """Starts the pool workers now rather than on the first tasks(the
+        pool starts them on demand, except with `fork`).
+        """
+        loop = cast(asyncio.AbstractEventLoop, self._loop)
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, os.getpid)
+            for _ in range(self._workers_num)
+        ))
+        self._log.info(
+            'Started %s workers(%s) in %.3f sec',
+            len(self._worker_pids()), self._mp_context.get_start_method(),
+            time.perf_counter() - started,
+        )
+
+    def _worker_pids(self) -> list[int]:
+        # Not a public API: the processes of the pool by PID, started on demand.
+        return list(getattr(self._executor, '_processes', None) or ())
+
     def _set_signal_handlers(self):
         loop = cast(asyncio.AbstractEventLoop, self._loop)
         shutdown_event = cast(asyncio.Event, self._shutdown_event)
@@ -162,13 +486,80 @@ class Consumer(abc.ABC):
             raise RuntimeError('Consumer has not been started.')
 
         shutdown_event = cast(asyncio.Event, self._shutdown_event)
-        queue = cast(aio_pika.abc.AbstractQueue, self._queue)
-        self._consumer_tag = await queue.consume(self._on_message)
+        transport = cast(Transport, self._transport)
+
+        if self._partitions:
+            self._membership = Membership(
+                transport,
+                exchange_name=f'{self._exchange_name}.members',
+                member=self._member,
+                on_change=self._rebalance,
+                interval=self._membership_interval,
+                logger=self._log,
+            )
+            await self._membership.start()
+        else:
+            self._consumer_tag = await transport.consume(self._queue_name, self._on_message)
+
+        if self._queue_depth_interval:
+            self._queue_depth_task = asyncio.create_task(self._watch_queue_depth())
+
         await shutdown_event.wait()
 
-    async def _on_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+    async def _watch_queue_depth(self) -> None:
+        transport = cast(Transport, self._transport)
+        gauge = QUEUE_DEPTH.labels(self._queue_name)
+
+        while True:
+            try:
+                message_count = 0
+
+                for queue, _ in self._queues():
+                    message_count += (await transport.queue_stats(queue))[0]
+
+                gauge.set(message_count)
+            except Exception as exc:
+                self._log.warning('Unable to get the queue depth: %r', exc)
+
+            await asyncio.sleep(cast(float, self._queue_depth_interval))
+
+    async def run_in_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Runs `func` in the process pool. The number of calls submitted to the
+        pool at the same time is limited by the semaphore.
+        """
         loop = cast(asyncio.AbstractEventLoop, self._loop)
         sem = cast(asyncio.Semaphore, self._sem)
+
+        started = time.perf_counter()
+        span_context = current_span_context()
+        traceparent = span_context.to_traceparent() if span_context else None
+
+        async with sem:
+            self._executor_wait.observe(time.perf_counter() - started)
+            self._executor_busy += 1
+
+            try:
+                result, metrics = await loop.run_in_executor(
+                    self._executor, _call_in_worker, func, traceparent, *args,
+                )
+            except BaseException as exc:
+                if metrics := getattr(exc, 'metrics_snapshot', None):
+                    default_registry.merge(metrics)
+
+                raise
+            finally:
+                self._executor_busy -= 1
+
+        default_registry.merge(metrics)
+        return result
+
+    async def process(self, task_id: str, body: bytes, info: MessageInfo) -> Any:
+        """Processes the message. Can be overridden to split processing into
+        several `run_in_executor` calls.
+        """
+        return await self.run_in_executor(self.task, task_id, body, info)
+
+    async def _on_message(self, message: IncomingMessage):
         task_id = cast(str, message.message_id)
 
         if not (task_id and isinstance(task_id, str)):
@@ -177,31 +568,52 @@ class Consumer(abc.ABC):
             return
 
         self._log.debug('A new task has been received: %s', task_id)
+        info = MessageInfo.from_message(message)
+        self._received.inc()
+
+        if (queue_wait := info.queue_wait) is not None:
+            self._queue_wait.observe(queue_wait)
 
         async def handle_message():
             self._log.debug('The task %s will be sent to the executor.', task_id)
-
-            try:
-                async with sem:
-                    await loop.run_in_executor(
-                        self._executor,
-                        self.task,
+            self._in_progress.inc()
+            outcome = 'ack'
+
+            with get_tracer().start_span(
+                'amqp.consume',
+                parent=extract(info.headers),
+                kind='consumer',
+                attributes={
+                    'task_id': task_id,
+                    'queue': self._queue_name,
+                    'queue_wait': info.queue_wait,
+                    'redelivered': info.redelivered,
+                },
+            ) as span:
+                try:
+                    await self.process(task_id, message.body, info)
+                    await message.ack()
+                except DeterministicError as exc:
+                    outcome = 'reject'
+                    span.record_exception(exc)
+                    await message.reject(requeue=False)
+                    self._log.error(
+                        'Deterministic error, task will be rejected: %s %r',
                         task_id,
-                        message.body,
+                        exc,
                     )
-                await message.ack()
-            except DeterministicError as exc:
-                await message.reject(requeue=False)
-                self._log.error(
-                    'Deterministic error, task will be rejected: %s %r',
-                    task_id,
-                    exc,
-                )
-            except BaseException as exc:
-                await message.nack(requeue=True)
-                self._log.error('Failed to process task %s: %r', task_id, exc)
-            else:
-                self._log.debug('The task was successfully processed: %s', task_id)
+                except BaseException as exc:
+                    outcome = 'nack'
+                    span.record_exception(exc)
+                    await message.nack(requeue=True)
+                    self._log.error('Failed to process task %s: %r', task_id, exc)
+                else:
+                    self._log.debug('The task was successfully processed: %s', task_id)
+                finally:
+                    span.set_attribute('outcome', outcome)
+                    self._in_progress.dec()
+                    self._outcomes[outcome].inc()
+                    self._message_duration.observe(time.time() - info.received_at)
 
         task = asyncio.create_task(handle_message())
         self._pending_tasks.add(task)
@@ -0,0 +1,3 @@
+from .events import EventPublisher
+from .events import EventSubscriber
+from .events import EventError
@@ -0,0 +1,151 @@
+import logging
+from typing import Any
+from typing import cast
+from typing import Self
+from typing import Callable
+
+import orjson
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.tracing import inject
+
+from ..transport import Transport
+from ..transport import ExchangeType
+from ..transport import IncomingMessage
+from ..transport import create_transport
+
+
+EVENTS_PUBLISHED = Counter(
+    'events_published',
+    'Events published to the fanout exchange',
+    ['exchange'],
+)
+EVENTS_RECEIVED = Counter(
+    'events_received',
+    'Events received from the fanout exchange',
+    ['exchange'],
+)
+
+
+class EventError(Exception):
+    pass
+
+
+class _EventConnection:
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._conn_url = conn_url
+        self._exchange_name = exchange_name
+        self._transport: Transport | None = None
+        self._started = False
+
+    async def startup(self) -> None:
+        if self._started:
+            raise RuntimeError(f'{type(self).__name__} already started.')
+
+        self._log.info('Connecting to message broker(events)..')
+        self._transport = transport = create_transport(self._conn_url)
+        await transport.connect()
+        await transport.declare_exchange(
+            name=self._exchange_name,
+            type=ExchangeType.fanout,
+            durable=True,
+        )
+        await self._on_startup()
+        self._started = True
+
+    async def _on_startup(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._transport:
+            await self._transport.close()
+
+    async def __aenter__(self) -> Self:
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.shutdown()
+
+
+class EventPublisher(_EventConnection):
+    """Publishes events(e.g. task completion) to a fanout exchange. Events
+    are transient notifications: they are neither persisted nor confirmed,
+    subscribers must be able to recover the state from the DB.
+    """
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        app_name: str='',
+        logger: logging.Logger | None=None,
+    ) -> None:
+        super().__init__(conn_url, exchange_name, logger)
+        self._app_name = app_name
+        self._published = EVENTS_PUBLISHED.labels(exchange_name)
+
+    async def publish(self, event: dict[str, Any]) -> None:
+        if not self._started:
+            raise RuntimeError(
+                'EventPublisher has not been started. Call `startup()` before '
+                'using this method.'
+            )
+
+        transport = cast(Transport, self._transport)
+
+        try:
+            await transport.publish(
+                exchange=self._exchange_name,
+                routing_key='',
+                body=orjson.dumps(event),
+                app_id=self._app_name,
+                content_type='application/json',
+                headers=inject({}),
+            )
+        except Exception as exc:
+            raise EventError('Event publish error', exc)
+
+        self._published.inc()
+
+
+class EventSubscriber(_EventConnection):
+    """Receives the events of a fanout exchange through an exclusive queue.
+    Every subscriber(e.g. each `web_api` instance) gets all events.
+    """
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        on_event: Callable[[dict[str, Any]], None],
+        logger: logging.Logger | None=None,
+    ) -> None:
+        super().__init__(conn_url, exchange_name, logger)
+        self._on_event = on_event
+        self._received = EVENTS_RECEIVED.labels(exchange_name)
+
+    async def _on_startup(self) -> None:
+        transport = cast(Transport, self._transport)
+        queue = await transport.declare_queue(exclusive=True, auto_delete=True)
+        await transport.bind(queue, self._exchange_name)
+        await transport.consume(queue, self._on_message, no_ack=True)
+
+    async def _on_message(self, message: IncomingMessage) -> None:
+        self._received.inc()
+
+        try:
+            event = orjson.loads(message.body)
+        except orjson.JSONDecodeError as exc:
+            self._log.error('Invalid event: %r', exc)
+            return
+
+        try:
+            self._on_event(event)
+        except Exception as exc:
+            self._log.exception('Event handler error: %r', exc)
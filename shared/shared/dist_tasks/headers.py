@@ -0,0 +1,3 @@
+# Names of the message headers set by the producer.
+PUBLISHED_AT_HEADER = 'x-published-at'  # Unix time of publishing(float)
+TRUSTED_HEADER = 'x-validated'  # The body was validated by the producer(bool), the consumer may skip validation
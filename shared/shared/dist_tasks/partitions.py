@@ -0,0 +1,192 @@
+import os
+import time
+import uuid
+import zlib
+import socket
+import asyncio
+import logging
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+
+import orjson
+
+from shared.logging import get_app_logger
+
+from .transport import Transport
+from .transport import ExchangeType
+from .transport import IncomingMessage
+
+
+def partition_name(name: str, index: int) -> str:
+    """Name of the queue(or routing key) of the partition: `{name}.{index}`."""
+    return f'{name}.{index}'
+
+
+def queue_bindings(queue_name: str, routing_key: str, partitions: int=0) -> list[tuple[str, str]]:
+    """The queue with its routing key, or the partitions with theirs."""
+    if not partitions:
+        return [(queue_name, routing_key)]
+
+    return [
+        (partition_name(queue_name, x), partition_name(routing_key, x))
+        for x in range(partitions)
+    ]
+
+
+def partition_of(task_id: str, partitions: int) -> int:
+    """Partition of the task, stable across processes and restarts(unlike
+    `hash()`).
+    """
+    return zlib.crc32(task_id.encode()) % partitions
+
+
+def _score(member: str, partition: int) -> int:
+    return zlib.crc32(f'{member}/{partition}'.encode())
+
+
+def assign_partitions(partitions: int, members: Iterable[str]) -> dict[str, list[int]]:
+    """Assigns the partitions to the members: each partition goes to the
+    member with the highest rendezvous score that has less than its fair
+    share(`ceil(partitions / members)`). When a member joins or leaves,
+    mostly the partitions of that member move. Every member computes the
+    same assignment from the same member set.
+    """
+    members = sorted(set(members))
+    result: dict[str, list[int]] = {x: [] for x in members}
+
+    if not members:
+        return result
+
+    share = -(-partitions // len(members))
+
+    for partition in range(partitions):
+        ranked = sorted(members, key=lambda x: _score(x, partition), reverse=True)
+        owner = next(x for x in ranked if len(result[x]) < share)
+        result[owner].append(partition)
+
+    return result
+
+
+def member_id() -> str:
+    """Unique id of a consumer instance: `{host}:{pid}:{random}`."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+class Membership:
+    """Tracks the live members of a group(the consumers of the partitioned
+    queues) with heartbeats over a fanout exchange. Every member publishes
+    its id every `interval` seconds and receives the heartbeats of the others
+    through an exclusive queue. A member is gone after `3 * interval` seconds
+    without a heartbeat or as soon as it announces leaving. `on_change` gets
+    the member ids(including this one) whenever the set changes.
+    """
+    def __init__(
+        self,
+        transport: Transport,
+        exchange_name: str,
+        member: str,
+        on_change: Callable[[list[str]], Awaitable[None]],
+        interval: float=2.,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._transport = transport
+        self._exchange_name = exchange_name
+        self._member = member
+        self._on_change = on_change
+        self._interval = interval
+        self._members: dict[str, float] = {}  # Id -> `time.monotonic()` of the last heartbeat
+        self._consumer_tag = ''
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def members(self) -> list[str]:
+        return sorted(self._members)
+
+    async def start(self) -> None:
+        transport = self._transport
+        await transport.declare_exchange(self._exchange_name, ExchangeType.fanout)
+        queue = await transport.declare_queue(exclusive=True, auto_delete=True)
+        await transport.bind(queue, self._exchange_name)
+        self._consumer_tag = await transport.consume(queue, self._on_message, no_ack=True)
+        self._members[self._member] = time.monotonic()
+        await self._changed()
+        self._task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        """Stops the heartbeats and announces leaving, so the others take
+        over the partitions at once.
+        """
+        if self._task:
+            self._task.cancel()
+
+        if self._consumer_tag:
+            await self._transport.cancel(self._consumer_tag)
+
+        try:
+            await self._publish(leave=True)
+        except Exception as exc:
+            self._log.warning('Unable to announce leaving the group: %r', exc)
+
+    async def _publish(self, leave: bool=False) -> None:
+        await self._transport.publish(
+            exchange=self._exchange_name,
+            routing_key='',
+            body=orjson.dumps({'member': self._member, 'leave': leave}),
+            content_type='application/json',
+        )
+
+    async def _heartbeat(self) -> None:
+        while True:
+            try:
+                await self._publish()
+            except Exception as exc:
+                self._log.warning('Heartbeat error: %r', exc)
+
+            await asyncio.sleep(self._interval)
+            expired = time.monotonic() - 3 * self._interval
+            gone = [
+                x for x, seen in self._members.items()
+                if seen < expired and x != self._member
+            ]
+
+            if gone:
+                for member in gone:
+                    del self._members[member]
+
+                self._log.warning('Members without heartbeats left the group: %s', gone)
+                await self._changed()
+
+    async def _on_message(self, message: IncomingMessage) -> None:
+        try:
+            data: dict[str, Any] = orjson.loads(message.body)
+            member = data['member']
+        except (orjson.JSONDecodeError, KeyError, TypeError) as exc:
+            self._log.error('Invalid heartbeat: %r', exc)
+            return
+
+        if member == self._member:
+            return
+
+        if data.get('leave'):
+            if self._members.pop(member, None) is not None:
+                await self._changed()
+
+            return
+
+        joined = member not in self._members
+        self._members[member] = time.monotonic()
+
+        if joined:
+            await self._changed()
+
+    async def _changed(self) -> None:
+        # The callbacks see the changes in order.
+        async with self._lock:
+            try:
+                await self._on_change(self.members)
+            except Exception as exc:
+                self._log.exception('Membership change error: %r', exc)
@@ -1,3 +1,5 @@
+import time
+import asyncio
 import logging
 from typing import Any
 from typing import cast
@@ -6,10 +8,37 @@ from uuid import uuid4
 from uuid import UUID
 
 import orjson
-import aiormq
-import aio_pika
 
 from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Histogram
+from shared.tracing import get_tracer
+from shared.tracing import inject
+
+from ..headers import PUBLISHED_AT_HEADER
+from ..partitions import partition_name
+from ..partitions import partition_of
+from ..partitions import queue_bindings
+from ..transport import Transport
+from ..transport import ExchangeType
+from ..transport import create_transport
+
+
+PUBLISHED = Counter(
+    'producer_messages_published',
+    'Messages published and confirmed by the broker',
+    ['exchange'],
+)
+PUBLISH_ERRORS = Counter(
+    'producer_publish_errors',
+    'Failed or not acknowledged publishes',
+    ['exchange'],
+)
+PUBLISH_DURATION = Histogram(
+    'producer_publish_duration_seconds',
+    'Publish duration including serialization and the confirmation wait',
+    ['exchange'],
+)
 
 
 class ProducerError(Exception):
@@ -30,6 +59,7 @@ class Producer:
         persistent: bool=False,
         publisher_confirms: bool=True,
         app_name: str='',
+        partitions: int=0,
         logger: logging.Logger | None=None,
     ) -> None:
         self._log = logger or get_app_logger()
@@ -40,12 +70,14 @@ class Producer:
         self._persistent = persistent
         self._publisher_confirms = publisher_confirms
         self._app_name = app_name
-        self._connection: aio_pika.abc.AbstractConnection | None = None
-        self._channel: aio_pika.abc.AbstractChannel | None = None
-        self._queue: aio_pika.abc.AbstractQueue | None = None
-        self._exchange: aio_pika.abc.AbstractExchange | None = None
+        self._partitions = partitions  # If set, tasks are hashed across `{queue_name}.{i}`
+        self._transport: Transport | None = None
         self._started = False
         self._shutdown_is_pending = False
+        self._published = PUBLISHED.labels(exchange_name)
+        self._publish_errors = PUBLISH_ERRORS.labels(exchange_name)
+        self._publish_duration = PUBLISH_DURATION.labels(exchange_name)
+        self.sent_count = 0  # Messages confirmed by the broker
 
     async def startup(self) -> None:
         self._log.info('Starting the producer..')
@@ -54,29 +86,24 @@ class Producer:
             raise RuntimeError('Producer already started.')
 
         self._log.info('Connecting to message broker..')
-        self._connection = await aio_pika.connect_robust(self._conn_url)
-
-        self._log.info('Opening the channel..')
-        self._channel = cast(
-            aio_pika.abc.AbstractChannel,
-            await self._connection.channel(
-                publisher_confirms=self._publisher_confirms,
-            )
+        self._transport = transport = create_transport(
+            self._conn_url,
+            publisher_confirms=self._publisher_confirms,
         )
+        await transport.connect()
 
         self._log.info('Creating the exchange..')
-        self._exchange = await self._channel.declare_exchange(
+        await transport.declare_exchange(
             name=self._exchange_name,
-            type=aio_pika.abc.ExchangeType.DIRECT,
+            type=ExchangeType.direct,
             durable=True,
         )
 
         self._log.info('Creating the queue..')
-        self._queue = await self._channel.declare_queue(
-            name=self._queue_name,
-            durable=True,
-        )
-        await self._queue.bind(self._exchange_name, routing_key=self._routing_key)
+
+        for queue, routing_key in self._queues():
+            await transport.declare_queue(name=queue, durable=True)
+            await transport.bind(queue, self._exchange_name, routing_key)
 
         self._started = True
         self._log.info('Producer successfully started.')
@@ -89,24 +116,59 @@ class Producer:
 
         self._shutdown_is_pending = True
 
-        if self._channel:
-            self._log.info('Channel closing..')
-            await self._channel.close()
-
-        if self._connection:
+        if self._transport:
             self._log.info('Connection closing..')
-            await self._connection.close()
+            await self._transport.close()
 
         self._log.info('Producer successfully stopped.')
 
-    async def send(self, data: Any, task_id: str | int | UUID | None=None) -> str:
+    def _queues(self) -> list[tuple[str, str]]:
+        return queue_bindings(self._queue_name, self._routing_key, self._partitions)
+
+    def _routing_key_of(self, task_id: str) -> str:
+        if not self._partitions:
+            return self._routing_key
+
+        return partition_name(self._routing_key, partition_of(task_id, self._partitions))
+
+    async def queue_stats(self) -> tuple[int, int]:
+        """Returns the number of ready messages and of consumers of the queue
+        (passive declaration, the queue is not changed). For partitioned
+        queues, the ready messages of all partitions and the consumers of the
+        least consumed partition(`0` if the tasks of a partition are stuck).
+        """
         if not self._started:
             raise RuntimeError(
                 'Producer has not been started. Call `startup()` before '
                 'using this method.'
             )
 
-        exchange = cast(aio_pika.abc.AbstractExchange, self._exchange)
+        transport = cast(Transport, self._transport)
+        stats = [await transport.queue_stats(queue) for queue, _ in self._queues()]
+        return sum(x[0] for x in stats), min(x[1] for x in stats)
+
+    async def send(
+        self,
+        data: Any,
+        task_id: str | int | UUID | None=None,
+        headers: dict[str, Any] | None=None,
+    ) -> str:
+        return await self.send_raw(orjson.dumps(data), task_id, headers)
+
+    async def send_raw(
+        self,
+        body: bytes,
+        task_id: str | int | UUID | None=None,
+        headers: dict[str, Any] | None=None,
+    ) -> str:
+        """Publishes already serialized(JSON) data without re-encoding it."""
+        if not self._started:
+            raise RuntimeError(
+                'Producer has not been started. Call `startup()` before '
+                'using this method.'
+            )
+
+        transport = cast(Transport, self._transport)
 
         match task_id:
             case None:
@@ -116,30 +178,58 @@ class Producer:
             case int():
                 task_id = str(task_id)
 
-        message = aio_pika.Message(
-            body=orjson.dumps(data),
-            message_id=task_id,
-            app_id=self._app_name,
-            delivery_mode=(
-                aio_pika.DeliveryMode.PERSISTENT if self._persistent else None
-            ),
-        )
+        with get_tracer().start_span(
+            'amqp.publish',
+            kind='producer',
+            attributes={'task_id': task_id, 'exchange': self._exchange_name},
+        ):
+            started = time.perf_counter()
+            published_at = time.time()
+
+            try:
+                confirmed = await transport.publish(
+                    exchange=self._exchange_name,
+                    routing_key=self._routing_key_of(task_id),
+                    body=body,
+                    message_id=task_id,
+                    app_id=self._app_name,
+                    timestamp=published_at,
+                    headers=inject({**(headers or {}), PUBLISHED_AT_HEADER: published_at}),
+                    persistent=self._persistent,
+                )
+            except Exception as exc:
+                self._publish_errors.inc()
+                raise PublishError('Publish error', exc)
+
+            if not confirmed:
+                self._publish_errors.inc()
+                raise PublishError('Message was not acknowledged by broker!')
+
+            self._published.inc()
+            self.sent_count += 1
+            self._publish_duration.observe(time.perf_counter() - started)
 
-        try:
-            confirmation = await exchange.publish(
-                message=message,
-                routing_key=self._routing_key,
-            )
-        except Exception as exc:
-            raise PublishError('Publish error', exc)
+        return task_id
 
-        if not isinstance(confirmation, aiormq.spec.Basic.Ack):
-            raise PublishError(
-                'Message was not acknowledged by broker!',
-                confirmation,
-            )
+    async def send_many(
+        self,
+        items: list[tuple[Any, str | int | UUID | None]],
+        headers: dict[str, Any] | None=None,
+    ) -> list[str | PublishError]:
+        """Publishes `(data, task_id)` items concurrently, so the broker
+        confirms them in batches instead of one round-trip per message.
+        Returns the task id or the publish error of each item.
+        """
+        results = await asyncio.gather(
+            *(self.send(data, task_id, headers) for data, task_id in items),
+            return_exceptions=True,
+        )
 
-        return task_id
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, PublishError):
+                raise result
+
+        return results  # type: ignore[return-value]
 
     async def __aenter__(self) -> Self:
         await self.startup()
@@ -0,0 +1,3 @@
+from .results import ResultPublisher
+from .results import ResultConsumer
+from .results import ResultError
@@ -0,0 +1,283 @@
+import time
+import asyncio
+import logging
+from typing import Any
+from typing import cast
+from typing import Self
+from typing import Awaitable
+from typing import Callable
+from contextlib import suppress
+
+import orjson
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Histogram
+from shared.tracing import inject
+
+from ..transport import Transport
+from ..transport import ExchangeType
+from ..transport import IncomingMessage
+from ..transport import create_transport
+
+
+RESULTS_PUBLISHED = Counter(
+    'results_published',
+    'Task results published to the results exchange and confirmed',
+    ['exchange'],
+)
+RESULT_BATCHES = Counter(
+    'results_batches',
+    'Batches of task results by outcome(applied, failed)',
+    ['queue', 'outcome'],
+)
+RESULT_BATCH_SIZE = Histogram(
+    'results_batch_size',
+    'Messages of the applied batches of task results',
+    ['queue'],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+RESULT_BATCH_DURATION = Histogram(
+    'results_batch_duration_seconds',
+    'Time to apply a batch of task results',
+    ['queue'],
+)
+
+# `(task_id, results)` of the messages of a batch
+OnBatch = Callable[[list[tuple[str, list[dict[str, Any]]]]], Awaitable[None]]
+
+
+class ResultError(Exception):
+    pass
+
+
+async def _declare(transport: Transport, exchange_name: str, queue_name: str) -> None:
+    # The queue is bound with its name as the routing key.
+    await transport.declare_exchange(
+        name=exchange_name,
+        type=ExchangeType.direct,
+        durable=True,
+    )
+    await transport.declare_queue(name=queue_name, durable=True)
+    await transport.bind(queue_name, exchange_name, queue_name)
+
+
+class ResultPublisher:
+    """Publishes the results of a task(the values to write, a JSON list) to
+    the durable queue of the ingester instead of writing them to the DB.
+    Messages are persistent and confirmed, so the task message can be
+    acknowledged once `publish` returns.
+    """
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        queue_name: str,
+        persistent: bool=True,
+        app_name: str='',
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._conn_url = conn_url
+        self._exchange_name = exchange_name
+        self._queue_name = queue_name
+        self._persistent = persistent
+        self._app_name = app_name
+        self._transport: Transport | None = None
+        self._started = False
+        self._published = RESULTS_PUBLISHED.labels(exchange_name)
+
+    async def startup(self) -> None:
+        if self._started:
+            raise RuntimeError('ResultPublisher already started.')
+
+        self._log.info('Connecting to message broker(results)..')
+        self._transport = transport = create_transport(self._conn_url)
+        await transport.connect()
+        await _declare(transport, self._exchange_name, self._queue_name)
+        self._started = True
+
+    async def shutdown(self) -> None:
+        if self._transport:
+            await self._transport.close()
+
+    async def publish(self, task_id: str, results: list[dict[str, Any]]) -> None:
+        if not self._started:
+            raise RuntimeError(
+                'ResultPublisher has not been started. Call `startup()` before '
+                'using this method.'
+            )
+
+        transport = cast(Transport, self._transport)
+
+        try:
+            confirmed = await transport.publish(
+                exchange=self._exchange_name,
+                routing_key=self._queue_name,
+                body=orjson.dumps(results),
+                message_id=task_id,
+                app_id=self._app_name,
+                content_type='application/json',
+                timestamp=time.time(),
+                headers=inject({}),
+                persistent=self._persistent,
+            )
+        except Exception as exc:
+            raise ResultError('Result publish error', exc)
+
+        if not confirmed:
+            raise ResultError('Result was not acknowledged by broker!')
+
+        self._published.inc()
+
+    async def __aenter__(self) -> Self:
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.shutdown()
+
+
+class ResultConsumer:
+    """Consumes the results published by `ResultPublisher` in batches. The
+    messages are buffered until `batch_size` of them(or `batch_max_bytes`)
+    are received or `flush_interval` seconds have passed since the first
+    one, then `on_batch` gets the `(task_id, results)` of the batch. The
+    messages are acknowledged after `on_batch` returns or requeued if it
+    fails, so results are applied at least once and `on_batch` must be
+    idempotent. The next batch is received while one is being applied.
+    """
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        queue_name: str,
+        on_batch: OnBatch,
+        batch_size: int=500,
+        batch_max_bytes: int=16_000_000,
+        flush_interval: float=0.05,
+        retry_interval: float=1.,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._conn_url = conn_url
+        self._exchange_name = exchange_name
+        self._queue_name = queue_name
+        self._on_batch = on_batch
+        self._batch_size = batch_size
+        self._batch_max_bytes = batch_max_bytes
+        self._flush_interval = flush_interval
+        self._retry_interval = retry_interval  # Pause after a failed batch(e.g. the DB is locked)
+        self._transport: Transport | None = None
+        self._consumer_tag = ''
+        self._task: asyncio.Task | None = None
+        self._buffer: list[IncomingMessage] = []
+        self._buffer_bytes = 0
+        self._received = asyncio.Event()  # The buffer is not empty
+        self._full = asyncio.Event()
+        self._stopping = False
+        self._started = False
+        self._batches = {x: RESULT_BATCHES.labels(queue_name, x) for x in ('applied', 'failed')}
+        self._batch_size_metric = RESULT_BATCH_SIZE.labels(queue_name)
+        self._batch_duration = RESULT_BATCH_DURATION.labels(queue_name)
+
+    async def startup(self) -> None:
+        if self._started:
+            raise RuntimeError('ResultConsumer already started.')
+
+        self._log.info('Connecting to message broker(results)..')
+        self._transport = transport = create_transport(self._conn_url)
+        await transport.connect()
+        await transport.set_qos(prefetch_count=2 * self._batch_size)
+        await _declare(transport, self._exchange_name, self._queue_name)
+        self._task = asyncio.create_task(self._run())
+        self._consumer_tag = await transport.consume(self._queue_name, self._on_message)
+        self._started = True
+        self._log.info(
+            'Result consumer started: batch_size=%s, flush_interval=%s.',
+            self._batch_size,
+            self._flush_interval,
+        )
+
+    async def shutdown(self) -> None:
+        """Stops receiving results and applies the buffered ones."""
+        if self._transport and self._consumer_tag:
+            await self._transport.cancel(self._consumer_tag)
+
+        if self._task:
+            self._stopping = True
+            self._full.set()
+            self._received.set()
+            await self._task
+
+        if self._transport:
+            await self._transport.close()
+
+    async def _on_message(self, message: IncomingMessage) -> None:
+        self._buffer.append(message)
+        self._buffer_bytes += len(message.body)
+        self._received.set()
+
+        if len(self._buffer) >= self._batch_size or self._buffer_bytes >= self._batch_max_bytes:
+            self._full.set()
+
+    def _take(self) -> list[IncomingMessage]:
+        batch, self._buffer, self._buffer_bytes = self._buffer, [], 0
+        self._received.clear()
+        self._full.clear()
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            await self._received.wait()
+
+            if not self._full.is_set():
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._full.wait(), self._flush_interval)
+
+            if batch := self._take():
+                try:
+                    await self._apply(batch)
+                except Exception as exc:
+                    # E.g. the connection is lost, the unacknowledged messages are redelivered.
+                    self._log.exception('Results batch error: %r', exc)
+
+            if self._stopping and not self._buffer:
+                return
+
+    async def _apply(self, batch: list[IncomingMessage]) -> None:
+        messages, items = [], []
+
+        for message in batch:
+            try:
+                items.append((message.message_id or '', orjson.loads(message.body)))
+                messages.append(message)
+            except orjson.JSONDecodeError as exc:
+                self._log.error('Invalid result of task %s: %r', message.message_id, exc)
+                await message.reject(requeue=False)
+
+        if not items:
+            return
+
+        started = time.perf_counter()
+
+        try:
+            await self._on_batch(items)
+        except Exception as exc:
+            self._batches['failed'].inc()
+            self._log.exception('Unable to apply %s results, requeued: %r', len(items), exc)
+            await asyncio.gather(*(x.nack(requeue=True) for x in messages))
+            await asyncio.sleep(self._retry_interval)
+            return
+
+        self._batch_duration.observe(time.perf_counter() - started)
+        self._batch_size_metric.observe(len(items))
+        self._batches['applied'].inc()
+        await asyncio.gather(*(x.ack() for x in messages))
+
+    async def __aenter__(self) -> Self:
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.shutdown()
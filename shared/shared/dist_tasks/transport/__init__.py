@@ -0,0 +1,5 @@
+from .base import Transport
+from .base import TransportError
+from .base import ExchangeType
+from .base import IncomingMessage
+from .base import create_transport
@@ -0,0 +1,143 @@
+from typing import Any
+from typing import cast
+
+import aiormq
+import aio_pika
+
+from .base import Transport
+from .base import TransportError
+from .base import ExchangeType
+from .base import OnMessage
+
+
+class AmqpTransport(Transport):
+    """RabbitMQ(`aio_pika`) transport with a robust connection."""
+    def __init__(self, conn_url: str, publisher_confirms: bool=True) -> None:
+        self._conn_url = conn_url
+        self._publisher_confirms = publisher_confirms
+        self._connection: aio_pika.abc.AbstractConnection | None = None
+        self._channel: aio_pika.abc.AbstractChannel | None = None
+        self._exchanges: dict[str, aio_pika.abc.AbstractExchange] = {}
+        self._queues: dict[str, aio_pika.abc.AbstractQueue] = {}
+        self._consumers: dict[str, aio_pika.abc.AbstractQueue] = {}
+
+    @property
+    def channel(self) -> aio_pika.abc.AbstractChannel:
+        if self._channel is None:
+            raise TransportError('The transport is not connected.')
+
+        return self._channel
+
+    async def connect(self) -> None:
+        self._connection = await aio_pika.connect_robust(self._conn_url)
+        self._channel = cast(
+            aio_pika.abc.AbstractChannel,
+            await self._connection.channel(
+                publisher_confirms=self._publisher_confirms,
+            )
+        )
+
+    async def close(self) -> None:
+        if self._channel:
+            await self._channel.close()
+
+        if self._connection:
+            await self._connection.close()
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        await self.channel.set_qos(prefetch_count=prefetch_count)
+
+    async def declare_exchange(
+        self,
+        name: str,
+        type: ExchangeType,
+        durable: bool=False,
+    ) -> None:
+        self._exchanges[name] = await self.channel.declare_exchange(
+            name=name,
+            type=aio_pika.abc.ExchangeType(type.value),
+            durable=durable,
+        )
+
+    async def declare_queue(
+        self,
+        name: str='',
+        durable: bool=False,
+        exclusive: bool=False,
+        auto_delete: bool=False,
+    ) -> str:
+        queue = await self.channel.declare_queue(
+            name=name or None,
+            durable=durable,
+            exclusive=exclusive,
+            auto_delete=auto_delete,
+        )
+        self._queues[queue.name] = queue
+        return queue.name
+
+    def _get_queue(self, name: str) -> aio_pika.abc.AbstractQueue:
+        try:
+            return self._queues[name]
+        except KeyError:
+            raise TransportError(f'Queue "{name}" was not declared.') from None
+
+    async def bind(self, queue: str, exchange: str, routing_key: str='') -> None:
+        await self._get_queue(queue).bind(exchange, routing_key=routing_key)
+
+    async def queue_stats(self, queue: str) -> tuple[int, int]:
+        declared = await self.channel.declare_queue(queue, passive=True)
+        result = declared.declaration_result
+        return result.message_count or 0, result.consumer_count or 0
+
+    async def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        message_id: str | None=None,
+        app_id: str | None=None,
+        content_type: str | None=None,
+        timestamp: float | None=None,
+        headers: dict[str, Any] | None=None,
+        persistent: bool=False,
+    ) -> bool:
+        try:
+            target = self._exchanges[exchange]
+        except KeyError:
+            raise TransportError(f'Exchange "{exchange}" was not declared.') from None
+
+        confirmation = await target.publish(
+            message=aio_pika.Message(
+                body=body,
+                message_id=message_id,
+                app_id=app_id,
+                content_type=content_type,
+                timestamp=timestamp,  # AMQP timestamp has a resolution of seconds
+                headers=headers,
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT if persistent else None,
+            ),
+            routing_key=routing_key,
+        )
+
+        if not self._publisher_confirms:
+            return True
+
+        return isinstance(confirmation, aiormq.spec.Basic.Ack)
+
+    async def consume(
+        self,
+        queue: str,
+        on_message: OnMessage,
+        no_ack: bool=False,
+    ) -> str:
+        target = self._get_queue(queue)
+        consumer_tag = await target.consume(
+            cast(Any, on_message),  # `aio_pika` messages are `IncomingMessage`
+            no_ack=no_ack,
+        )
+        self._consumers[consumer_tag] = target
+        return consumer_tag
+
+    async def cancel(self, consumer_tag: str) -> None:
+        if queue := self._consumers.pop(consumer_tag, None):
+            await queue.cancel(consumer_tag)
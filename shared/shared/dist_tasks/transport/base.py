@@ -0,0 +1,143 @@
+import abc
+import datetime
+from enum import StrEnum
+from typing import Any
+from typing import Protocol
+from typing import Awaitable
+from typing import Callable
+from urllib.parse import urlsplit
+
+
+class TransportError(Exception):
+    pass
+
+
+class ExchangeType(StrEnum):
+    direct = 'direct'
+    fanout = 'fanout'
+
+
+class IncomingMessage(Protocol):
+    """A delivered message. The messages of `aio_pika` satisfy it as is."""
+    @property
+    def body(self) -> bytes: ...
+
+    @property
+    def message_id(self) -> str | None: ...
+
+    @property
+    def headers(self) -> dict[str, Any]: ...
+
+    @property
+    def timestamp(self) -> datetime.datetime | None: ...
+
+    @property
+    def redelivered(self) -> bool | None: ...
+
+    async def ack(self, multiple: bool=False) -> None: ...
+
+    async def nack(self, multiple: bool=False, requeue: bool=True) -> None: ...
+
+    async def reject(self, requeue: bool=False) -> None: ...
+
+
+OnMessage = Callable[[IncomingMessage], Awaitable[Any]]
+
+
+class Transport(abc.ABC):
+    """A connection to a message broker with a single channel. Covers the
+    AMQP operations used by the producer, the consumer and the events:
+    direct and fanout exchanges, queues with bindings, publishing with
+    confirmations and consuming with prefetch and acknowledgements.
+    """
+    @abc.abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def set_qos(self, prefetch_count: int) -> None:
+        """Limits the unacknowledged messages of each consumer started
+        afterwards(0 - unlimited).
+        """
+
+    @abc.abstractmethod
+    async def declare_exchange(
+        self,
+        name: str,
+        type: ExchangeType,
+        durable: bool=False,
+    ) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def declare_queue(
+        self,
+        name: str='',
+        durable: bool=False,
+        exclusive: bool=False,
+        auto_delete: bool=False,
+    ) -> str:
+        """Returns the name of the queue, generated by the broker if `name`
+        is empty.
+        """
+
+    @abc.abstractmethod
+    async def bind(self, queue: str, exchange: str, routing_key: str='') -> None:
+        pass
+
+    @abc.abstractmethod
+    async def queue_stats(self, queue: str) -> tuple[int, int]:
+        """Returns the number of ready messages and of consumers of the queue
+        (passive declaration, the queue is not changed).
+        """
+
+    @abc.abstractmethod
+    async def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        message_id: str | None=None,
+        app_id: str | None=None,
+        content_type: str | None=None,
+        timestamp: float | None=None,  # Unix time
+        headers: dict[str, Any] | None=None,
+        persistent: bool=False,
+    ) -> bool:
+        """Returns `False` if the broker did not acknowledge the message.
+        Without publisher confirms the message is considered acknowledged.
+        """
+
+    @abc.abstractmethod
+    async def consume(
+        self,
+        queue: str,
+        on_message: OnMessage,
+        no_ack: bool=False,
+    ) -> str:
+        """Starts a consumer and returns its tag. `on_message` is called in a
+        new task for each delivered message.
+        """
+
+    @abc.abstractmethod
+    async def cancel(self, consumer_tag: str) -> None:
+        pass
+
+
+def create_transport(conn_url: str, publisher_confirms: bool=True) -> Transport:
+    """Returns the transport of the URL scheme: `amqp://`, `amqps://`
+    (RabbitMQ) or `memory://`(in-process broker).
+    """
+    match urlsplit(conn_url).scheme:
+        case 'amqp' | 'amqps':
+            from .amqp import AmqpTransport
+            return AmqpTransport(conn_url, publisher_confirms)
+        case 'memory':
+            from .memory import MemoryTransport
+            return MemoryTransport(conn_url, publisher_confirms)
+        case scheme:
+            raise ValueError(f'Unsupported message broker URL scheme: {scheme!r}')
@@ -0,0 +1,452 @@
+import uuid
+import asyncio
+import datetime
+import itertools
+from collections import deque
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import replace
+from typing import Any
+from urllib.parse import urlsplit
+
+from shared.logging import get_app_logger
+
+from .base import Transport
+from .base import TransportError
+from .base import ExchangeType
+from .base import OnMessage
+
+
+@dataclass(slots=True)
+class _Message:
+    body: bytes
+    message_id: str | None
+    app_id: str | None
+    content_type: str | None
+    timestamp: float | None
+    headers: dict[str, Any]
+    redelivered: bool = False
+
+
+@dataclass(slots=True)
+class _Exchange:
+    name: str
+    type: ExchangeType
+    durable: bool
+    bindings: set[tuple[str, str]] = field(default_factory=set)  # (queue, routing key)
+
+
+class MemoryIncomingMessage:
+    """A delivered message of `MemoryTransport`, see `IncomingMessage`."""
+    __slots__ = ('_message', '_queue', '_consumer', '_settled')
+
+    def __init__(
+        self,
+        message: _Message,
+        queue: '_Queue',
+        consumer: '_Consumer | None',
+    ) -> None:
+        self._message = message
+        self._queue = queue
+        self._consumer = consumer  # `None` if delivered without acknowledgement
+        self._settled = consumer is None
+
+    @property
+    def body(self) -> bytes:
+        return self._message.body
+
+    @property
+    def message_id(self) -> str | None:
+        return self._message.message_id
+
+    @property
+    def app_id(self) -> str | None:
+        return self._message.app_id
+
+    @property
+    def content_type(self) -> str | None:
+        return self._message.content_type
+
+    @property
+    def headers(self) -> dict[str, Any]:
+        return self._message.headers
+
+    @property
+    def timestamp(self) -> datetime.datetime | None:
+        if self._message.timestamp is None:
+            return None
+
+        return datetime.datetime.fromtimestamp(self._message.timestamp, datetime.UTC)
+
+    @property
+    def redelivered(self) -> bool:
+        return self._message.redelivered
+
+    def _settle(self) -> None:
+        if self._settled:
+            raise TransportError('The message is already settled or needs no acknowledgement.')
+
+        consumer = self._consumer
+
+        if consumer is None or consumer.transport.closed:
+            raise TransportError('The channel of the message is closed.')
+
+        self._settled = True
+        consumer.unacked.discard(self)
+
+        if consumer.cancelled and not consumer.unacked:
+            consumer.transport._release(consumer)
+
+    async def ack(self, multiple: bool=False) -> None:
+        self._settle()
+        self._queue.dispatch()
+
+    async def nack(self, multiple: bool=False, requeue: bool=True) -> None:
+        self._settle()
+
+        if requeue:
+            self._queue.requeue(self._message)
+
+        self._queue.dispatch()
+
+    async def reject(self, requeue: bool=False) -> None:
+        await self.nack(requeue=requeue)
+
+
+@dataclass(slots=True, eq=False)
+class _Consumer:
+    tag: str
+    transport: 'MemoryTransport'
+    queue: '_Queue'
+    on_message: OnMessage
+    no_ack: bool
+    prefetch_count: int  # 0 - unlimited
+    unacked: set[MemoryIncomingMessage] = field(default_factory=set)
+    cancelled: bool = False
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.no_ack or not self.prefetch_count or len(self.unacked) < self.prefetch_count
+
+
+class _Queue:
+    def __init__(
+        self,
+        broker: 'MemoryBroker',
+        name: str,
+        durable: bool,
+        exclusive: bool,
+        auto_delete: bool,
+        owner: 'MemoryTransport',
+    ) -> None:
+        self.broker = broker
+        self.name = name
+        self.durable = durable
+        self.exclusive = exclusive
+        self.auto_delete = auto_delete
+        self.owner = owner
+        self.ready: deque[_Message] = deque()
+        self.consumers: deque[_Consumer] = deque()  # Rotated for round-robin delivery
+
+    def put(self, message: _Message) -> None:
+        self.ready.append(message)
+        self.dispatch()
+
+    def requeue(self, message: _Message) -> None:
+        # As RabbitMQ, requeued messages return to the head of the queue.
+        message.redelivered = True
+        self.ready.appendleft(message)
+
+    def dispatch(self) -> None:
+        """Delivers the ready messages round-robin to the consumers with
+        a free prefetch slot.
+        """
+        while self.ready and self.consumers:
+            for _ in range(len(self.consumers)):
+                consumer = self.consumers[0]
+                self.consumers.rotate(-1)
+
+                if consumer.has_capacity:
+                    break
+            else:
+                return  # All consumers are at the prefetch limit
+
+            message = self.ready.popleft()
+            incoming = MemoryIncomingMessage(
+                # The headers may be changed by the consumer.
+                replace(message, headers=dict(message.headers)),
+                self,
+                None if consumer.no_ack else consumer,
+            )
+
+            if not consumer.no_ack:
+                consumer.unacked.add(incoming)
+
+            self.broker.run_callback(consumer.on_message(incoming))
+
+    def add_consumer(self, consumer: _Consumer) -> None:
+        self.consumers.append(consumer)
+        self.dispatch()
+
+    def remove_consumer(self, consumer: _Consumer) -> None:
+        if consumer not in self.consumers:
+            return
+
+        self.consumers.remove(consumer)
+
+        if self.auto_delete and not self.consumers:
+            self.broker.delete_queue(self.name)
+
+
+class MemoryBroker:
+    """An in-process broker: exchanges(direct, fanout) route the messages to
+    the bound queues, the queues deliver them to the consumers. The messages
+    are kept in memory only, `durable` and `persistent` are accepted but
+    have no effect. Rejected messages are dropped(no dead-lettering).
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.exchanges: dict[str, _Exchange] = {}
+        self.queues: dict[str, _Queue] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._log = get_app_logger()
+
+    def run_callback(self, coro: Any) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_callback_done)
+
+    def _on_callback_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+
+        if not task.cancelled() and (exc := task.exception()):
+            self._log.error('Message callback error: %r', exc)
+
+    def get_queue(self, name: str) -> _Queue:
+        try:
+            return self.queues[name]
+        except KeyError:
+            raise TransportError(f'NOT_FOUND - no queue "{name}"') from None
+
+    def delete_queue(self, name: str) -> None:
+        self.queues.pop(name, None)
+
+        for exchange in self.exchanges.values():
+            exchange.bindings = {x for x in exchange.bindings if x[0] != name}
+
+    def route(self, exchange_name: str, routing_key: str, message: _Message) -> None:
+        if not exchange_name:
+            # The default exchange routes to the queue named as the key.
+            if queue := self.queues.get(routing_key):
+                queue.put(message)
+
+            return
+
+        try:
+            exchange = self.exchanges[exchange_name]
+        except KeyError:
+            raise TransportError(f'NOT_FOUND - no exchange "{exchange_name}"') from None
+
+        names = [
+            queue for queue, key in exchange.bindings
+            if exchange.type == ExchangeType.fanout or key == routing_key
+        ]
+
+        for index, name in enumerate(names):
+            # Each queue gets its own copy(`redelivered` is changed on requeue).
+            self.queues[name].put(message if index == len(names) - 1 else replace(message))
+
+    def stats(self) -> dict[str, tuple[int, int]]:
+        """Returns the ready messages and the consumers of each queue."""
+        return {
+            name: (len(queue.ready), len(queue.consumers))
+            for name, queue in self.queues.items()
+        }
+
+
+_brokers: dict[str, MemoryBroker] = {}
+
+
+def get_broker(conn_url: str) -> MemoryBroker:
+    """Returns the broker of the URL(`memory://{name}`), the transports
+    with the same URL in the process share it.
+    """
+    parts = urlsplit(conn_url)
+    name = parts.netloc + parts.path
+
+    if (broker := _brokers.get(name)) is None:
+        broker = _brokers[name] = MemoryBroker(name)
+
+    return broker
+
+
+def reset_brokers() -> None:
+    """Drops all brokers with their messages, e.g. between benchmark runs."""
+    _brokers.clear()
+
+
+class MemoryTransport(Transport):
+    """In-process transport(`memory://{name}`) with the semantics of RabbitMQ
+    needed by the producer and the consumer: publisher confirms, prefetch,
+    ack/nack/reject and redelivery. Unacknowledged messages are requeued as
+    redelivered when the transport is closed. All parties must run in one
+    process and event loop.
+    """
+    _tags = itertools.count(1)
+
+    def __init__(self, conn_url: str, publisher_confirms: bool=True) -> None:
+        self._conn_url = conn_url
+        self._broker: MemoryBroker | None = None
+        self._prefetch_count = 0
+        self._consumers: dict[str, _Consumer] = {}  # Active
+        self._unacked_owners: list[_Consumer] = []  # Including the cancelled ones with unacked messages
+        self._exclusive: set[str] = set()
+        self.closed = False
+
+    @property
+    def broker(self) -> MemoryBroker:
+        if self._broker is None or self.closed:
+            raise TransportError('The transport is not connected.')
+
+        return self._broker
+
+    async def connect(self) -> None:
+        self._broker = get_broker(self._conn_url)
+
+    async def close(self) -> None:
+        if self._broker is None or self.closed:
+            return
+
+        for consumer_tag in list(self._consumers):
+            await self.cancel(consumer_tag)
+
+        self.closed = True
+        queues = set()
+
+        for consumer in self._unacked_owners:
+            for message in consumer.unacked:
+                # The message was never acknowledged: delivered again.
+                message._settled = True
+                message._queue.requeue(message._message)
+                queues.add(message._queue)
+
+            consumer.unacked.clear()
+
+        self._unacked_owners.clear()
+
+        for name in self._exclusive:
+            self._broker.delete_queue(name)
+
+        for queue in queues:
+            if queue.name in self._broker.queues:
+                queue.dispatch()
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        self._prefetch_count = prefetch_count
+
+    async def declare_exchange(
+        self,
+        name: str,
+        type: ExchangeType,
+        durable: bool=False,
+    ) -> None:
+        exchanges = self.broker.exchanges
+
+        if (exchange := exchanges.get(name)) is None:
+            exchanges[name] = _Exchange(name, type, durable)
+        elif exchange.type != type:
+            raise TransportError(
+                f'PRECONDITION_FAILED - exchange "{name}" has type "{exchange.type}"'
+            )
+
+    async def declare_queue(
+        self,
+        name: str='',
+        durable: bool=False,
+        exclusive: bool=False,
+        auto_delete: bool=False,
+    ) -> str:
+        broker = self.broker
+        name = name or f'amq.gen-{uuid.uuid4().hex}'
+
+        if (queue := broker.queues.get(name)) is None:
+            broker.queues[name] = _Queue(broker, name, durable, exclusive, auto_delete, self)
+
+            if exclusive:
+                self._exclusive.add(name)
+        elif queue.exclusive and queue.owner is not self:
+            raise TransportError(f'RESOURCE_LOCKED - queue "{name}" is exclusive')
+
+        return name
+
+    async def bind(self, queue: str, exchange: str, routing_key: str='') -> None:
+        broker = self.broker
+        broker.get_queue(queue)
+
+        try:
+            broker.exchanges[exchange].bindings.add((queue, routing_key))
+        except KeyError:
+            raise TransportError(f'NOT_FOUND - no exchange "{exchange}"') from None
+
+    async def queue_stats(self, queue: str) -> tuple[int, int]:
+        declared = self.broker.get_queue(queue)
+        return len(declared.ready), len(declared.consumers)
+
+    async def publish(
+        self,
+        exchange: str,
+        routing_key: str,
+        body: bytes,
+        message_id: str | None=None,
+        app_id: str | None=None,
+        content_type: str | None=None,
+        timestamp: float | None=None,
+        headers: dict[str, Any] | None=None,
+        persistent: bool=False,
+    ) -> bool:
+        self.broker.route(
+            exchange,
+            routing_key,
+            _Message(
+                body=bytes(body),
+                message_id=message_id,
+                app_id=app_id,
+                content_type=content_type,
+                timestamp=timestamp,
+                headers=dict(headers or {}),
+            ),
+        )
+        return True
+
+    async def consume(
+        self,
+        queue: str,
+        on_message: OnMessage,
+        no_ack: bool=False,
+    ) -> str:
+        target = self.broker.get_queue(queue)
+        consumer = _Consumer(
+            tag=f'ctag-{next(self._tags)}',
+            transport=self,
+            queue=target,
+            on_message=on_message,
+            no_ack=no_ack,
+            prefetch_count=self._prefetch_count,
+        )
+        self._consumers[consumer.tag] = consumer
+        self._unacked_owners.append(consumer)
+        target.add_consumer(consumer)
+        return consumer.tag
+
+    async def cancel(self, consumer_tag: str) -> None:
+        # The unacknowledged messages of the consumer can still be settled.
+        if consumer := self._consumers.pop(consumer_tag, None):
+            consumer.queue.remove_consumer(consumer)
+            consumer.cancelled = True
+
+            if not consumer.unacked:
+                self._release(consumer)
+
+    def _release(self, consumer: _Consumer) -> None:
+        """Forgets a cancelled consumer once all its messages are settled."""
+        self._unacked_owners.remove(consumer)
@@ -1,2 +1,6 @@
 from .logging import setup_app_logger
 from .logging import get_app_logger
+from .logging import setup_worker_logger
+from .logging import get_logging_setup
+from .logging import SamplingFilter
+from .logging import JsonFormatter
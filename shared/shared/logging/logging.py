@@ -1,8 +1,23 @@
+import sys
+import copy
+import queue
+import atexit
+import random
 import logging
+import logging.handlers
+import threading
+import datetime
+import multiprocessing
+from typing import Any
+
+import orjson
 
 FMT = '[%(levelname)s] %(asctime)s [%(name)s][%(pathname)s:%(lineno)d][%(funcName)s]: %(message)s'
+BATCH_SIZE = 256  # Max records written by the listener at once
 
 _logger = None
+_listener: '_LogListener | None' = None
+_setup_args: dict[str, Any] | None = None
 
 class LimitedLengthFormatter(logging.Formatter):
     def __init__(self, fmt=None, max_length: int=1000, *args, **kwargs):
@@ -14,27 +29,288 @@ class LimitedLengthFormatter(logging.Formatter):
 
         if len(original_message) > self.max_length:
             record.msg = original_message[:self.max_length] + '...'
+            record.args = None  # Already merged into the message
         return super().format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, the message is limited to `max_length`."""
+    def __init__(self, max_length: int=1000) -> None:
+        super().__init__()
+        self.max_length = max_length
+
+    def format(self, record):
+        message = record.getMessage()
+
+        if len(message) > self.max_length:
+            message = message[:self.max_length] + '...'
+
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.UTC).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'pid': record.process,
+            'path': record.pathname,
+            'line': record.lineno,
+            'func': record.funcName,
+            'message': message,
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            data['exc'] = record.exc_text
+
+        if record.stack_info:
+            data['stack'] = record.stack_info
+
+        return orjson.dumps(data).decode()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Unlike `QueueHandler`, keeps the traceback(and the stack) out of the
+    message, so the formatter of the listener limits only the message and
+    appends the traceback as a whole.
+    """
+    _exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            # Tracebacks can't be pickled(pool workers, multiprocessing queue).
+            record.exc_text = record.exc_text or self._exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class SamplingFilter(logging.Filter):
+    """Thins out the records up to `level`(hot-path debug messages): keeps
+    a `sample_rate` share of them and at most `rate_limit` records per second
+    of each logger(token bucket with a burst of one second). At most
+    `max_buckets` loggers are tracked, the least recently used is evicted.
+    """
+    def __init__(
+        self,
+        sample_rate: float=1.,
+        rate_limit: float=0.,  # 0 - unlimited
+        level: int=logging.DEBUG,
+        max_buckets: int=1024,
+    ) -> None:
+        super().__init__()
+        self.sample_rate = sample_rate
+        self.rate_limit = rate_limit
+        self.level = level
+        self.max_buckets = max_buckets
+        self.dropped = 0
+        self._buckets: dict[str, tuple[float, float]] = {}  # (tokens, time) by logger name
+        self._lock = threading.Lock()  # Records are filtered in the threads that log them
+
+    def filter(self, record):
+        if record.levelno > self.level:
+            return True
+
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            with self._lock:
+                self.dropped += 1
+
+            return False
+
+        if self.rate_limit:
+            with self._lock:
+                return self._take_token(record)
+
+        return True
+
+    def _take_token(self, record: logging.LogRecord) -> bool:
+        key = record.name
+        tokens, last = self._buckets.pop(key, (self.rate_limit, record.created))
+        tokens = min(tokens + (record.created - last) * self.rate_limit, self.rate_limit)
+
+        if len(self._buckets) >= self.max_buckets:
+            del self._buckets[next(iter(self._buckets))]
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, record.created)
+            self.dropped += 1
+            return False
+
+        self._buckets[key] = (tokens - 1, record.created)
+        return True
+
+
+class _LogListener:
+    """Writes the records of the queue(of this process and of the pool
+    workers) to the stream in a thread, a batch at a time.
+    """
+    def __init__(
+        self,
+        log_queue: Any,
+        formatter: logging.Formatter,
+        stream: Any=None,
+    ) -> None:
+        self.queue = log_queue
+        self._formatter = formatter
+        self._stream = stream or sys.stderr
+        self._thread = threading.Thread(target=self._run, name='log-listener', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Writes the queued records and stops the thread."""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        stopped = False
+
+        while not stopped:
+            batch = [self.queue.get()]
+
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines = []
+
+            for record in batch:
+                if record is None:
+                    stopped = True
+                    continue
+
+                try:
+                    lines.append(self._formatter.format(record) + '\n')
+                except Exception:
+                    lines.append(f'Log record format error: {record.msg!r}\n')
+
+            try:
+                self._stream.write(''.join(lines))
+                self._stream.flush()
+            except Exception:
+                pass  # As `logging.Handler.handleError` with `raiseExceptions=False`
+
+
+def _add_handler(
+    logger: logging.Logger,
+    handler: logging.Handler,
+    debug_sample_rate: float,
+    debug_rate_limit: float,
+) -> None:
+    if debug_sample_rate < 1 or debug_rate_limit:
+        handler.addFilter(SamplingFilter(debug_sample_rate, debug_rate_limit))
+
+    logger.addHandler(handler)
+
+
 def setup_app_logger(
     name: str,
     level: str | int =logging.DEBUG,
     max_length: int=1000,
     fmt: str | None=FMT,
+    json: bool=False,
+    queued: bool=False,
+    debug_sample_rate: float=1.,
+    debug_rate_limit: float=0.,
 ) -> logging.Logger:
-    global _logger
+    """With `queued`, the logging calls only put the records into a queue,
+    they are written by a listener thread, so the event loop does not block
+    on the stream. Pool workers set up with `get_logging_setup()` share the
+    queue. `debug_sample_rate` and `debug_rate_limit` thin out DEBUG records,
+    see `SamplingFilter`.
+    """
+    global _logger, _listener, _setup_args
 
     if fmt is None:
         fmt = FMT
 
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+    formatter = JsonFormatter(max_length) if json else LimitedLengthFormatter(fmt, max_length)
     _logger = logging.getLogger(name)
     _logger.setLevel(level)
-    ch = logging.StreamHandler()
-    ch.setFormatter(LimitedLengthFormatter(fmt, max_length))
-    _logger.addHandler(ch)
     _logger.propagate = False
+    _setup_args = None
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
+
+    if not queued:
+        ch = logging.StreamHandler()
+        ch.setFormatter(formatter)
+        _add_handler(_logger, ch, debug_sample_rate, debug_rate_limit)
+        return _logger
+
+    # A process-shared queue, so the pool workers can log through it.
+    log_queue = multiprocessing.get_context().Queue()
+    _listener = _LogListener(log_queue, formatter)
+    _listener.start()
+    atexit.register(_listener.stop)
+    _add_handler(
+        _logger,
+        _QueueHandler(log_queue),
+        debug_sample_rate,
+        debug_rate_limit,
+    )
+    _setup_args = dict(
+        name=name,
+        level=level,
+        log_queue=log_queue,
+        debug_sample_rate=debug_sample_rate,
+        debug_rate_limit=debug_rate_limit,
+    )
+    return _logger
+
+
+def get_logging_setup() -> dict[str, Any] | None:
+    """Returns `setup_worker_logger` arguments if the logger is queued, e.g.
+    for the initializer of a process pool(the queue is passed on process
+    creation).
+    """
+    return _setup_args
+
+
+def setup_worker_logger(
+    name: str,
+    level: str | int,
+    log_queue: Any,
+    debug_sample_rate: float=1.,
+    debug_rate_limit: float=0.,
+) -> logging.Logger:
+    """Sets up the app logger of a worker process writing to the queue of
+    the parent's listener.
+    """
+    global _logger, _listener, _setup_args
+
+    # A forked worker inherits the logger of the parent, but not its thread;
+    # a spawned one may have set up its own listener importing the main module.
+    if _listener:
+        _listener.stop()
+
+    _listener = None
+    _setup_args = None
+    _logger = logging.getLogger(name)
+    _logger.setLevel(level)
+    _logger.propagate = False
+
+    for handler in list(_logger.handlers):
+        _logger.removeHandler(handler)
 
+    _add_handler(
+        _logger,
+        _QueueHandler(log_queue),
+        debug_sample_rate,
+        debug_rate_limit,
+    )
     return _logger
 
 
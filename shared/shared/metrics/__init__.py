@@ -0,0 +1,8 @@
+from .metrics import Counter
+from .metrics import Gauge
+from .metrics import Histogram
+from .metrics import Registry
+from .metrics import MetricsError
+from .metrics import CONTENT_TYPE
+from .metrics import default_registry
+from .server import MetricsServer
@@ -0,0 +1,448 @@
+import math
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Any
+from typing import Callable
+from typing import Iterable
+
+
+DEFAULT_BUCKETS = (
+    .001, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10., 30., 60.,
+)
+
+# {metric_name: {label_values: values}}
+Snapshot = dict[str, dict[tuple[str, ...], list[float]]]
+
+
+class MetricsError(Exception):
+    pass
+
+
+class _Cells:
+    """Per-thread value cells. Each thread updates only its own cell, so
+    updates need no locks; readers sum the cells of all threads.
+    """
+    __slots__ = ('_size', '_local', '_cells', '_lock')
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._local = threading.local()
+        self._cells: list[list[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> list[float]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0.] * self._size
+
+            with self._lock:
+                self._cells.append(cell)
+
+            return cell
+
+    def sum(self) -> list[float]:
+        with self._lock:
+            cells = list(self._cells)
+
+        return [math.fsum(x) for x in zip(*cells)] if cells else [0.] * self._size
+
+    def drain(self) -> list[float]:
+        """Returns the sum and resets the cells. The owner threads must not
+        update the cells concurrently(e.g. single-threaded worker processes).
+        """
+        with self._lock:
+            cells = list(self._cells)
+            values = [math.fsum(x) for x in zip(*cells)] if cells else [0.] * self._size
+
+            for cell in cells:
+                cell[:] = [0.] * self._size
+
+        return values
+
+    def add(self, values: list[float]) -> None:
+        cell = self.cell()
+
+        for i, value in enumerate(values):
+            cell[i] += value
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str]=(),
+        registry: 'Registry | None'=None,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+
+        (registry or default_registry).register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any, **kwvalues: Any) -> Any:
+        if kwvalues:
+            values = tuple(kwvalues[x] for x in self.labelnames)
+
+        key = tuple(str(x) for x in values)
+
+        try:
+            return self._children[key]
+        except KeyError:
+            if len(key) != len(self.labelnames):
+                raise MetricsError(
+                    f'Metric "{self.name}" expects labels {self.labelnames}'
+                )
+
+            return self._children.setdefault(key, self._new_child())
+
+    def samples(
+        self,
+        values: dict[tuple[str, ...], list[float]] | None=None,
+    ) -> Iterable[tuple[str, dict[str, str], float]]:
+        """Yields the samples of the current values or of `values`(see
+        `collect`).
+        """
+        raise NotImplementedError
+
+    def collect(self) -> dict[tuple[str, ...], list[float]]:
+        """Returns the current values without resetting them."""
+        raise NotImplementedError
+
+    def aggregate(
+        self,
+        values: Iterable[dict[tuple[str, ...], list[float]]],
+    ) -> dict[tuple[str, ...], list[float]]:
+        """Combines the values(see `collect`) of several processes."""
+        res: dict[tuple[str, ...], list[float]] = {}
+
+        for item in values:
+            for key, value in item.items():
+                if key in res:
+                    res[key] = [a + b for a, b in zip(res[key], value)]
+                else:
+                    res[key] = list(value)
+
+        return res
+
+    def drain(self) -> dict[tuple[str, ...], list[float]]:
+        return {}
+
+    def merge(self, values: dict[tuple[str, ...], list[float]]) -> None:
+        pass
+
+    def _labels_dict(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class _CounterChild:
+    __slots__ = ('_cells',)
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+
+    def inc(self, amount: float=1.) -> None:
+        self._cells.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._cells.sum()[0]
+
+
+class Counter(_Metric):
+    type_name = 'counter'
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float=1.) -> None:
+        self._default.inc(amount)
+
+    def samples(self, values=None):
+        for key, value in (self.collect() if values is None else values).items():
+            yield self.name + '_total', self._labels_dict(key), value[0]
+
+    def collect(self):
+        return {key: child._cells.sum() for key, child in list(self._children.items())}
+
+    def drain(self):
+        return {
+            key: child._cells.drain()
+            for key, child in list(self._children.items())
+        }
+
+    def merge(self, values):
+        for key, value in values.items():
+            self.labels(*key)._cells.add(value)
+
+
+class _GaugeChild:
+    """Gauges hold a single value. They are updated from the event loop
+    thread or computed on collection by `set_function`.
+    """
+    __slots__ = ('_value', '_function')
+
+    def __init__(self) -> None:
+        self._value = 0.
+        self._function: Callable[[], float] | None = None
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def inc(self, amount: float=1.) -> None:
+        self._value += amount
+
+    def dec(self, amount: float=1.) -> None:
+        self._value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function else self._value
+
+
+class Gauge(_Metric):
+    """`multiprocess_mode` is how the values of several processes are
+    combined: `sum`(e.g. in-progress requests) or `max`(e.g. the same
+    queue depth observed by every process).
+    """
+    type_name = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str]=(),
+        registry: 'Registry | None'=None,
+        multiprocess_mode: str='sum',
+    ) -> None:
+        if multiprocess_mode not in ('sum', 'max'):
+            raise MetricsError(f'Unknown multiprocess_mode "{multiprocess_mode}"')
+
+        self.multiprocess_mode = multiprocess_mode
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def inc(self, amount: float=1.) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float=1.) -> None:
+        self._default.dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default.set_function(function)
+
+    def samples(self, values=None):
+        for key, value in (self.collect() if values is None else values).items():
+            yield self.name, self._labels_dict(key), value[0]
+
+    def collect(self):
+        return {key: [child.value] for key, child in list(self._children.items())}
+
+    def aggregate(self, values):
+        if self.multiprocess_mode == 'sum':
+            return super().aggregate(values)
+
+        res: dict[tuple[str, ...], list[float]] = {}
+
+        for item in values:
+            for key, value in item.items():
+                res[key] = [max(res[key][0], value[0])] if key in res else list(value)
+
+        return res
+
+
+class _HistogramChild:
+    __slots__ = ('_buckets', '_cells')
+
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self._buckets = buckets
+        # Cell layout: [bucket_0, .., bucket_n-1, +Inf bucket, sum]
+        self._cells = _Cells(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    @contextmanager
+    def time(self):
+        """Observes the duration of the block."""
+        started = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str]=(),
+        buckets: Iterable[float]=DEFAULT_BUCKETS,
+        registry: 'Registry | None'=None,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def samples(self, values=None):
+        for key, value in (self.collect() if values is None else values).items():
+            labels = self._labels_dict(key)
+            cumulative = 0.
+
+            for bound, count in zip((*self.buckets, math.inf), value):
+                cumulative += count
+                yield (
+                    self.name + '_bucket',
+                    {**labels, 'le': _format_value(bound)},
+                    cumulative,
+                )
+
+            yield self.name + '_sum', labels, value[-1]
+            yield self.name + '_count', labels, cumulative
+
+    def collect(self):
+        return {key: child._cells.sum() for key, child in list(self._children.items())}
+
+    def drain(self):
+        return {
+            key: child._cells.drain()
+            for key, child in list(self._children.items())
+        }
+
+    def merge(self, values):
+        for key, value in values.items():
+            self.labels(*key)._cells.add(value)
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise MetricsError(f'Metric "{metric.name}" is already registered')
+
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def drain(self) -> Snapshot:
+        """Returns the counters and histograms accumulated since the previous
+        call and resets them. Used to pass metrics of worker processes to the
+        parent process(see `merge`).
+        """
+        snapshot = {}
+
+        for name, metric in list(self._metrics.items()):
+            if values := {k: v for k, v in metric.drain().items() if any(v)}:
+                snapshot[name] = values
+
+        return snapshot
+
+    def merge(self, snapshot: Snapshot) -> None:
+        for name, values in snapshot.items():
+            if metric := self._metrics.get(name):
+                metric.merge(values)
+
+    def collect(self) -> Snapshot:
+        """Returns the current values of all metrics, without resetting
+        them. Used to aggregate metrics of several processes(see `aggregate`).
+        """
+        return {
+            name: metric.collect()
+            for name, metric in list(self._metrics.items())
+        }
+
+    def aggregate(self, snapshots: Iterable[Snapshot]) -> Snapshot:
+        """Combines the snapshots(see `collect`) of several processes.
+        Metrics that are not registered are skipped.
+        """
+        snapshots = list(snapshots)
+        return {
+            name: metric.aggregate(x[name] for x in snapshots if name in x)
+            for name, metric in list(self._metrics.items())
+        }
+
+    def render(self, snapshot: Snapshot | None=None) -> str:
+        """Returns the metrics in Prometheus text format: the current values
+        or the values of `snapshot`(see `collect`, `aggregate`).
+        """
+        lines = []
+
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.documentation)}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            values = None if snapshot is None else snapshot.get(metric.name, {})
+
+            for name, labels, value in metric.samples(values):
+                if labels:
+                    labels_str = ','.join(
+                        f'{k}="{_escape_label(v)}"' for k, v in labels.items()
+                    )
+                    lines.append(f'{name}{{{labels_str}}} {_format_value(value)}')
+                else:
+                    lines.append(f'{name} {_format_value(value)}')
+
+        lines.append('')
+        return '\n'.join(lines)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    elif value == -math.inf:
+        return '-Inf'
+    elif math.isnan(value):
+        return 'NaN'
+
+    return repr(float(value))
+
+
+def _escape_help(value: str) -> str:
+    return value.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _escape_label(value: str) -> str:
+    return _escape_help(value).replace('"', r'\"')
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+default_registry = Registry()
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from urllib import parse
+from typing import Awaitable
+from typing import Callable
+
+from shared.logging import get_app_logger
+
+from .metrics import Registry
+from .metrics import CONTENT_TYPE
+from .metrics import default_registry
+
+
+# handler(query) -> (status, content_type, body)
+Handler = Callable[[dict[str, list[str]]], Awaitable[tuple[int, str, bytes]]]
+
+_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class MetricsServer:
+    """A minimal HTTP listener for services without a web framework. Serves
+    `GET /metrics`; other paths can be added with `add_handler`.
+    """
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        registry: Registry | None=None,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._host = host
+        self._port = port
+        self._registry = registry or default_registry
+        self._server: asyncio.Server | None = None
+        self._handlers: dict[str, Handler] = {'/metrics': self._metrics}
+
+    def add_handler(self, path: str, handler: Handler) -> None:
+        self._handlers[path] = handler
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self._handle, self._host, self._port,
+        )
+        self._log.info('Metrics server listening on %s:%s', self._host, self._port)
+
+    async def stop(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.stop()
+
+    async def _metrics(self, query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+        return 200, CONTENT_TYPE, self._registry.render().encode()
+
+    async def _handle(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+
+            # Skipping the headers
+            while (line := await asyncio.wait_for(reader.readline(), timeout=10)) not in (b'\r\n', b'\n', b''):
+                pass
+
+            try:
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            except ValueError:
+                status, content_type, body = 400, 'text/plain', b'Bad Request'
+            else:
+                url = parse.urlsplit(target)
+                handler = self._handlers.get(url.path)
+
+                if handler is None:
+                    status, content_type, body = 404, 'text/plain', b'Not Found'
+                elif method != 'GET':
+                    status, content_type, body = 405, 'text/plain', b'Method Not Allowed'
+                else:
+                    try:
+                        status, content_type, body = await handler(parse.parse_qs(url.query))
+                    except Exception as exc:
+                        self._log.exception('Error while handling "%s": %r', target, exc)
+                        status, content_type, body = 500, 'text/plain', b'Internal Server Error'
+
+            writer.write(
+                (
+                    f'HTTP/1.1 {status} {_REASONS.get(status, "")}\r\n'
+                    f'Content-Type: {content_type}\r\n'
+                    f'Content-Length: {len(body)}\r\n'
+                    'Connection: close\r\n\r\n'
+                ).encode('latin-1') + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,9 @@
+from .profiling import Profiler
+from .profiling import ProfileRequest
+from .profiling import ProfilingError
+from .profiling import start_worker_profiler
+from .profiling import sample_stacks
+from .profiling import collapse
+from .profiling import write_collapsed
+from .profiling import read_collapsed
+from .profiling import merge_collapsed
@@ -0,0 +1,296 @@
+import os
+import sys
+import time
+import types
+import asyncio
+import logging
+import datetime
+import functools
+import threading
+import multiprocessing
+from collections import Counter
+from pathlib import Path
+from typing import Callable
+
+import orjson
+
+from shared.logging import get_app_logger
+
+
+WORKER_TIMEOUT = 10.  # Max seconds to wait for the files of the workers after the parent is done
+
+
+class ProfilingError(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_name(code: types.CodeType) -> str:
+    return f'{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame: types.FrameType | None) -> str:
+    """The stack of the frame in the collapsed format(outermost frame first,
+    separated by `;`).
+    """
+    names = []
+
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+
+    return ';'.join(reversed(names))
+
+
+def sample_stacks(thread_id: int, duration: float, interval: float) -> Counter[str]:
+    """Samples the stack of the thread every `interval` seconds for `duration`
+    seconds, must be called from another thread. Returns the number of
+    samples of each collapsed stack.
+    """
+    stacks: Counter[str] = Counter()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        if (frame := sys._current_frames().get(thread_id)) is not None:
+            stacks[collapse(frame)] += 1
+            del frame
+
+        time.sleep(interval)
+
+    return stacks
+
+
+def write_collapsed(path: Path, stacks: Counter[str]) -> None:
+    """Writes `{stack} {count}` lines(flamegraph.pl, speedscope), the file
+    appears only once complete.
+    """
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()))
+    tmp.replace(path)
+
+
+def read_collapsed(path: Path) -> Counter[str]:
+    stacks: Counter[str] = Counter()
+
+    for line in path.read_text().splitlines():
+        stack, _, count = line.rpartition(' ')
+
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+
+    return stacks
+
+
+def merge_collapsed(paths: list[Path]) -> Counter[str]:
+    """Merges the files of the processes, the stacks are prefixed with the
+    file name(`parent-{pid}`, `worker-{pid}`).
+    """
+    merged: Counter[str] = Counter()
+
+    for path in paths:
+        for stack, count in read_collapsed(path).items():
+            merged[f'{path.stem};{stack}'] += count
+
+    return merged
+
+
+def session_dir(output_dir: Path, session: int) -> Path:
+    """Directory of the profiling session(Unix time in milliseconds)."""
+    started = datetime.datetime.fromtimestamp(session / 1000)
+    return output_dir.joinpath(f'{started:%Y%m%dT%H%M%S}.{session % 1000:03d}')
+
+
+class ProfileRequest:
+    """Profiling session shared with the pool workers, passed to the pool
+    initializer(process creation). The workers wait for a new session on a
+    condition, so they do nothing until profiling is requested.
+    """
+    def __init__(self, ctx: multiprocessing.context.BaseContext | None=None) -> None:
+        ctx = ctx or multiprocessing.get_context()
+        self._cond = ctx.Condition()
+        self._session = ctx.RawValue('q', 0)
+        self._duration = ctx.RawValue('d', 0.)
+        self._interval = ctx.RawValue('d', 0.)
+
+    @property
+    def session(self) -> int:
+        return self._session.value
+
+    def publish(self, session: int, duration: float, interval: float) -> None:
+        """Starts a session, blocks until the waiting workers are woken up."""
+        with self._cond:
+            self._duration.value = duration
+            self._interval.value = interval
+            self._session.value = session
+            self._cond.notify_all()
+
+    def wait(self, last: int) -> tuple[int, float, float]:
+        """Waits for a session other than `last`, returns it along with its
+        duration and interval.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._session.value != last)
+            return self._session.value, self._duration.value, self._interval.value
+
+
+def _serve_worker(request: ProfileRequest, output_dir: Path, thread_id: int) -> None:
+    session = request.session
+
+    while True:
+        session, duration, interval = request.wait(session)
+
+        try:
+            stacks = sample_stacks(thread_id, duration, interval)
+            path = session_dir(output_dir, session).joinpath(f'worker-{os.getpid()}.collapsed')
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_collapsed(path, stacks)
+        except Exception as exc:
+            get_app_logger().warning('Worker profiling error: %r', exc)
+
+
+def start_worker_profiler(request: ProfileRequest, output_dir: str | Path) -> None:
+    """Starts the profiler thread of a pool worker(called by the pool
+    initializer), it samples the thread of the initializer, which runs the
+    tasks.
+    """
+    threading.Thread(
+        target=_serve_worker,
+        args=(request, Path(output_dir), threading.get_ident()),
+        name='profiler',
+        daemon=True,
+    ).start()
+
+
+class Profiler:
+    """On-demand statistical profiler of the event loop thread of this
+    process and of the pool workers sharing the `request`. A session samples
+    the stacks of every process for `duration` seconds and writes the
+    collapsed stacks to `{output_dir}/{time}/`: `parent-{pid}.collapsed`,
+    `worker-{pid}.collapsed` and `merged.collapsed` with the stacks of all
+    processes under their file names. Nothing runs between the sessions.
+    """
+    def __init__(
+        self,
+        output_dir: str | Path,
+        request: ProfileRequest,
+        worker_pids: Callable[[], list[int]],
+        duration: float=30.,
+        interval: float=0.005,
+        max_duration: float=300.,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._output_dir = Path(output_dir)
+        self._request = request
+        self._worker_pids = worker_pids
+        self._duration = duration
+        self._interval = interval
+        self._max_duration = max_duration
+        self._running = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(
+        self,
+        duration: float | None=None,
+        interval: float | None=None,
+    ) -> Path:
+        """Runs a session(called from the event loop), returns its directory."""
+        if self._running:
+            raise ProfilingError('Profiling is already running.')
+
+        duration = self._duration if duration is None else duration
+
+        if not 0 < duration <= self._max_duration:
+            raise ProfilingError(f'The duration must be in (0, {self._max_duration}] sec.')
+
+        interval = self._interval if interval is None else interval
+
+        if not 0 < interval <= 1:
+            raise ProfilingError('The interval must be in (0, 1] sec.')
+
+        self._running = True
+
+        try:
+            return await self._profile(duration, interval)
+        finally:
+            self._running = False
+
+    async def _profile(self, duration: float, interval: float) -> Path:
+        thread_id = threading.get_ident()
+        session = time.time_ns() // 1_000_000
+        directory = session_dir(self._output_dir, session)
+        directory.mkdir(parents=True, exist_ok=True)
+        pids = self._worker_pids()
+        self._log.info(
+            'Profiling the process and %s workers for %s sec: %s',
+            len(pids), duration, directory,
+        )
+
+        # `notify_all` waits for the workers to wake up.
+        await asyncio.to_thread(self._request.publish, session, duration, interval)
+        stacks = await asyncio.to_thread(sample_stacks, thread_id, duration, interval)
+        write_collapsed(directory.joinpath(f'parent-{os.getpid()}.collapsed'), stacks)
+
+        expected = [directory.joinpath(f'worker-{pid}.collapsed') for pid in pids]
+        deadline = time.monotonic() + WORKER_TIMEOUT
+
+        while not all(x.exists() for x in expected):
+            if time.monotonic() > deadline:
+                self._log.warning(
+                    'Profiles of workers %s are missing',
+                    [pid for pid, x in zip(pids, expected) if not x.exists()],
+                )
+                break
+
+            await asyncio.sleep(0.1)
+
+        files = sorted([*directory.glob('parent-*.collapsed'), *directory.glob('worker-*.collapsed')])
+        merged = merge_collapsed(files)
+        write_collapsed(directory.joinpath('merged.collapsed'), merged)
+        self._log.info(
+            'Profiling done: %s samples of %s processes, %s',
+            sum(merged.values()), len(files), directory,
+        )
+        return directory
+
+    def start(self, duration: float | None=None, interval: float | None=None) -> None:
+        """Runs a session in the background, e.g. from a signal handler."""
+        if self._running:
+            self._log.warning('Profiling is already running.')
+            return
+
+        async def run() -> None:
+            try:
+                await self.profile(duration, interval)
+            except Exception as exc:
+                self._log.error('Profiling error: %r', exc)
+
+        self._task = asyncio.get_running_loop().create_task(run())
+
+    async def handle(self, query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+        """`GET /profile?seconds=30&interval=0.005` of `MetricsServer`:
+        responds when the session is done, with its files.
+        """
+        try:
+            duration = float(query['seconds'][0]) if 'seconds' in query else None
+            interval = float(query['interval'][0]) if 'interval' in query else None
+        except ValueError:
+            return 400, 'text/plain', b'Invalid "seconds" or "interval"\n'
+
+        if self._running:
+            return 409, 'text/plain', b'Profiling is already running\n'
+
+        try:
+            directory = await self.profile(duration, interval)
+        except ProfilingError as exc:
+            return 400, 'text/plain', f'{exc}\n'.encode()
+
+        body = {
+            'dir': str(directory),
+            'files': sorted(x.name for x in directory.glob('*.collapsed')),
+        }
+        return 200, 'application/json', orjson.dumps(body)
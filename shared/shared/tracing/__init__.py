@@ -0,0 +1,13 @@
+from .tracing import Span
+from .tracing import SpanContext
+from .tracing import Tracer
+from .tracing import TRACEPARENT_HEADER
+from .tracing import setup_tracing
+from .tracing import get_tracing_setup
+from .tracing import get_tracer
+from .tracing import current_span_context
+from .tracing import inject
+from .tracing import extract
+from .exporters import SpanExporter
+from .exporters import NoopExporter
+from .exporters import JsonlFileExporter
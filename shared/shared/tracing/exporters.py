@@ -0,0 +1,72 @@
+import os
+import abc
+import importlib
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+
+class SpanExporter(abc.ABC):
+    @abc.abstractmethod
+    def export(self, span: dict[str, Any]) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class NoopExporter(SpanExporter):
+    def export(self, span: dict[str, Any]) -> None:
+        pass
+
+
+class JsonlFileExporter(SpanExporter):
+    """Appends spans to a JSON Lines file. Each span is written by a single
+    `write` to a file opened with `O_APPEND`, so several processes(e.g. pool
+    workers) can share the file.
+    """
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path).expanduser()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd: int | None = None
+        self._pid: int | None = None
+
+    def _get_fd(self) -> int:
+        # The file is reopened in a forked process.
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+
+        return self._fd
+
+    def export(self, span: dict[str, Any]) -> None:
+        os.write(self._get_fd(), orjson.dumps(span, default=str) + b'\n')
+
+    def shutdown(self) -> None:
+        if self._fd is not None and self._pid == os.getpid():
+            os.close(self._fd)
+
+        self._fd = None
+
+
+def create_exporter(name: str, path: str | Path | None=None) -> SpanExporter:
+    """Creates an exporter by name: `none`, `jsonl` or an import path of an
+    exporter factory `package.module:attr`, called with `path`.
+    """
+    match name:
+        case 'none':
+            return NoopExporter()
+        case 'jsonl':
+            if not path:
+                raise ValueError('The "jsonl" span exporter requires a file path')
+
+            return JsonlFileExporter(path)
+        case _:
+            module_name, _, attr = name.partition(':')
+
+            if not attr:
+                raise ValueError(f'Unknown span exporter "{name}"')
+
+            factory = getattr(importlib.import_module(module_name), attr)
+            return factory(path)
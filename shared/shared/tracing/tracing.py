@@ -0,0 +1,272 @@
+import os
+import time
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+from typing import Iterator
+from typing import Mapping
+from typing import MutableMapping
+
+from .exporters import SpanExporter
+from .exporters import create_exporter
+
+
+TRACEPARENT_HEADER = 'traceparent'  # W3C Trace Context
+
+
+@dataclass(frozen=True, slots=True)
+class SpanContext:
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+    sampled: bool
+
+    def to_traceparent(self) -> str:
+        return f'00-{self.trace_id}-{self.span_id}-{"01" if self.sampled else "00"}'
+
+    @classmethod
+    def from_traceparent(cls, value: Any) -> 'SpanContext | None':
+        if isinstance(value, bytes):
+            value = value.decode('latin-1')
+
+        if not isinstance(value, str):
+            return None
+
+        try:
+            version, trace_id, span_id, flags = value.strip().split('-')
+            int(trace_id, 16)
+            int(span_id, 16)
+            sampled = bool(int(flags, 16) & 1)
+        except ValueError:
+            return None
+
+        if len(trace_id) != 32 or len(span_id) != 16 or version == 'ff':
+            return None
+
+        return cls(trace_id=trace_id, span_id=span_id, sampled=sampled)
+
+
+_current_context: ContextVar[SpanContext | None] = ContextVar(
+    'current_span_context', default=None,
+)
+
+
+class Span:
+    __slots__ = (
+        'name', 'context', 'parent_id', 'kind', 'start', 'end',
+        'attributes', 'error',
+    )
+
+    def __init__(
+        self,
+        name: str,
+        context: SpanContext,
+        parent_id: str | None=None,
+        kind: str='internal',
+        attributes: dict[str, Any] | None=None,
+    ) -> None:
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.time()
+        self.end: float | None = None
+        self.attributes = attributes or {}
+        self.error: str | None = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self.context.sampled
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.error = repr(exc)
+
+    def to_dict(self, service: str) -> dict[str, Any]:
+        end = self.end or time.time()
+        return {
+            'trace_id': self.context.trace_id,
+            'span_id': self.context.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'service': service,
+            'pid': os.getpid(),
+            'start': self.start,
+            'end': end,
+            'duration': end - self.start,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _NonRecordingSpan(Span):
+    """A span of a trace that is not sampled. It only carries the context."""
+    __slots__ = ()
+
+    def __init__(self, context: SpanContext) -> None:
+        self.context = context
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+class Tracer:
+    def __init__(
+        self,
+        service: str,
+        exporter: SpanExporter,
+        sample_rate: float=1.,
+    ) -> None:
+        self.service = service
+        self._exporter = exporter
+        self._sample_rate = sample_rate
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    @contextmanager
+    def start_span(
+        self,
+        name: str,
+        parent: SpanContext | None=None,
+        kind: str='internal',
+        attributes: dict[str, Any] | None=None,
+    ) -> Iterator[Span]:
+        """Starts a child span of `parent` or of the current span. A span
+        without a parent starts a new trace, sampled with the configured rate.
+        """
+        parent = parent or _current_context.get()
+
+        if parent:
+            trace_id = parent.trace_id
+            sampled = parent.sampled
+        else:
+            trace_id = random.getrandbits(128).to_bytes(16).hex()
+            sampled = random.random() < self._sample_rate
+
+        context = SpanContext(
+            trace_id=trace_id,
+            span_id=random.getrandbits(64).to_bytes(8).hex(),
+            sampled=sampled,
+        )
+        token = _current_context.set(context)
+
+        if not sampled:
+            try:
+                yield _NonRecordingSpan(context)
+            finally:
+                _current_context.reset(token)
+
+            return
+
+        span = Span(
+            name=name,
+            context=context,
+            parent_id=parent.span_id if parent else None,
+            kind=kind,
+            attributes=attributes,
+        )
+
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_context.reset(token)
+            span.end = time.time()
+            self._exporter.export(span.to_dict(self.service))
+
+    def shutdown(self) -> None:
+        self._exporter.shutdown()
+
+
+class _NoopTracer(Tracer):
+    def __init__(self) -> None:
+        pass
+
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    @contextmanager
+    def start_span(self, name: str, *args: Any, **kwargs: Any) -> Iterator[Span]:
+        yield _NOOP_SPAN
+
+    def shutdown(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NonRecordingSpan(SpanContext('0' * 32, '0' * 16, False))
+_noop_tracer = _NoopTracer()
+_tracer: Tracer = _noop_tracer
+_setup_args: dict[str, Any] | None = None
+
+
+def setup_tracing(
+    service: str,
+    exporter: str='none',
+    path: str | None=None,
+    sample_rate: float=1.,
+) -> Tracer:
+    """Sets up the process tracer. With the `none` exporter or zero sample
+    rate the tracer is disabled.
+    """
+    global _tracer, _setup_args
+
+    _tracer.shutdown()
+    _setup_args = dict(
+        service=service,
+        exporter=exporter,
+        path=str(path) if path else None,
+        sample_rate=sample_rate,
+    )
+
+    if exporter == 'none' or sample_rate <= 0:
+        _tracer = _noop_tracer
+    else:
+        _tracer = Tracer(
+            service=service,
+            exporter=create_exporter(exporter, path),
+            sample_rate=sample_rate,
+        )
+
+    return _tracer
+
+
+def get_tracing_setup() -> dict[str, Any] | None:
+    """Returns `setup_tracing` arguments, e.g. to set up tracing in a worker
+    process.
+    """
+    return _setup_args
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def current_span_context() -> SpanContext | None:
+    return _current_context.get()
+
+
+def inject(headers: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+    """Adds the context of the current span to the headers."""
+    if context := _current_context.get():
+        headers[TRACEPARENT_HEADER] = context.to_traceparent()
+
+    return headers
+
+
+def extract(headers: Mapping[str, Any] | None) -> SpanContext | None:
+    if not headers:
+        return None
+
+    return SpanContext.from_traceparent(headers.get(TRACEPARENT_HEADER))
@@ -1,3 +1,4 @@
 from .utils import cpu_count
 from .utils import utcnow
 from .utils import asyncio_debug_mode
+from .loop_monitor import LoopMonitor
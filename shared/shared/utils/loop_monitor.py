@@ -0,0 +1,137 @@
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Histogram
+
+
+STACK_LIMIT = 8  # Innermost frames of the captured stack
+
+LOOP_LAG = Histogram(
+    'event_loop_lag_seconds',
+    'Delay of the event loop heartbeat behind its schedule',
+    ['loop'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10.),
+)
+LOOP_BLOCKED = Counter(
+    'event_loop_blocked',
+    'Heartbeats delayed by more than the slow threshold',
+    ['loop'],
+)
+LOOP_STACKS = Counter(
+    'event_loop_blocked_stacks',
+    'Stacks of the blocking code captured by the watchdog',
+    ['loop'],
+)
+
+
+class LoopMonitor:
+    """Measures the scheduling lag of the running event loop with a periodic
+    heartbeat(`interval`) and records it in the `event_loop_lag_seconds`
+    histogram. A watchdog thread checks the heartbeat: if the loop has not
+    run it for `slow` seconds longer than expected, the stack of the loop
+    thread is captured while it is still blocked and logged along with the
+    lag once the loop recovers.
+
+    Unlike the asyncio debug mode, the cost is one timer per `interval` in
+    the loop and a thread waking up every `slow / 2` seconds.
+    """
+    def __init__(
+        self,
+        name: str='main',
+        interval: float=0.5,
+        slow: float=0.1,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._name = name
+        self._interval = interval
+        self._slow = slow
+        self._lag = LOOP_LAG.labels(name)
+        self._blocked = LOOP_BLOCKED.labels(name)
+        self._stacks = LOOP_STACKS.labels(name)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id = 0
+        self._heartbeat_task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+        # Written by the loop, read by the watchdog
+        self._beat_id = 0
+        self._beat_due = 0.  # `time.monotonic()` of the next expected heartbeat
+        self._stack: tuple[int, str] | None = None  # (beat id, stack)
+
+    def start(self) -> None:
+        """Starts monitoring the running loop(called from a coroutine)."""
+        if self._heartbeat_task:
+            raise RuntimeError('LoopMonitor already started.')
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat_due = time.monotonic() + self._interval
+        self._heartbeat_task = self._loop.create_task(self._heartbeat())
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            name=f'loop-monitor-{self._name}',
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat_due = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(time.monotonic() - self._beat_due, 0.)
+            self._lag.observe(lag)
+            self._beat_id += 1
+
+            if lag < self._slow:
+                continue
+
+            self._blocked.inc()
+            stack = self._stack
+
+            if stack and stack[0] == self._beat_id - 1:
+                self._log.warning(
+                    'Event loop "%s" was blocked for %.3f sec at(innermost first):\n%s',
+                    self._name, lag, stack[1],
+                )
+            else:
+                self._log.warning('Event loop "%s" was blocked for %.3f sec', self._name, lag)
+
+    def _watch(self) -> None:
+        captured = -1  # Beat id of the last capture, one stack per blocking
+
+        while not self._stopped.wait(self._slow / 2):
+            beat_id = self._beat_id
+
+            if beat_id == captured or time.monotonic() - self._beat_due < self._slow:
+                continue
+
+            if (frame := sys._current_frames().get(self._loop_thread_id)) is None:
+                continue
+
+            # Innermost frame first, it is kept if the log record is truncated.
+            stack = traceback.format_stack(frame, STACK_LIMIT)
+            self._stack = (beat_id, ''.join(reversed(stack)))
+            self._stacks.inc()
+            captured = beat_id
+            del frame
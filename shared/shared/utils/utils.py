@@ -2,10 +2,12 @@ import os
 import asyncio
 import logging
 import datetime
+from typing import TYPE_CHECKING
 
 import psutil
 
-from shared.config.config import SharedConfig
+if TYPE_CHECKING:
+    from shared.config.config import SharedConfig
 
 
 def cpu_count() -> int:
@@ -27,7 +29,7 @@ def utcnow() -> datetime.datetime:
     return datetime.datetime.now(datetime.UTC)
 
 
-def asyncio_debug_mode(config: SharedConfig):
+def asyncio_debug_mode(config: 'SharedConfig'):
     if config.asyncio_debug:
         logging.getLogger('asyncio').setLevel(config.asyncio_log_level)
         loop = asyncio.get_running_loop()
@@ -1,10 +1,16 @@
 import asyncio
+from contextlib import AsyncExitStack
 
 import uvloop
 
 from shared.config import task_processor_config as config
 from shared.logging import setup_app_logger
 from shared.db.core import create_db
+from shared.metrics import MetricsServer
+from shared.dist_tasks.events import EventPublisher
+from shared.dist_tasks.results import ResultPublisher
+from shared.tracing import setup_tracing
+from shared.utils import LoopMonitor
 
 from task_processor.consumer import Consumer
 
@@ -14,20 +20,85 @@ setup_app_logger(
     level=config.log_level,
     max_length=config.log_record_max_len,
     fmt=config.log_fmt,
+    json=config.log_json,
+    queued=config.log_queued,
+    debug_sample_rate=config.log_debug_sample_rate,
+    debug_rate_limit=config.log_debug_rate_limit,
+)
+setup_tracing(
+    service=config.app_name,
+    exporter=config.tracing_exporter,
+    path=config.tracing_path,
+    sample_rate=config.tracing_sample_rate,
 )
 
 
 async def main():
-    create_db()
-
-    async with Consumer(
-        conn_url=config.rabbitmq_uri,
-        exchange_name=config.rabbitmq_exchange,
-        queue_name=config.rabbitmq_queue,
-        routing_key=config.rabbitmq_routing_key,
-        workers_num=config.consumer_workers_num,
-        prefetch_count=config.consumer_prefetch_count,
-    ) as consumer:
+    if not config.consumer_results_via_broker:
+        create_db()
+
+    async with AsyncExitStack() as stack:
+        metrics_server = None
+
+        if config.metrics_enabled:
+            metrics_server = await stack.enter_async_context(
+                MetricsServer(host=config.metrics_host, port=config.metrics_port)
+            )
+
+        if config.loop_monitor_interval:
+            loop_monitor = LoopMonitor(interval=config.loop_monitor_interval, slow=config.asyncio_slow)
+            loop_monitor.start()
+            stack.push_async_callback(loop_monitor.stop)
+
+        events_publisher = None
+
+        if config.rabbitmq_events_exchange:
+            # Entered before the consumer, so it is closed after the pending tasks.
+            events_publisher = await stack.enter_async_context(
+                EventPublisher(
+                    conn_url=config.rabbitmq_uri,
+                    exchange_name=config.rabbitmq_events_exchange,
+                    app_name=config.app_name,
+                )
+            )
+
+        results_publisher = None
+
+        if config.consumer_results_via_broker:
+            results_publisher = await stack.enter_async_context(
+                ResultPublisher(
+                    conn_url=config.rabbitmq_uri,
+                    exchange_name=config.rabbitmq_results_exchange,
+                    queue_name=config.rabbitmq_results_queue,
+                    app_name=config.app_name,
+                )
+            )
+
+        consumer = Consumer(
+            conn_url=config.rabbitmq_uri,
+            exchange_name=config.rabbitmq_exchange,
+            queue_name=config.rabbitmq_queue,
+            routing_key=config.rabbitmq_routing_key,
+            workers_num=config.consumer_workers_num,
+            prefetch_count=config.consumer_prefetch_count,
+            queue_depth_interval=config.consumer_queue_depth_interval,
+            concurrent_stages_min_size=config.consumer_concurrent_stages_min_size,
+            events_publisher=events_publisher,
+            results_publisher=results_publisher,
+            profiling_dir=config.profiling_dir if config.profiling_enabled else None,
+            profiling_duration=config.profiling_duration,
+            profiling_interval=config.profiling_interval,
+            mp_context=config.consumer_mp_context,
+            preload=config.consumer_preload,
+            prestart_workers=config.consumer_prestart_workers,
+            partitions=config.rabbitmq_partitions,
+            membership_interval=config.consumer_membership_interval,
+        )
+        await stack.enter_async_context(consumer)
+
+        if metrics_server and consumer.profiler:
+            metrics_server.add_handler('/profile', consumer.profiler.handle)
+
         await consumer.run()
 
 
@@ -1,6 +1,11 @@
 import os
+import time
+import asyncio
 from uuid import UUID
 from typing import Any
+from typing import cast
+from typing import Callable
+from contextvars import ContextVar
 
 import orjson
 from pydantic import ValidationError
@@ -8,83 +13,332 @@ from pydantic import ValidationError
 from shared.logging import get_app_logger
 from shared.dist_tasks.consumer import Consumer as BaseConsumer
 from shared.dist_tasks.consumer import DeterministicError
+from shared.dist_tasks.consumer import MessageInfo
+from shared.dist_tasks.events import EventPublisher
+from shared.dist_tasks.results import ResultPublisher
+from shared.dist_tasks.headers import TRUSTED_HEADER
 from shared.utils import utcnow
 from shared.db.core import Session
+from shared.db.core import DB_OPERATION_DURATION
 from shared.db.models.tasks import Task
 from shared.db.models.tasks import TaskDTO
 from shared.db.models.tasks import TaskStatus
+from shared.db.models.timings import TaskTiming
+from shared.metrics import Counter
+from shared.tracing import get_tracer
 
-from .text_utils import count_words
-from .text_utils import detect_language
-from .text_utils import clean_text
 from .text_utils import LangDetectError
+from .pipeline import STAGES
+from .pipeline import get_pipeline
+from .pipeline import check_pipelines
+from .pipeline import split_into_levels
+from .pipeline import run_stages
+from .timing import TaskTimer
 
 
 COMPLETED = TaskStatus.completed
 FAILED = TaskStatus.failed
 FAILED_FIN = TaskStatus.failed_final
 
+TASKS_SAVED = Counter(
+    'tasks_saved',
+    'Task results written to the DB by status',
+    ['status'],
+)
+
+
+# Results of the current call of a worker, set by `_CollectResults` if the
+# results are published by the consumer instead of being written to the DB.
+_collected: list[dict[str, Any]] | None = None
+# Results of the task handled by the current asyncio task of the consumer.
+_task_results: ContextVar[list[dict[str, Any]] | None] = ContextVar('task_results', default=None)
+
+
+class _CollectResults:
+    """Calls `func` in a worker and returns its result with the results
+    collected by `_upsert` instead of writing them. The results are attached
+    to the exception(`results`) if the call fails.
+    """
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.func = func
+        self.__name__ = func.__name__  # The name of the worker span
+
+    def __call__(self, *args: Any) -> tuple[Any, list[dict[str, Any]]]:
+        global _collected
+        _collected = collected = []
 
-def _upsert(**values):
-    with Session() as session:
         try:
+            result = self.func(*args)
+        except BaseException as exc:
+            exc.results = collected  # type: ignore[attr-defined]
+            raise
+        finally:
+            _collected = None
+
+        return result, collected
+
+
+def _upsert(timer: TaskTimer | None=None, **values):
+    if _collected is not None:
+        _collected.append({
+            'task': {'updated_at': utcnow(), **values},
+            'timing': timer.values() if timer else None,
+        })
+        return
+
+    with (
+        get_tracer().start_span('db.upsert', attributes={'status': values['status']}),
+        DB_OPERATION_DURATION.labels('upsert').time(),
+        Session() as session,
+    ):
+        try:
+            started = time.perf_counter()
             Task.upsert(session, updated_at=utcnow(), **values)
+
+            if timer:
+                TaskTiming.upsert(
+                    session,
+                    task_id=values['task_id'],
+                    db_wall=time.perf_counter() - started,
+                    **timer.values(),
+                )
+
             session.commit()
         except Exception:
             session.rollback()
             raise
 
+    TASKS_SAVED.labels(values['status']).inc()
+
+
+def _load_task(
+    task_id: Any,
+    data: bytes,
+    timer: TaskTimer,
+    trusted: bool=False,
+) -> tuple[UUID, TaskDTO]:
+    try:
+        task_id = UUID(task_id)
+    except Exception as exc:
+        # No task_id, so nothing is written to the database.
+        raise DeterministicError('Invalid task_id(must be UUID string)')
+
+    try:
+        with timer.measure('load'):
+            if trusted:
+                # Validated by `web_api`, the second validation is skipped.
+                dto = TaskDTO.from_trusted(orjson.loads(data))
+            else:
+                dto = TaskDTO.model_validate(orjson.loads(data))
+    except orjson.JSONDecodeError as exc:
+        _upsert(task_id=task_id, status=FAILED_FIN, cause='Invalid JSON')
+        raise DeterministicError(exc)
+    except (ValidationError, KeyError, TypeError, ValueError) as exc:
+        _upsert(task_id=task_id, status=FAILED_FIN, cause='Invalid task DTO')
+        raise DeterministicError(exc)
+
+    return task_id, dto
+
+
+def _start_task(
+    task_id: Any,
+    data: bytes,
+    info: MessageInfo,
+) -> tuple[UUID, TaskDTO, TaskTimer]:
+    timer = TaskTimer(info)
+    task_id, dto = _load_task(
+        task_id, data, timer, trusted=bool(info.headers.get(TRUSTED_HEADER)),
+    )
+    return task_id, dto, timer
+
+
+def _run_stages(
+    task_id: UUID,
+    dto: TaskDTO,
+    stage_names: list[str],
+    timer: TaskTimer,
+    fields: dict[str, Any] | None=None,
+) -> dict[str, Any]:
+    stages = tuple(STAGES[name] for name in stage_names)
+
+    try:
+        return run_stages(dto.original_text, stages, fields, timer)
+    except LangDetectError as exc:
+        _upsert(
+            timer=timer,
+            task_id=task_id,
+            original_text=dto.original_text,
+            status=FAILED_FIN,
+            type=dto.type,
+            cause='lang detect error',
+        )
+        raise DeterministicError(exc)
+    except Exception as exc:
+        _upsert(
+            timer=timer,
+            task_id=task_id,
+            original_text=dto.original_text,
+            status=FAILED,
+            type=dto.type,
+            cause=repr(exc),
+        )
+        raise
+
+
+def _run_stage(
+    task_id: UUID,
+    dto: TaskDTO,
+    stage_name: str,
+    timer: TaskTimer,
+    fields: dict[str, Any],
+) -> tuple[dict[str, Any], TaskTimer]:
+    # The timer was pickled from the worker that started the task
+    timer.rebase_rss()
+    fields = _run_stages(task_id, dto, [stage_name], timer, fields)
+    return fields, timer
+
+
+def _save_result(
+    task_id: UUID,
+    dto: TaskDTO,
+    fields: dict[str, Any],
+    timer: TaskTimer,
+) -> None:
+    _upsert(
+        timer=timer,
+        task_id=task_id,
+        original_text=dto.original_text,
+        status=COMPLETED,
+        type=dto.type,
+        **fields,
+    )
+
 
 class Consumer(BaseConsumer):
+    def __init__(
+        self,
+        *args,
+        concurrent_stages_min_size: int | None=None,
+        events_publisher: EventPublisher | None=None,
+        results_publisher: ResultPublisher | None=None,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        check_pipelines()
+        self._concurrent_stages_min_size = concurrent_stages_min_size
+        self._events_publisher = events_publisher
+        # If set, the results are published to the ingester instead of being
+        # written to the DB by the workers, the ingester publishes the events.
+        self._results_publisher = results_publisher
+
     @staticmethod
-    def task(task_id: Any, data: bytes) -> None:
+    def task(task_id: Any, data: bytes, info: MessageInfo) -> None:
         log = get_app_logger()
         log.debug('Received task: %s, pid: %s', task_id, os.getpid())
 
+        task_id, dto, timer = _start_task(task_id, data, info)
+        stage_names = [x.name for x in get_pipeline(dto.type)]
+        fields = _run_stages(task_id, dto, stage_names, timer)
+        _save_result(task_id, dto, fields, timer)
+
+    async def process(self, task_id: str, body: bytes, info: MessageInfo) -> None:
+        if self._results_publisher:
+            return await self._process_publishing_results(task_id, body, info)
+
         try:
-            task_id = UUID(task_id)
-        except Exception as exc:
-            # No task_id, so nothing is written to the database.
-            raise DeterministicError('Invalid task_id(must be UUID string)')
+            await self._process(task_id, body, info)
+        except DeterministicError:
+            await self._publish_event(task_id, FAILED_FIN)
+            raise
+        except Exception:
+            await self._publish_event(task_id, FAILED)
+            raise
+
+        await self._publish_event(task_id, COMPLETED)
+
+    async def _publish_event(self, task_id: str, status: TaskStatus) -> None:
+        """Notifies subscribers(`web_api`) that the task result was saved."""
+        if not self._events_publisher:
+            return
 
         try:
-            dto = TaskDTO.model_validate(orjson.loads(data))
-        except orjson.JSONDecodeError as exc:
-            _upsert(task_id=task_id, status=FAILED_FIN, cause='Invalid JSON')
-            raise DeterministicError(exc)
-        except ValidationError as exc:
-            _upsert(task_id=task_id, status=FAILED_FIN, cause='Invalid task DTO')
-            raise DeterministicError(exc)
+            task_id = UUID(task_id).hex
+        except ValueError:
+            return  # Nothing was saved
 
         try:
-            word_count = count_words(dto.original_text)
-            language = detect_language(dto.original_text)
-            processed_text = clean_text(dto.original_text)
-        except LangDetectError as exc:
-            _upsert(
-                task_id=task_id,
-                original_text=dto.original_text,
-                status=FAILED_FIN,
-                type=dto.type,
-                cause='lang detect error',
+            await self._events_publisher.publish(
+                {'task_id': task_id, 'status': status, 'updated_at': time.time()}
             )
-            raise DeterministicError(exc)
         except Exception as exc:
-            _upsert(
-                task_id=task_id,
-                original_text=dto.original_text,
-                status=FAILED,
-                type=dto.type,
-                cause=repr(exc),
-            )
+            self._log.warning('Unable to publish the event of task %s: %r', task_id, exc)
+
+    async def _process_publishing_results(
+        self,
+        task_id: str,
+        body: bytes,
+        info: MessageInfo,
+    ) -> None:
+        """Publishes the results of the task(also of a failed one) before
+        the message is acknowledged. If publishing fails, the message is
+        requeued.
+        """
+        results: list[dict[str, Any]] = []
+        token = _task_results.set(results)
+
+        try:
+            await self._process(task_id, body, info)
+        finally:
+            _task_results.reset(token)
+
+            if results:
+                await cast(ResultPublisher, self._results_publisher).publish(task_id, results)
+
+    async def run_in_executor(self, func: Callable[..., Any], *args: Any) -> Any:
+        if (results := _task_results.get()) is None:
+            return await super().run_in_executor(func, *args)
+
+        try:
+            result, collected = await super().run_in_executor(_CollectResults(func), *args)
+        except BaseException as exc:
+            results.extend(getattr(exc, 'results', ()))
             raise
 
-        _upsert(
-            task_id=task_id,
-            original_text=dto.original_text,
-            processed_text=processed_text,
-            word_count=word_count,
-            language=language,
-            status=COMPLETED,
-            type=dto.type,
+        results.extend(collected)
+        return result
+
+    async def _process(self, task_id: str, body: bytes, info: MessageInfo) -> None:
+        min_size = self._concurrent_stages_min_size
+
+        if not min_size or len(body) < min_size:
+            return await super().process(task_id, body, info)
+
+        # Large input: independent stages run concurrently in different workers.
+        uuid_task_id, dto, timer = await self.run_in_executor(
+            _start_task, task_id, body, info,
         )
+        fields: dict[str, Any] = {}
+
+        for level in split_into_levels(get_pipeline(dto.type)):
+            results = await asyncio.gather(
+                *(
+                    self.run_in_executor(
+                        _run_stage, uuid_task_id, dto, stage.name, timer, fields,
+                    )
+                    for stage in level
+                ),
+                return_exceptions=True,
+            )
+            errors = [x for x in results if isinstance(x, BaseException)]
+
+            if errors:
+                raise next(
+                    (x for x in errors if isinstance(x, DeterministicError)),
+                    errors[0],
+                )
+
+            for stage_fields, stage_timer in results:
+                fields.update(stage_fields)
+                timer.merge(stage_timer)
+
+        await self.run_in_executor(_save_result, uuid_task_id, dto, fields, timer)
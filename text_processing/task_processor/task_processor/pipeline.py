@@ -0,0 +1,141 @@
+from functools import cache
+from dataclasses import dataclass
+from typing import Any
+from typing import Callable
+
+from shared.config import task_processor_config as config
+from shared.db.models.tasks import TextTypeEnum
+
+from .text_utils import count_words
+from .text_utils import detect_language
+from .text_utils import clean_text
+from .timing import TaskTimer
+
+
+# A stage receives the original text and the fields produced by the previous
+# stages and returns the `Task` fields it produces.
+StageFunc = Callable[[str, dict[str, Any]], dict[str, Any]]
+
+
+class PipelineError(Exception):
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class Stage:
+    name: str
+    func: StageFunc
+    requires: tuple[str, ...] = ()  # Stages whose fields this stage reads
+
+
+STAGES: dict[str, Stage] = {}
+
+
+def register_stage(name: str, requires: tuple[str, ...]=()):
+    def decorator(func: StageFunc) -> StageFunc:
+        if name in STAGES:
+            raise PipelineError(f'Stage "{name}" is already registered')
+
+        STAGES[name] = Stage(name=name, func=func, requires=requires)
+        return func
+
+    return decorator
+
+
+@register_stage('count')
+def _count(text: str, fields: dict[str, Any]) -> dict[str, Any]:
+    return {'word_count': count_words(text)}
+
+
+@register_stage('detect')
+def _detect(text: str, fields: dict[str, Any]) -> dict[str, Any]:
+    return {'language': detect_language(text)}
+
+
+@register_stage('clean')
+def _clean(text: str, fields: dict[str, Any]) -> dict[str, Any]:
+    return {'processed_text': clean_text(text)}
+
+
+def build_pipeline(stage_names: list[str]) -> tuple[Stage, ...]:
+    stages = []
+    seen = set()
+
+    for name in stage_names:
+        try:
+            stage = STAGES[name]
+        except KeyError:
+            raise PipelineError(f'Unknown stage "{name}"')
+
+        if name in seen:
+            raise PipelineError(f'Duplicate stage "{name}"')
+
+        if missing := set(stage.requires) - seen:
+            raise PipelineError(
+                f'Stage "{name}" requires stages {sorted(missing)} to run before it'
+            )
+
+        seen.add(name)
+        stages.append(stage)
+
+    return tuple(stages)
+
+
+@cache
+def get_pipeline(text_type: TextTypeEnum) -> tuple[Stage, ...]:
+    """Returns the ordered stages configured for the text type. Stages that
+    are not listed for the type are skipped.
+    """
+    return build_pipeline(
+        config.pipeline_stages.get(text_type, config.pipeline_default_stages)
+    )
+
+
+def check_pipelines() -> None:
+    """Validates the pipelines of all text types (fail fast on startup)."""
+    if unknown := set(config.pipeline_stages) - set(TextTypeEnum):
+        raise PipelineError(f'Unknown text types: {sorted(unknown)}')
+
+    for text_type in TextTypeEnum:
+        get_pipeline(text_type)
+
+
+def split_into_levels(stages: tuple[Stage, ...]) -> list[tuple[Stage, ...]]:
+    """Splits the stages into consecutive groups of mutually independent
+    stages. Stages of the same group can be run concurrently.
+    """
+    levels: list[tuple[Stage, ...]] = []
+    level: list[Stage] = []
+    names: set[str] = set()
+
+    for stage in stages:
+        if names.intersection(stage.requires):
+            levels.append(tuple(level))
+            level = []
+            names = set()
+
+        level.append(stage)
+        names.add(stage.name)
+
+    if level:
+        levels.append(tuple(level))
+
+    return levels
+
+
+def run_stages(
+    text: str,
+    stages: tuple[Stage, ...],
+    fields: dict[str, Any] | None=None,
+    timer: TaskTimer | None=None,
+) -> dict[str, Any]:
+    fields = dict(fields or {})
+
+    for stage in stages:
+        if timer:
+            with timer.measure(stage.name):
+                fields.update(stage.func(text, fields))
+        else:
+            fields.update(stage.func(text, fields))
+
+    return fields
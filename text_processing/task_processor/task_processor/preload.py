@@ -0,0 +1,10 @@
+"""Imported before the pool workers run their first task(`CONSUMER_PRELOAD`):
+once by the fork server with the `forkserver` start method, by the parent
+process with `fork`, by each worker with `spawn`. The forked workers inherit
+the imported modules and the loaded language profiles.
+"""
+from .consumer import Consumer  # noqa: F401 (the task, models, sqlmodel)
+from .text_utils import load_detector
+
+
+load_detector()
@@ -1,10 +1,6 @@
 import re
-
-import langdetect
-
-
-# Language detection algorithm is non-deterministic. To enforce consistent results:
-langdetect.DetectorFactory.seed = 0
+from functools import cache
+from typing import Any
 
 
 class LangDetectError(Exception):
@@ -14,6 +10,22 @@ class LangDetectError(Exception):
 not_allowed_re = re.compile(r"[^-\w\s:(),.!?“”']")
 
 
+@cache
+def load_detector() -> Any:
+    """Returns the detector factory of `langdetect`. The import and the
+    language profiles(~0.3 sec) are loaded on first use, or in advance by
+    `task_processor.preload`.
+    """
+    from langdetect import DetectorFactory
+    from langdetect.detector_factory import PROFILES_DIRECTORY
+
+    # Language detection algorithm is non-deterministic. To enforce consistent results:
+    DetectorFactory.seed = 0
+    factory = DetectorFactory()
+    factory.load_profile(PROFILES_DIRECTORY)
+    return factory
+
+
 def count_words(text: str) -> int:
     words = text.split()
     return len(words)
@@ -21,9 +33,13 @@ def count_words(text: str) -> int:
 
 def detect_language(text: str) -> str:
     try:
-        lang = langdetect.detect(text)
+        detector = load_detector().create()
+        detector.append(text)
+        lang = detector.detect()
     except Exception as exc:
-        raise LangDetectError(exc)
+        # `langdetect` exceptions can't be unpickled, so only the message is
+        # kept: the error has to cross the process pool boundary.
+        raise LangDetectError(str(exc)) from exc
 
     if isinstance(lang, str) and lang.isalpha() and len(lang) == 2:
         return lang
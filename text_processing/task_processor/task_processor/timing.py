@@ -0,0 +1,105 @@
+import os
+import time
+import datetime
+from contextlib import contextmanager
+from typing import Any
+
+from shared.dist_tasks.consumer import MessageInfo
+from shared.metrics import Histogram
+from shared.tracing import get_tracer
+
+
+STAGE_DURATION = Histogram(
+    'task_stage_duration_seconds',
+    'Wall time of the task processing stages in workers',
+    ['stage'],
+)
+
+
+PAGE_SIZE_KIB = os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def _rss() -> int:
+    """Current resident set size of the process, KiB(0 if `/proc` is not
+    available). Unlike `ru_maxrss`, it is not a lifetime peak, so it shows
+    the memory of a task in a long-lived worker.
+    """
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE_KIB
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _to_datetime(ts: float | None) -> datetime.datetime | None:
+    if ts is None:
+        return None
+
+    return datetime.datetime.fromtimestamp(ts, datetime.UTC)
+
+
+class TaskTimer:
+    """Collects the timings of a task in workers. The timer is created when
+    the task starts in a worker and can be passed between processes.
+    """
+    def __init__(self, info: MessageInfo) -> None:
+        self.started_at = time.time()
+        self.published_at = info.published_at
+        self.received_at = info.received_at
+        self.queue_wait = info.queue_wait
+        self.executor_wait = max(self.started_at - info.received_at, 0.)
+        self.rss_started = _rss()
+        # Max growth of the RSS over its value at the start of the task(or of
+        # the stage in another worker, see `rebase_rss`), sampled after each
+        # stage(KiB).
+        self.peak_rss_delta = 0
+        self.stages: dict[str, dict[str, float]] = {}
+
+    def rebase_rss(self) -> None:
+        """Takes the RSS baseline in the current process: the RSS of the
+        process that started the task is meaningless in another worker.
+        """
+        self.rss_started = _rss()
+
+    @contextmanager
+    def measure(self, stage: str):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = _rss()
+
+        try:
+            with get_tracer().start_span(f'stage.{stage}'):
+                yield
+        finally:
+            wall = time.perf_counter() - wall
+            rss_after = _rss()
+            self.stages[stage] = {
+                'wall': wall,
+                'cpu': time.process_time() - cpu,
+                'rss_delta': rss_after - rss,
+            }
+            STAGE_DURATION.labels(stage).observe(wall)
+            self.peak_rss_delta = max(self.peak_rss_delta, rss_after - self.rss_started)
+
+    @property
+    def cpu(self) -> float:
+        return sum(x['cpu'] for x in self.stages.values())
+
+    def merge(self, other: 'TaskTimer') -> None:
+        """Merges the stages measured by another timer(in another worker)."""
+        self.stages.update(other.stages)
+        self.peak_rss_delta = max(self.peak_rss_delta, other.peak_rss_delta)
+
+    def values(self) -> dict[str, Any]:
+        """Returns `TaskTiming` values."""
+        return dict(
+            published_at=_to_datetime(self.published_at),
+            received_at=_to_datetime(self.received_at),
+            started_at=_to_datetime(self.started_at),
+            queue_wait=self.queue_wait,
+            executor_wait=self.executor_wait,
+            wall=time.time() - self.started_at,
+            cpu=self.cpu,
+            peak_rss_delta=self.peak_rss_delta,
+            stages=self.stages,
+        )
@@ -1,15 +1,32 @@
 import uvicorn
 
 from shared.config import web_api_config
+from shared.utils import cpu_count
 
 from web_api.app import app
+from web_api.supervisor import Supervisor
 
 
 if __name__ == '__main__':
+    workers_num = web_api_config.web_api_workers or cpu_count()
+
     uvicorn_config = uvicorn.Config(
-        app=app,
+        # Workers import the app by name
+        app='web_api.app:app' if workers_num > 1 else app,
         host=web_api_config.web_api_host,
         port=web_api_config.web_api_port,
+        timeout_graceful_shutdown=web_api_config.web_api_graceful_shutdown,
     )
-    server = uvicorn.Server(uvicorn_config)
-    server.run()
+
+    if workers_num > 1:
+        Supervisor(
+            config=uvicorn_config,
+            workers_num=workers_num,
+            start_timeout=web_api_config.web_api_worker_start_timeout,
+            report_interval=web_api_config.web_api_worker_report_interval,
+            metrics_host=web_api_config.metrics_host,
+            metrics_port=web_api_config.metrics_port,
+        ).run()
+    else:
+        server = uvicorn.Server(uvicorn_config)
+        server.run()
@@ -0,0 +1,149 @@
+import math
+import asyncio
+import logging
+from typing import cast
+
+from fastapi import HTTPException
+from fastapi import status
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Gauge
+from shared.dist_tasks.producer import Producer
+
+from .notifier import ResultNotifier
+
+
+ADMISSION_QUEUE_DEPTH = Gauge(
+    'admission_queue_depth',
+    'Messages ready in the task queue, as seen by the admission control',
+    multiprocess_mode='max',
+)
+ADMISSION_THROUGHPUT = Gauge(
+    'admission_throughput',
+    'Estimated messages processed by task_processor per second',
+    multiprocess_mode='max',
+)
+ADMISSION_REJECTED = Counter(
+    'admission_rejected',
+    'Tasks rejected by the admission control by text type and status code',
+    ['type', 'status'],
+)
+
+THROUGHPUT_SMOOTHING = 0.3  # Weight of the last interval in the moving average
+
+
+class AdmissionController:
+    """Tracks the depth of the task queue and the throughput of
+    `task_processor`, and rejects new tasks once the queue is deeper than
+    the threshold of their text type: `429` if the queue is consumed, `503`
+    if it has no consumers.
+
+    The throughput is estimated from the completion events of all tasks(see
+    `ResultNotifier`) or, if events are disabled, from the queue depth change
+    and the messages published by this process.
+    """
+    def __init__(
+        self,
+        producer: Producer,
+        max_queue_depth: dict[str, int],
+        interval: float,
+        retry_after_max: float,
+        notifier: ResultNotifier | None=None,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._producer = producer
+        self._max_queue_depth = max_queue_depth
+        self._interval = interval
+        self._retry_after_max = retry_after_max
+        self._notifier = notifier
+        self._task: asyncio.Task | None = None
+        self.depth: int | None = None  # `None` if unknown: tasks are admitted
+        self.consumers: int | None = None
+        self.throughput: float | None = None  # messages/s
+        ADMISSION_QUEUE_DEPTH.set_function(lambda: self.depth or 0)
+        ADMISSION_THROUGHPUT.set_function(lambda: self.throughput or 0.)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+
+    def _processed_count(self) -> int:
+        if self._notifier:
+            return self._notifier.processed_count
+
+        return self._producer.sent_count
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        prev_time = prev_depth = prev_count = None
+
+        while True:
+            try:
+                self.depth, self.consumers = await self._producer.queue_stats()
+            except Exception as exc:
+                self._log.warning('Unable to get the queue depth: %r', exc)
+                self.depth = self.consumers = None
+
+            now = loop.time()
+            count = self._processed_count()
+
+            if self.depth is not None and prev_depth is not None:
+                processed = count - cast(int, prev_count)
+
+                if not self._notifier:
+                    # Published minus the growth of the queue
+                    processed = max(processed + prev_depth - self.depth, 0)
+
+                rate = processed / (now - cast(float, prev_time))
+                self.throughput = (
+                    rate if self.throughput is None else
+                    THROUGHPUT_SMOOTHING * rate
+                    + (1 - THROUGHPUT_SMOOTHING) * self.throughput
+                )
+
+            prev_time, prev_depth, prev_count = now, self.depth, count
+            await asyncio.sleep(self._interval)
+
+    def admit(self, text_type: str) -> None:
+        """Raises `HTTPException`(429 or 503 with `Retry-After`) if a task
+        of the type should be rejected.
+        """
+        max_depth = self._max_queue_depth.get(text_type)
+
+        if self.depth is None or max_depth is None or self.depth < max_depth:
+            return
+
+        if self.consumers:
+            status_code = status.HTTP_429_TOO_MANY_REQUESTS
+            detail = 'Too many pending tasks, retry later'
+            retry_after = self._drain_time(self.depth - max_depth + 1)
+        else:
+            status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+            detail = 'Tasks are not being processed, retry later'
+            retry_after = None
+
+        retry_after = min(retry_after or self._retry_after_max, self._retry_after_max)
+        ADMISSION_REJECTED.labels(text_type, status_code).inc()
+        raise HTTPException(
+            status_code=status_code,
+            detail=detail,
+            headers={'Retry-After': str(max(math.ceil(retry_after), 1))},
+        )
+
+    def _drain_time(self, messages: int) -> float | None:
+        if not self.throughput:
+            return None
+
+        return messages / self.throughput
+
+    def estimated_wait(self) -> float | None:
+        """Seconds until a task published now is taken from the queue."""
+        if self.depth is None:
+            return None
+
+        return self._drain_time(self.depth + 1)
@@ -1,14 +1,28 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from shared.config import web_api_config as config
 from shared.utils import asyncio_debug_mode
+from shared.utils import cpu_count
+from shared.utils import LoopMonitor
 from shared.logging import setup_app_logger
+from shared.tracing import setup_tracing
 from shared.db.core import create_db
 from shared.dist_tasks.producer import Producer
+from shared.dist_tasks.events import EventSubscriber
+from shared.dist_tasks.events import EventPublisher
 
 from .dependencies.auth import BasicHttpAuthDep
+from .notifier import ResultNotifier
+from .cache import ResultCache
+from .admission import AdmissionController
+from .task_index import TaskIndex
+from .ingester import ResultIngester
 from .routers import process_text
 from .routers import task_result
+from .routers import metrics
+from .middlewares.metrics import MetricsMiddleware
+from .middlewares.tracing import TracingMiddleware
 
 
 setup_app_logger(
@@ -16,14 +30,34 @@ setup_app_logger(
     level=config.log_level,
     max_length=config.log_record_max_len,
     fmt=config.log_fmt,
+    json=config.log_json,
+    queued=config.log_queued,
+    debug_sample_rate=config.log_debug_sample_rate,
+    debug_rate_limit=config.log_debug_rate_limit,
+)
+setup_tracing(
+    service=config.app_name,
+    exporter=config.tracing_exporter,
+    path=config.tracing_path,
+    sample_rate=config.tracing_sample_rate,
 )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     asyncio_debug_mode(config)
+    loop_monitor = None
+
+    if config.loop_monitor_interval:
+        loop_monitor = LoopMonitor(interval=config.loop_monitor_interval, slow=config.asyncio_slow)
+        loop_monitor.start()
+
     create_db()
     app.state.config = config
+    app.state.results_cache = (
+        ResultCache(config.results_cache_max_bytes)
+        if config.results_cache_max_bytes else None
+    )
     app.state.producer = producer = Producer(
         conn_url=config.rabbitmq_uri,
         exchange_name=config.rabbitmq_exchange,
@@ -32,13 +66,83 @@ async def lifespan(app: FastAPI):
         persistent=config.producer_persistent,
         publisher_confirms=config.producer_publisher_confirms,
         app_name=config.app_name,
+        partitions=config.rabbitmq_partitions,
     )
     await producer.startup()
+    events_subscriber = notifier = admission = seeding = None
+    ingester = events_publisher = None
+
+    # The index of a worker misses the tasks created by the other workers, so
+    # it is only used by a single server process.
+    if config.task_index_capacity and (config.web_api_workers or cpu_count()) == 1:
+        app.state.task_index = task_index = TaskIndex(
+            capacity=config.task_index_capacity,
+            error_rate=config.task_index_error_rate,
+        )
+        # Seeded in the background, the DB is queried until it is ready.
+        seeding = asyncio.create_task(task_index.seed())
+
+    if config.rabbitmq_events_exchange:
+        app.state.notifier = notifier = ResultNotifier()
+        events_subscriber = EventSubscriber(
+            conn_url=config.rabbitmq_uri,
+            exchange_name=config.rabbitmq_events_exchange,
+            on_event=notifier.dispatch,
+        )
+        await events_subscriber.startup()
+
+    if config.results_ingester_enabled:
+        if config.rabbitmq_events_exchange:
+            events_publisher = EventPublisher(
+                conn_url=config.rabbitmq_uri,
+                exchange_name=config.rabbitmq_events_exchange,
+                app_name=config.app_name,
+            )
+            await events_publisher.startup()
+
+        ingester = ResultIngester(
+            conn_url=config.rabbitmq_uri,
+            exchange_name=config.rabbitmq_results_exchange,
+            queue_name=config.rabbitmq_results_queue,
+            events_publisher=events_publisher,
+            batch_size=config.results_ingester_batch_size,
+            batch_max_bytes=config.results_ingester_batch_max_bytes,
+            flush_interval=config.results_ingester_flush_interval,
+        )
+        await ingester.startup()
+
+    if config.admission_enabled:
+        app.state.admission = admission = AdmissionController(
+            producer=producer,
+            max_queue_depth=config.admission_max_queue_depth,
+            interval=config.admission_interval,
+            retry_after_max=config.admission_retry_after_max,
+            notifier=notifier,
+        )
+        admission.start()
 
     yield
 
+    if seeding:
+        seeding.cancel()
+
+    if admission:
+        await admission.stop()
+
+    if ingester:
+        await ingester.shutdown()
+
+    if events_publisher:
+        await events_publisher.shutdown()
+
+    if events_subscriber:
+        await events_subscriber.shutdown()
+
     await producer.shutdown()
 
+    if loop_monitor:
+        await loop_monitor.stop()
+
 
 app = FastAPI(
     title='Text Processing Web API',
@@ -47,5 +151,23 @@ app = FastAPI(
 )
 
 
+def _openapi() -> dict:
+    if app.openapi_schema is None:
+        schema = FastAPI.openapi(app)
+        schema.setdefault('components', {}).setdefault('schemas', {}).update(
+            process_text.OPENAPI_SCHEMAS
+        )
+
+    return app.openapi_schema  # type: ignore[return-value]
+
+
+app.openapi = _openapi  # type: ignore[method-assign]
 app.include_router(process_text.router)
 app.include_router(task_result.router)
+
+if config.metrics_enabled:
+    app.include_router(metrics.router)
+    app.add_middleware(MetricsMiddleware)
+
+if config.tracing_exporter != 'none':
+    app.add_middleware(TracingMiddleware)
@@ -0,0 +1,127 @@
+import zlib
+from typing import Protocol
+
+from fastapi import HTTPException
+from fastapi import Request
+from fastapi import status
+
+try:
+    import zstandard
+except ImportError:  # Optional: `Content-Encoding: zstd` is not supported
+    zstandard = None
+
+
+class _Decoder(Protocol):
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        """Returns at most `max_length` bytes of the decoded `data`."""
+        ...
+
+    def finish(self) -> None:
+        """Raises `ValueError` if the encoded data is incomplete."""
+        ...
+
+
+class _GzipDecoder:
+    def __init__(self) -> None:
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        # With `max_length`, the output of a decompression bomb is bounded.
+        return self._decompressor.decompress(data, max_length)
+
+    def finish(self) -> None:
+        if not self._decompressor.eof:
+            raise ValueError('Truncated gzip data')
+
+
+# The compression ratio of zstd is at most about 65536(a few bytes per 128 KiB
+# block), so a chunk of the input is decoded to at most ~4 MiB.
+ZSTD_INPUT_CHUNK = 64  # bytes
+
+
+class _ZstdDecoder:
+    def __init__(self) -> None:
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()  # type: ignore[union-attr]
+
+    def decode(self, data: bytes, max_length: int) -> bytes:
+        # `decompressobj` has no output limit, so the input is decoded in
+        # small chunks until `max_length` bytes are decoded.
+        view = memoryview(data)
+        chunks = []
+        size = 0
+
+        for start in range(0, len(view), ZSTD_INPUT_CHUNK):
+            chunk = self._decompressor.decompress(view[start:start + ZSTD_INPUT_CHUNK])
+            chunks.append(chunk)
+            size += len(chunk)
+
+            if size >= max_length:
+                break
+
+        return b''.join(chunks)[:max_length]
+
+    def finish(self) -> None:
+        if not self._decompressor.eof:
+            raise ValueError('Truncated zstd data')
+
+
+def _get_decoder(encoding: str) -> _Decoder | None:
+    match encoding:
+        case '' | 'identity':
+            return None
+        case 'gzip' | 'x-gzip':
+            return _GzipDecoder()
+        case 'zstd' if zstandard is not None:
+            return _ZstdDecoder()
+
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail=f'Unsupported Content-Encoding: "{encoding}"',
+        headers={'Accept-Encoding': 'gzip, zstd' if zstandard else 'gzip'},
+    )
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """Reads the body as a stream, decoding `Content-Encoding`(gzip, zstd).
+    Raises 413 as soon as the decoded body exceeds `max_size` bytes, so
+    oversized bodies are never buffered entirely.
+    """
+    encoding = request.headers.get('content-encoding', '').strip().lower()
+    decoder = _get_decoder(encoding)
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f'The body must be at most {max_size} bytes',
+    )
+
+    if decoder is None:
+        length = request.headers.get('content-length', '')
+
+        if length.isdigit() and int(length) > max_size:
+            raise too_large
+
+    size = 0
+    chunks: list[bytes] = []
+
+    try:
+        async for chunk in request.stream():
+            if decoder:
+                chunk = decoder.decode(chunk, max_size - size + 1)
+
+            size += len(chunk)
+
+            if size > max_size:
+                raise too_large
+
+            chunks.append(chunk)
+
+        if decoder:
+            decoder.finish()
+    except HTTPException:
+        raise
+    except Exception as exc:  # zlib.error, zstandard.ZstdError, ValueError
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Invalid "{encoding}" body: {exc}',
+        )
+
+    return b''.join(chunks)
@@ -0,0 +1,85 @@
+import datetime
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Hashable
+
+from shared.metrics import Counter
+from shared.metrics import Gauge
+
+
+CACHE_LOOKUPS = Counter(
+    'results_cache_lookups',
+    'Lookups of final task results in the cache by result(hit, miss)',
+    ['result'],
+)
+CACHE_EVICTIONS = Counter(
+    'results_cache_evictions',
+    'Results evicted from the cache',
+)
+CACHE_SIZE = Gauge(
+    'results_cache_size_bytes',
+    'Size of the cached results',
+)
+CACHE_ENTRIES = Gauge(
+    'results_cache_entries',
+    'Number of the cached results',
+)
+
+ENTRY_OVERHEAD = 256  # Approximate size(bytes) of the key, the entry and the headers
+
+
+@dataclass(frozen=True, slots=True)
+class CachedResult:
+    body: bytes  # Serialized response
+    etag: str
+    updated_at: datetime.datetime
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + ENTRY_OVERHEAD
+
+
+class ResultCache:
+    """LRU cache of serialized task results bounded by the size of the
+    results(bytes), not by the number of entries. Only immutable results(of
+    tasks in a final status) must be cached. Not thread-safe: used from the
+    event loop only.
+    """
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, CachedResult] = OrderedDict()
+        self._size = 0
+        self._hits = CACHE_LOOKUPS.labels('hit')
+        self._misses = CACHE_LOOKUPS.labels('miss')
+        CACHE_SIZE.set_function(lambda: self._size)
+        CACHE_ENTRIES.set_function(lambda: len(self._entries))
+
+    def get(self, key: Hashable) -> CachedResult | None:
+        try:
+            entry = self._entries[key]
+        except KeyError:
+            self._misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return entry
+
+    def put(self, key: Hashable, entry: CachedResult) -> None:
+        if entry.size > self.max_bytes:
+            return
+
+        if old := self._entries.pop(key, None):
+            self._size -= old.size
+
+        self._entries[key] = entry
+        self._size += entry.size
+
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            CACHE_EVICTIONS.inc()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._size = 0
@@ -0,0 +1,13 @@
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+
+from web_api.admission import AdmissionController
+
+
+def _get_admission(conn: HTTPConnection) -> AdmissionController | None:
+    return getattr(conn.app.state, 'admission', None)
+
+
+AdmissionDep = Annotated[AdmissionController | None, Depends(_get_admission)]
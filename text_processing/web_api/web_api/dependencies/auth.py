@@ -4,6 +4,7 @@ from typing import Annotated
 from fastapi import status
 from fastapi import Depends
 from fastapi import HTTPException
+from fastapi.requests import HTTPConnection
 from fastapi.security import HTTPBasic
 from fastapi.security import HTTPBasicCredentials
 
@@ -11,7 +12,16 @@ from .users import UserCredDep
 from .config import ConfigDep
 
 
-security = HTTPBasic(auto_error=False)
+class _HTTPBasic(HTTPBasic):
+    """`HTTPBasic` that also authenticates WebSocket connections."""
+    async def __call__(  # type: ignore[override]
+        self,
+        request: HTTPConnection,
+    ) -> HTTPBasicCredentials | None:
+        return await super().__call__(request)  # type: ignore[arg-type]
+
+
+security = _HTTPBasic(auto_error=False)
 
 
 def _verify_basic_http_cred(
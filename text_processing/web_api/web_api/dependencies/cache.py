@@ -0,0 +1,13 @@
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+
+from web_api.cache import ResultCache
+
+
+def _get_results_cache(conn: HTTPConnection) -> ResultCache | None:
+    return getattr(conn.app.state, 'results_cache', None)
+
+
+ResultCacheDep = Annotated[ResultCache | None, Depends(_get_results_cache)]
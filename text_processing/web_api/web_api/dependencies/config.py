@@ -1,12 +1,12 @@
 from typing import Annotated
 
 from fastapi import Depends
-from fastapi import Request
+from fastapi.requests import HTTPConnection
 from shared.config.config import WebAPIConfig
 
 
-def _get_config(request: Request) -> WebAPIConfig:
-    return request.app.state.config
+def _get_config(conn: HTTPConnection) -> WebAPIConfig:
+    return conn.app.state.config
 
 
 ConfigDep = Annotated[WebAPIConfig, Depends(_get_config)]
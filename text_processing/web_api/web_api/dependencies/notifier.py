@@ -0,0 +1,13 @@
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+
+from web_api.notifier import ResultNotifier
+
+
+def _get_notifier(conn: HTTPConnection) -> ResultNotifier | None:
+    return getattr(conn.app.state, 'notifier', None)
+
+
+NotifierDep = Annotated[ResultNotifier | None, Depends(_get_notifier)]
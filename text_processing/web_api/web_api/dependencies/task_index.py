@@ -0,0 +1,13 @@
+from typing import Annotated
+
+from fastapi import Depends
+from fastapi.requests import HTTPConnection
+
+from web_api.task_index import TaskIndex
+
+
+def _get_task_index(conn: HTTPConnection) -> TaskIndex | None:
+    return getattr(conn.app.state, 'task_index', None)
+
+
+TaskIndexDep = Annotated[TaskIndex | None, Depends(_get_task_index)]
@@ -1,20 +1,26 @@
 import asyncio
+import datetime
 from uuid import UUID
 from functools import partial
+from typing import Any
 from typing import Annotated
 from typing import Callable
 from typing import Awaitable
+from typing import Iterator
 
 from fastapi import Depends
 from fastapi import Request
 
 from shared.db.core import Session
+from shared.db.core import DB_OPERATION_DURATION
 from shared.db.models import Task
+from shared.db.models import TaskTiming
 from shared.dist_tasks.producer import Producer
+from shared.tracing import get_tracer
 
 
 def _save_task(task_id: UUID, **values) -> None:
-    with Session() as session:
+    with DB_OPERATION_DURATION.labels('save_task').time(), Session() as session:
         try:
             Task.create(session=session, task_id=task_id, **values)
             session.commit()
@@ -24,14 +30,50 @@ def _save_task(task_id: UUID, **values) -> None:
 
 
 async def _save_task_async(task_id: UUID, **values) -> None:
-    await asyncio.get_running_loop().run_in_executor(
-        None,
-        partial(_save_task, task_id=task_id, **values),
-    )
+    with get_tracer().start_span('db.save_task'):
+        await asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(_save_task, task_id=task_id, **values),
+        )
+
+
+def _save_tasks(task_ids: list[UUID]) -> set[UUID]:
+    with DB_OPERATION_DURATION.labels('save_tasks').time(), Session() as session:
+        try:
+            inserted = Task.create_many(
+                session=session,
+                rows=[{'task_id': x} for x in task_ids],
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    return inserted
+
+
+async def _save_tasks_async(task_ids: list[UUID]) -> set[UUID]:
+    with get_tracer().start_span('db.save_tasks'):
+        return await asyncio.get_running_loop().run_in_executor(None, _save_tasks, task_ids)
+
+
+def _delete_tasks(task_ids: list[UUID]) -> None:
+    with DB_OPERATION_DURATION.labels('delete_tasks').time(), Session() as session:
+        try:
+            Task.delete_many(session=session, task_ids=task_ids)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+
+async def _delete_tasks_async(task_ids: list[UUID]) -> None:
+    with get_tracer().start_span('db.delete_tasks'):
+        await asyncio.get_running_loop().run_in_executor(None, _delete_tasks, task_ids)
 
 
 def _get_task(task_id: UUID) -> Task | None:
-    with Session() as session:
+    with DB_OPERATION_DURATION.labels('get_task').time(), Session() as session:
         res = session.get(Task, task_id)
 
         if res:
@@ -41,16 +83,130 @@ def _get_task(task_id: UUID) -> Task | None:
 
 
 async def _get_task_async(task_id: UUID) -> Task | None:
-    return await asyncio.get_running_loop().run_in_executor(None, _get_task, task_id)
+    with get_tracer().start_span('db.get_task'):
+        return await asyncio.get_running_loop().run_in_executor(None, _get_task, task_id)
 
 
-def _task_exists(task_id: UUID) -> bool:
+def _get_tasks(task_ids: list[UUID]) -> list[Task]:
+    with DB_OPERATION_DURATION.labels('get_tasks').time(), Session() as session:
+        res = Task.get_many(session=session, task_ids=task_ids)
+        session.expunge_all()
+        return res
+
+
+async def _get_tasks_async(task_ids: list[UUID]) -> list[Task]:
+    with get_tracer().start_span('db.get_tasks'):
+        return await asyncio.get_running_loop().run_in_executor(None, _get_tasks, task_ids)
+
+
+def _get_task_fields(
+    task_id: UUID,
+    fields: list[str],
+    text_max_size: int | None=None,
+) -> dict[str, Any] | None:
+    with DB_OPERATION_DURATION.labels('get_task_fields').time(), Session() as session:
+        return Task.get_fields(
+            session=session,
+            task_id=task_id,
+            fields=fields,
+            text_max_size=text_max_size,
+        )
+
+
+async def _get_task_fields_async(
+    task_id: UUID,
+    fields: list[str],
+    text_max_size: int | None=None,
+) -> dict[str, Any] | None:
+    with get_tracer().start_span('db.get_task_fields'):
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            partial(
+                _get_task_fields,
+                task_id=task_id,
+                fields=fields,
+                text_max_size=text_max_size,
+            ),
+        )
+
+
+def _iter_task_text(
+    task_id: UUID,
+    field: str,
+    start: int=0,
+    end: int | None=None,
+) -> Iterator[bytes]:
+    """Yields the text in chunks. The session is kept open until the
+    iterator is exhausted or closed.
+    """
     with Session() as session:
+        yield from Task.iter_text(
+            session=session,
+            task_id=task_id,
+            field=field,
+            start=start,
+            end=end,
+        )
+
+
+def _iter_tasks(
+    task_ids: list[UUID],
+    updated_since: datetime.datetime | None=None,
+    fields: list[str] | None=None,
+) -> Iterator[Task | dict[str, Any]]:
+    """Yields the tasks lazily, so the rows can be streamed to the client.
+    The session is kept open until the iterator is exhausted or closed.
+    """
+    with Session() as session:
+        with DB_OPERATION_DURATION.labels('iter_tasks').time():
+            tasks = Task.iter_many(
+                session=session,
+                task_ids=task_ids,
+                updated_since=updated_since,
+                fields=fields,
+            )
+            first = next(tasks, None)
+
+        if first is None:
+            return
+
+        yield first
+        yield from tasks
+
+
+def _get_task_timing(task_id: UUID) -> TaskTiming | None:
+    with DB_OPERATION_DURATION.labels('get_task_timing').time(), Session() as session:
+        res = session.get(TaskTiming, task_id)
+
+        if res:
+            session.expunge(res)
+
+        return res
+
+
+async def _get_task_timing_async(task_id: UUID) -> TaskTiming | None:
+    with get_tracer().start_span('db.get_task_timing'):
+        return await asyncio.get_running_loop().run_in_executor(None, _get_task_timing, task_id)
+
+
+def _task_exists(task_id: UUID) -> bool:
+    with DB_OPERATION_DURATION.labels('task_exists').time(), Session() as session:
         return Task.exists(session=session, task_id=task_id)
 
 
 async def _task_exists_async(task_id: UUID) -> bool:
-    return await asyncio.get_running_loop().run_in_executor(None, _task_exists, task_id)
+    with get_tracer().start_span('db.task_exists'):
+        return await asyncio.get_running_loop().run_in_executor(None, _task_exists, task_id)
+
+
+def _existing_task_ids(task_ids: list[UUID]) -> set[UUID]:
+    with DB_OPERATION_DURATION.labels('existing_task_ids').time(), Session() as session:
+        return Task.existing_ids(session=session, task_ids=task_ids)
+
+
+async def _existing_task_ids_async(task_ids: list[UUID]) -> set[UUID]:
+    with get_tracer().start_span('db.existing_task_ids'):
+        return await asyncio.get_running_loop().run_in_executor(None, _existing_task_ids, task_ids)
 
 
 def _get_producer(request: Request) -> Producer:
@@ -58,6 +214,14 @@ def _get_producer(request: Request) -> Producer:
 
 
 TaskSaveDep = Annotated[Callable[..., Awaitable[None]], Depends(lambda: _save_task_async)]
+TasksSaveDep = Annotated[Callable[[list[UUID]], Awaitable[set[UUID]]], Depends(lambda: _save_tasks_async)]
+TasksDeleteDep = Annotated[Callable[[list[UUID]], Awaitable[None]], Depends(lambda: _delete_tasks_async)]
 TaskGetDep = Annotated[Callable[[UUID], Awaitable[Task]], Depends(lambda: _get_task_async)]
+TasksGetDep = Annotated[Callable[[list[UUID]], Awaitable[list[Task]]], Depends(lambda: _get_tasks_async)]
+TaskFieldsGetDep = Annotated[Callable[..., Awaitable[dict[str, Any] | None]], Depends(lambda: _get_task_fields_async)]
+TaskTextIterDep = Annotated[Callable[..., Iterator[bytes]], Depends(lambda: _iter_task_text)]
+TasksIterDep = Annotated[Callable[..., Iterator[Task | dict[str, Any]]], Depends(lambda: _iter_tasks)]
+TaskTimingGetDep = Annotated[Callable[[UUID], Awaitable[TaskTiming | None]], Depends(lambda: _get_task_timing_async)]
 TaskExistsDep = Annotated[Callable[[UUID], Awaitable[bool]], Depends(lambda: _task_exists_async)]
+TasksExistingDep = Annotated[Callable[[list[UUID]], Awaitable[set[UUID]]], Depends(lambda: _existing_task_ids_async)]
 ProducerDep = Annotated[Producer, Depends(_get_producer)]
@@ -0,0 +1,239 @@
+import time
+import signal
+import asyncio
+import datetime
+import logging
+from uuid import UUID
+from typing import Any
+from typing import Self
+from contextlib import AsyncExitStack
+
+import uvloop
+from sqlalchemy import DateTime
+from sqlalchemy import Table
+from sqlalchemy import Uuid
+
+from shared.config import get_web_api_config
+from shared.logging import get_app_logger
+from shared.logging import setup_app_logger
+from shared.db.core import Session
+from shared.db.core import DB_OPERATION_DURATION
+from shared.db.core import create_db
+from shared.db.models import Task
+from shared.db.models import TaskTiming
+from shared.dist_tasks.events import EventPublisher
+from shared.dist_tasks.results import ResultConsumer
+from shared.metrics import Counter
+from shared.metrics import MetricsServer
+from shared.tracing import get_tracer
+from shared.tracing import setup_tracing
+
+
+TASKS_INGESTED = Counter(
+    'results_ingested',
+    'Task results written to the DB by the ingester by status',
+    ['status'],
+)
+
+
+def _decode(table: Table, row: dict[str, Any]) -> dict[str, Any]:
+    """Restores the UUID and datetime values of a JSON row."""
+    for name, value in row.items():
+        if not isinstance(value, str):
+            continue
+
+        column_type = table.c[name].type
+
+        if isinstance(column_type, DateTime):
+            row[name] = datetime.datetime.fromisoformat(value)
+        elif isinstance(column_type, Uuid):
+            row[name] = UUID(value)
+
+    return row
+
+
+def _merge(
+    items: list[tuple[str, list[dict[str, Any]]]],
+    logger: logging.Logger,
+) -> tuple[dict[UUID, dict[str, Any]], dict[UUID, dict[str, Any]]]:
+    """Merges the results of each task in the order they were published, so
+    the rows end up as after upserting the results one by one. Returns the
+    `Task` and `TaskTiming` rows by task id.
+    """
+    tasks: dict[UUID, dict[str, Any]] = {}
+    timings: dict[UUID, dict[str, Any]] = {}
+
+    for message_id, results in items:
+        try:
+            for result in results:
+                task = _decode(Task.__table__, dict(result['task']))  # type: ignore[arg-type]
+                task_id = task['task_id']
+                tasks.setdefault(task_id, {}).update(task)
+
+                if timing := result.get('timing'):
+                    timing = _decode(TaskTiming.__table__, dict(timing))  # type: ignore[arg-type]
+                    timings.setdefault(task_id, {}).update(timing, task_id=task_id)
+        except (KeyError, TypeError, ValueError) as exc:
+            # Not retried: the same message fails again.
+            logger.error('Invalid result of task %s, skipped: %r', message_id, exc)
+
+    return tasks, timings
+
+
+def _write(tasks: list[dict[str, Any]], timings: list[dict[str, Any]]) -> None:
+    """Upserts the rows of a batch. The `db_wall` of each task is the upsert
+    time of the batch divided by its tasks, so it is comparable with the
+    upsert time of a task written by the consumer.
+    """
+    with DB_OPERATION_DURATION.labels('ingest').time(), Session() as session:
+        try:
+            started = time.perf_counter()
+            Task.upsert_many(session, tasks)
+            db_wall = (time.perf_counter() - started) / len(tasks)
+            TaskTiming.upsert_many(session, [{**x, 'db_wall': db_wall} for x in timings])
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+
+class ResultIngester:
+    """Writes the results published by the consumers of `task_processor`
+    (`CONSUMER_RESULTS_VIA_BROKER`) to the DB in batches: the results of a
+    batch are merged by task and upserted with a few multi-row statements in
+    one transaction, then the completion events of the tasks are published.
+    Runs in `web_api`(`RESULTS_INGESTER_ENABLED`) or standalone:
+    `python -m web_api.ingester`.
+    """
+    def __init__(
+        self,
+        conn_url: str,
+        exchange_name: str,
+        queue_name: str,
+        events_publisher: EventPublisher | None=None,
+        batch_size: int=500,
+        batch_max_bytes: int=16_000_000,
+        flush_interval: float=0.05,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._events_publisher = events_publisher
+        self._consumer = ResultConsumer(
+            conn_url=conn_url,
+            exchange_name=exchange_name,
+            queue_name=queue_name,
+            on_batch=self._apply,
+            batch_size=batch_size,
+            batch_max_bytes=batch_max_bytes,
+            flush_interval=flush_interval,
+            logger=self._log,
+        )
+
+    async def startup(self) -> None:
+        await self._consumer.startup()
+
+    async def shutdown(self) -> None:
+        await self._consumer.shutdown()
+
+    async def _apply(self, items: list[tuple[str, list[dict[str, Any]]]]) -> None:
+        tasks, timings = _merge(items, self._log)
+
+        if not tasks:
+            return
+
+        with get_tracer().start_span('db.ingest', attributes={'tasks': len(tasks)}):
+            await asyncio.get_running_loop().run_in_executor(
+                None, _write, list(tasks.values()), list(timings.values()),
+            )
+
+        for row in tasks.values():
+            TASKS_INGESTED.labels(row['status']).inc()
+
+        if self._events_publisher:
+            await self._publish_events(tasks)
+
+    async def _publish_events(self, tasks: dict[UUID, dict[str, Any]]) -> None:
+        """Notifies subscribers(`web_api`) that the task results were saved."""
+        publisher = self._events_publisher
+        updated_at = time.time()
+        results = await asyncio.gather(
+            *(
+                publisher.publish(  # type: ignore[union-attr]
+                    {'task_id': task_id.hex, 'status': row['status'], 'updated_at': updated_at}
+                )
+                for task_id, row in tasks.items()
+            ),
+            return_exceptions=True,
+        )
+
+        if errors := [x for x in results if isinstance(x, BaseException)]:
+            self._log.warning('Unable to publish %s events: %r', len(errors), errors[0])
+
+    async def __aenter__(self) -> Self:
+        await self.startup()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.shutdown()
+
+
+async def main() -> None:
+    config = get_web_api_config()
+    setup_app_logger(
+        name='result_ingester',
+        level=config.log_level,
+        max_length=config.log_record_max_len,
+        fmt=config.log_fmt,
+        json=config.log_json,
+        queued=config.log_queued,
+        debug_sample_rate=config.log_debug_sample_rate,
+        debug_rate_limit=config.log_debug_rate_limit,
+    )
+    setup_tracing(
+        service='result_ingester',
+        exporter=config.tracing_exporter,
+        path=config.tracing_path,
+        sample_rate=config.tracing_sample_rate,
+    )
+    create_db()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    async with AsyncExitStack() as stack:
+        if config.metrics_enabled:
+            await stack.enter_async_context(
+                MetricsServer(host=config.metrics_host, port=config.results_ingester_metrics_port)
+            )
+
+        events_publisher = None
+
+        if config.rabbitmq_events_exchange:
+            # Entered before the ingester, so it is closed after the last batch.
+            events_publisher = await stack.enter_async_context(
+                EventPublisher(
+                    conn_url=config.rabbitmq_uri,
+                    exchange_name=config.rabbitmq_events_exchange,
+                    app_name='result_ingester',
+                )
+            )
+
+        await stack.enter_async_context(
+            ResultIngester(
+                conn_url=config.rabbitmq_uri,
+                exchange_name=config.rabbitmq_results_exchange,
+                queue_name=config.rabbitmq_results_queue,
+                events_publisher=events_publisher,
+                batch_size=config.results_ingester_batch_size,
+                batch_max_bytes=config.results_ingester_batch_max_bytes,
+                flush_interval=config.results_ingester_flush_interval,
+            )
+        )
+        await stop.wait()
+
+
+if __name__ == '__main__':
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(main())
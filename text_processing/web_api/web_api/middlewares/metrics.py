@@ -0,0 +1,63 @@
+import time
+
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from shared.metrics import Counter
+from shared.metrics import Gauge
+from shared.metrics import Histogram
+
+
+REQUESTS = Counter(
+    'http_requests',
+    'HTTP requests by route and status code',
+    ['method', 'route', 'status'],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests being processed',
+)
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request duration until the response is sent',
+    ['method', 'route'],
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware(doesn't buffer streamed responses)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            # The route template is set by the router, unmatched paths are grouped.
+            route = getattr(scope.get('route'), 'path', '<unmatched>')
+            method = scope['method']
+            REQUESTS.labels(method, route, status_code).inc()
+            REQUEST_DURATION.labels(method, route).observe(
+                time.perf_counter() - started
+            )
@@ -0,0 +1,46 @@
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+from shared.tracing import SpanContext
+from shared.tracing import get_tracer
+
+
+class TracingMiddleware:
+    """Starts a span per request. The trace of the client is continued if the
+    request has the `traceparent` header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        parent = None
+
+        for name, value in scope['headers']:
+            if name == b'traceparent':
+                parent = SpanContext.from_traceparent(value)
+                break
+
+        with get_tracer().start_span(
+            f'HTTP {scope["method"]}',
+            parent=parent,
+            kind='server',
+            attributes={'http.method': scope['method'], 'http.path': scope['path']},
+        ) as span:
+            async def send_wrapper(message: Message) -> None:
+                if message['type'] == 'http.response.start':
+                    span.set_attribute('http.status_code', message['status'])
+
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if route := scope.get('route'):
+                    span.set_attribute('http.route', route.path)
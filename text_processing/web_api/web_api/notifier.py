@@ -0,0 +1,115 @@
+import asyncio
+from uuid import UUID
+from contextlib import contextmanager
+from contextlib import nullcontext
+from collections import defaultdict
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Iterable
+
+from shared.db.models import Task
+from shared.db.models.tasks import TaskStatus
+from shared.logging import get_app_logger
+
+
+FINAL_STATUSES = frozenset((TaskStatus.completed, TaskStatus.failed_final))
+
+
+class ResultNotifier:
+    """Dispatches task completion events(see `EventSubscriber`) to the
+    queues of the clients waiting for the tasks in this process.
+    """
+    def __init__(self) -> None:
+        self._waiters: defaultdict[UUID, set[asyncio.Queue]] = defaultdict(set)
+        # Messages removed from the queue(`failed` ones are redelivered),
+        # e.g. to estimate the throughput of `task_processor`.
+        self.processed_count = 0
+
+    def dispatch(self, event: dict[str, Any]) -> None:
+        if event.get('status') != TaskStatus.failed:
+            self.processed_count += 1
+
+        try:
+            task_id = UUID(event['task_id'])
+        except (KeyError, TypeError, ValueError):
+            get_app_logger().error('Invalid task event: %r', event)
+            return
+
+        for queue in self._waiters.get(task_id, ()):
+            queue.put_nowait(event)
+
+    def add(self, queue: asyncio.Queue, task_ids: Iterable[UUID]) -> None:
+        for task_id in task_ids:
+            self._waiters[task_id].add(queue)
+
+    def remove(self, queue: asyncio.Queue, task_ids: Iterable[UUID]) -> None:
+        for task_id in task_ids:
+            if queues := self._waiters.get(task_id):
+                queues.discard(queue)
+
+                if not queues:
+                    del self._waiters[task_id]
+
+    @contextmanager
+    def subscribe(self, queue: asyncio.Queue, task_ids: Iterable[UUID]):
+        task_ids = set(task_ids)
+        self.add(queue, task_ids)
+
+        try:
+            yield queue
+        finally:
+            self.remove(queue, task_ids)
+
+
+async def watch_results(
+    task_ids: Iterable[UUID],
+    get_tasks: Callable[[list[UUID]], Awaitable[list[Task]]],
+    notifier: ResultNotifier | None,
+    timeout: float,
+    poll_interval: float,
+) -> AsyncIterator[Task | None]:
+    """Yields the tasks as they reach a final status, until all of them are
+    final or the timeout expires. `None` is yielded when nothing happened
+    during `poll_interval`(e.g. to send a keep-alive).
+
+    The tasks are subscribed to before the first DB read, so no event is
+    lost. They are re-read every `poll_interval` anyway, in case of events
+    missed during a broker reconnection or if events are disabled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    pending = set(task_ids)
+    check = set(pending)
+    queue: asyncio.Queue = asyncio.Queue()
+
+    with notifier.subscribe(queue, pending) if notifier else nullcontext():
+        while True:
+            if check:
+                for task in await get_tasks(list(check)):
+                    if task.status in FINAL_STATUSES and task.task_id in pending:
+                        pending.discard(task.task_id)
+                        yield task
+
+            if not pending:
+                return
+
+            remaining = deadline - loop.time()
+
+            if remaining <= 0:
+                return
+
+            try:
+                event = await asyncio.wait_for(queue.get(), min(remaining, poll_interval))
+            except TimeoutError:
+                check = set(pending)
+                yield None
+                continue
+
+            events = [event]
+
+            while not queue.empty():
+                events.append(queue.get_nowait())
+
+            check = {UUID(x['task_id']) for x in events} & pending
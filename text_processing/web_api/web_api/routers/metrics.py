@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from fastapi import Response
+
+from shared.metrics import CONTENT_TYPE
+from shared.metrics import default_registry
+
+
+router = APIRouter(
+    tags=['metrics'],
+)
+
+
+@router.get('/metrics', response_class=Response)
+async def metrics() -> Response:
+    return Response(content=default_registry.render(), media_type=CONTENT_TYPE)
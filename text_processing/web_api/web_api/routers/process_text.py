@@ -1,16 +1,43 @@
+import datetime
+from uuid import UUID
+from typing import Annotated
+from typing import Any
+
+import orjson
 from fastapi import APIRouter
+from fastapi import Header
+from fastapi import HTTPException
+from fastapi import Query
+from fastapi import Request
 from fastapi import Response
 from fastapi import status
+from fastapi.exceptions import RequestValidationError
+from pydantic import UUID4
+from pydantic import ValidationError
+from pydantic.json_schema import models_json_schema
 
-from shared.db.models.tasks import TaskDTO
 from shared.db.exceptions import AlreadyExistsError
+from shared.db.models.tasks import TextTypeEnum
+from shared.dist_tasks.headers import TRUSTED_HEADER
+from shared.utils import utcnow
 
 from web_api.schemas.process_text import ProcessTextRequest
 from web_api.schemas.process_text import ProcessTextResponse
+from web_api.schemas.process_text import ProcessTextBatchItemResponse
+from web_api.schemas.process_text import BatchItemStatusEnum
+from web_api.schemas.process_text import text_max_length
+from web_api.body import read_body
+from web_api.dependencies.config import ConfigDep
+from web_api.dependencies.admission import AdmissionDep
 from web_api.dependencies.logging import LoggerDep
+from web_api.dependencies.task_index import TaskIndexDep
 from web_api.dependencies.tasks import ProducerDep
 from web_api.dependencies.tasks import TaskSaveDep
 from web_api.dependencies.tasks import TaskExistsDep
+from web_api.dependencies.tasks import TasksSaveDep
+from web_api.dependencies.tasks import TasksDeleteDep
+from web_api.dependencies.tasks import TasksExistingDep
+from web_api.task_index import TaskIndex
 
 
 router = APIRouter(
@@ -18,43 +45,448 @@ router = APIRouter(
 )
 
 
+# The request bodies are read from the raw request, so their schemas are
+# added to the OpenAPI components by the app.
+_, _schemas = models_json_schema(
+    [(ProcessTextRequest, 'validation')],
+    ref_template='#/components/schemas/{model}',
+)
+OPENAPI_SCHEMAS: dict[str, Any] = _schemas['$defs']
+
+
+RAW_CONTENT_TYPES = ('text/plain', 'application/octet-stream')
+UTF8_MAX_CHAR_SIZE = 4  # bytes
+JSON_MAX_CHAR_SIZE = 6  # bytes, `\uXXXX` escape
+JSON_OVERHEAD = 1024  # bytes, keys, task_id and type
+
+
+def _validation_error(exc: ValidationError) -> RequestValidationError:
+    return RequestValidationError(
+        [
+            {**x, 'loc': ('body', *x['loc'])}
+            for x in exc.errors(include_url=False, include_input=False)
+        ],
+    )
+
+
+def _validate_request(body: bytes) -> ProcessTextRequest:
+    """Validates the raw JSON body in one pass(pydantic JSON parser) without
+    intermediate Python objects.
+    """
+    try:
+        return ProcessTextRequest.model_validate_json(body)
+    except ValidationError as exc:
+        raise _validation_error(exc)
+
+
+async def _read_raw_request(
+    request: Request,
+    text_type: TextTypeEnum | None,
+    task_id: UUID | None,
+) -> tuple[ProcessTextRequest, bytes]:
+    """Reads a `text/plain` or `application/octet-stream`(UTF-8) body.
+    Returns the request and the JSON message body.
+    """
+    if text_type is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail='The text type(`type` query parameter or `X-Text-Type` header) '
+                   'is required for raw bodies',
+        )
+
+    raw = await read_body(request, text_max_length(text_type) * UTF8_MAX_CHAR_SIZE)
+
+    try:
+        text = raw.decode('utf-8')
+    except UnicodeDecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f'The body must be UTF-8 text: {exc}',
+        )
+
+    del raw
+
+    try:
+        text_item = ProcessTextRequest.model_validate(
+            {'text': text, 'type': text_type}
+            | ({'task_id': task_id} if task_id else {})
+        )
+    except ValidationError as exc:
+        raise _validation_error(exc)
+
+    return text_item, orjson.dumps({'text': text, 'type': text_type})
+
+
+async def _read_request(
+    request: Request,
+    text_type: TextTypeEnum | None,
+    task_id: UUID | None,
+) -> tuple[ProcessTextRequest, bytes]:
+    """Returns the request and the JSON message body. The body is read as a
+    stream and rejected as soon as it exceeds the size limit of the text
+    type(if known).
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    if content_type in RAW_CONTENT_TYPES:
+        return await _read_raw_request(request, text_type, task_id)
+
+    if content_type and content_type != 'application/json':
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail='Expected application/json, text/plain or '
+                   'application/octet-stream body',
+        )
+
+    max_length = (
+        text_max_length(text_type) if text_type else
+        max(text_max_length(x) for x in TextTypeEnum)
+    )
+    body = await read_body(request, max_length * JSON_MAX_CHAR_SIZE + JSON_OVERHEAD)
+    return _validate_request(body), body
+
+
 @router.post(
     '/process-text',
     response_model=ProcessTextResponse,
+    response_model_exclude_none=True,
     status_code=status.HTTP_201_CREATED,
+    responses={
+        429: {'description': 'Too many pending tasks of the type(see `Retry-After`)'},
+        503: {'description': 'Tasks are not being processed(see `Retry-After`)'},
+    },
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'application/json': {
+                    'schema': {'$ref': '#/components/schemas/ProcessTextRequest'},
+                },
+                'text/plain': {
+                    'schema': {'type': 'string'},
+                },
+                'application/octet-stream': {
+                    'schema': {'type': 'string', 'format': 'binary'},
+                },
+            },
+        },
+    },
 )
 async def process_text(
-    text_item: ProcessTextRequest,
+    request: Request,
     producer: ProducerDep,
     save_task: TaskSaveDep,
+    delete_tasks: TasksDeleteDep,
     task_exists: TaskExistsDep,
     response: Response,
     logger: LoggerDep,
+    admission: AdmissionDep,
+    task_index: TaskIndexDep,
+    type_: Annotated[
+        TextTypeEnum | None,
+        Query(
+            alias='type',
+            description='Text type of raw(`text/plain`, `application/octet-stream`) '
+                        'bodies. Also limits the size of JSON bodies',
+        ),
+    ] = None,
+    task_id: Annotated[
+        UUID4 | None,
+        Query(description='Task Id of raw bodies(generated if not set)'),
+    ] = None,
+    x_text_type: Annotated[
+        TextTypeEnum | None,
+        Header(description='The same as `type` query parameter'),
+    ] = None,
+    x_task_id: Annotated[
+        UUID4 | None,
+        Header(description='The same as `task_id` query parameter'),
+    ] = None,
 ) -> dict:
+    """Accepts a JSON body or the raw text(`text/plain`, `application/octet-stream`),
+    optionally compressed(`Content-Encoding: gzip` or `zstd`).
+
+    A JSON body is validated once and forwarded to the broker as is. The
+    message is marked as validated, so `task_processor` does not validate it
+    again.
+    """
+    text_type = type_ or x_text_type
+
+    if admission and text_type:
+        # Rejected before reading the body
+        admission.admit(text_type)
+
+    text_item, body = await _read_request(
+        request,
+        text_type=text_type,
+        task_id=task_id or x_task_id,
+    )
     task_id = text_item.task_id
-    resp = {'task_id': task_id}
+    resp: dict[str, Any] = {'task_id': task_id}
+
+    if admission and not text_type:
+        admission.admit(text_item.type)
 
-    if await task_exists(task_id):
+    if await _task_exists(task_id, task_exists, task_index):
         logger.warning('Task "%s" already exists', task_id)
         response.status_code = 200
         return resp
 
-    task_dto = TaskDTO.model_validate(
-        dict(
-            original_text=text_item.text,
-            type=text_item.type,
-        )
-    )
-
-    await producer.send(
-        task_id=task_id,
-        data=task_dto.model_dump(),
-    )
-
+    # Inserted before publishing: the existence query is skipped for ids
+    # absent from the index, so the insert is the check of an existing task.
     try:
         await save_task(task_id=task_id)
     except AlreadyExistsError:
         logger.warning('Task "%s" already exists', task_id)
         response.status_code = 200
+        return resp
+
+    try:
+        await producer.send_raw(
+            body,
+            task_id=task_id,
+            headers={TRUSTED_HEADER: True},
+        )
+    except Exception:
+        # The task can be submitted again
+        await delete_tasks([task_id])
+        raise
+
+    if task_index:
+        task_index.add(task_id)
+
+    if admission and (wait := admission.estimated_wait()) is not None:
+        resp['estimated_completion_time'] = utcnow() + datetime.timedelta(seconds=wait)
 
     return resp
+
+
+async def _task_exists(
+    task_id: UUID,
+    task_exists: TaskExistsDep,
+    task_index: TaskIndex | None,
+) -> bool:
+    """The DB is only queried if the task id may be in the index."""
+    if not task_index or not task_index.ready:
+        return await task_exists(task_id)
+
+    if not task_index.might_contain(task_id):
+        return False
+
+    if res := await task_exists(task_id):
+        return res
+
+    task_index.false_positive()
+    return False
+
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl')
+
+
+async def _read_batch(request: Request, max_items: int, max_body_size: int) -> list[Any]:
+    """Reads a JSON array or NDJSON(one item per line) body. The body is
+    read as a stream, so oversized batches are rejected early.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip()
+    is_ndjson = content_type in NDJSON_CONTENT_TYPES
+
+    if not is_ndjson and content_type != 'application/json':
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail='Expected application/json or application/x-ndjson body',
+        )
+
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f'The batch must be at most {max_body_size} bytes '
+               f'and {max_items} items',
+    )
+    size = 0
+    chunks: list[bytes] = []
+    items: list[Any] = []
+
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+
+            if size > max_body_size:
+                raise too_large
+
+            if not is_ndjson:
+                chunks.append(chunk)
+                continue
+
+            *lines, tail = (b''.join(chunks) + chunk).split(b'\n')
+            chunks = [tail]
+            items.extend(orjson.loads(x) for x in lines if x.strip())
+
+            if len(items) > max_items:
+                raise too_large
+
+        body = b''.join(chunks)
+
+        if is_ndjson:
+            if body.strip():
+                items.append(orjson.loads(body))
+        else:
+            items = orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Invalid JSON: {exc}',
+        )
+
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Expected a JSON array of items',
+        )
+
+    if len(items) > max_items:
+        raise too_large
+
+    return items
+
+
+@router.post(
+    '/process-text/batch',
+    response_model=list[ProcessTextBatchItemResponse],
+    response_model_exclude_none=True,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'description': 'JSON array or NDJSON(one item per line) of items',
+            'content': {
+                'application/json': {
+                    'schema': {
+                        'type': 'array',
+                        'items': {'$ref': '#/components/schemas/ProcessTextRequest'},
+                    },
+                },
+                'application/x-ndjson': {
+                    'schema': {'$ref': '#/components/schemas/ProcessTextRequest'},
+                },
+            },
+        },
+    },
+)
+async def process_text_batch(
+    request: Request,
+    producer: ProducerDep,
+    save_tasks: TasksSaveDep,
+    delete_tasks: TasksDeleteDep,
+    existing_tasks: TasksExistingDep,
+    config: ConfigDep,
+    logger: LoggerDep,
+    admission: AdmissionDep,
+    task_index: TaskIndexDep,
+) -> list[dict]:
+    """Submits a batch of texts. The items are validated one by one, so
+    invalid items do not fail the batch. The existence check and the insert
+    are single DB queries, the messages of the inserted tasks are published
+    concurrently.
+    """
+    items = await _read_batch(
+        request,
+        max_items=config.batch_max_items,
+        max_body_size=config.batch_max_body_size,
+    )
+    results: list[dict] = []
+    text_items: dict[UUID, ProcessTextRequest] = {}
+
+    for item in items:
+        try:
+            text_item = ProcessTextRequest.model_validate(item)
+        except ValidationError as exc:
+            results.append({
+                'status': BatchItemStatusEnum.invalid,
+                'detail': exc.errors(
+                    include_url=False,
+                    include_context=False,
+                    include_input=False,
+                ),
+            })
+            continue
+
+        task_id = text_item.task_id
+
+        if task_id in text_items:
+            # A duplicate within the batch
+            results.append({'task_id': task_id, 'status': BatchItemStatusEnum.exists})
+            continue
+
+        text_items[task_id] = text_item
+        results.append({'task_id': task_id, 'status': BatchItemStatusEnum.created})
+
+    statuses: dict[UUID, BatchItemStatusEnum] = {}
+    errors: dict[UUID, str] = {}
+
+    to_check = list(text_items)
+
+    if task_index and task_index.ready:
+        to_check = [x for x in to_check if task_index.might_contain(x)]
+
+    existing = await existing_tasks(to_check)
+
+    if task_index and task_index.ready:
+        task_index.false_positive(len(to_check) - len(existing))
+
+    for task_id in existing:
+        logger.warning('Task "%s" already exists', task_id)
+        statuses[task_id] = BatchItemStatusEnum.exists
+
+    to_send = [x for x in text_items.values() if x.task_id not in statuses]
+
+    if admission:
+        # The whole batch is rejected if a text type is over its threshold
+        for text_type in {x.type for x in to_send}:
+            admission.admit(text_type)
+
+    # Inserted before publishing, only the inserted tasks are published: ids
+    # absent from the index are not queried above.
+    inserted = await save_tasks([x.task_id for x in to_send])
+
+    for text_item in to_send:
+        if text_item.task_id not in inserted:
+            logger.warning('Task "%s" already exists', text_item.task_id)
+            statuses[text_item.task_id] = BatchItemStatusEnum.exists
+
+    to_send = [x for x in to_send if x.task_id in inserted]
+
+    try:
+        sent = await producer.send_many(
+            [({'original_text': x.text, 'type': x.type}, x.task_id) for x in to_send],
+            headers={TRUSTED_HEADER: True},
+        )
+    except Exception:
+        await delete_tasks(list(inserted))
+        raise
+
+    published, failed = [], []
+
+    for text_item, result in zip(to_send, sent):
+        if isinstance(result, Exception):
+            logger.error('Failed to publish task "%s": %r', text_item.task_id, result)
+            statuses[text_item.task_id] = BatchItemStatusEnum.error
+            errors[text_item.task_id] = 'Failed to publish the task'
+            failed.append(text_item.task_id)
+        else:
+            published.append(text_item.task_id)
+
+    if failed:
+        # The tasks can be submitted again
+        await delete_tasks(failed)
+
+    if task_index:
+        task_index.add_many(published)
+
+    for result in results:
+        task_id = result.get('task_id')
+
+        if result['status'] == BatchItemStatusEnum.created and task_id in statuses:
+            result['status'] = statuses[task_id]
+
+            if task_id in errors:
+                result['detail'] = errors[task_id]
+
+    return results
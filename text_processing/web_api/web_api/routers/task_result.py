@@ -1,12 +1,45 @@
+import codecs
+import asyncio
+import hashlib
+import datetime
+from email.utils import format_datetime
+from email.utils import parsedate_to_datetime
 from typing import Annotated
+from typing import Any
+from typing import Callable
+from typing import Iterator
+from typing import Literal
 from uuid import UUID
+from contextlib import aclosing
+from contextlib import closing
 
+import orjson
 from fastapi import APIRouter
 from fastapi import Path
+from fastapi import Query
+from fastapi import Header
 from fastapi import HTTPException
+from fastapi import Response
+from fastapi import WebSocket
+from fastapi import WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
-from shared.db.models import Task
-from web_api.dependencies.tasks import TaskGetDep
+from shared.db.models.tasks import TEXT_FIELDS
+
+from web_api.schemas.task_result import TaskResultResponse
+from web_api.schemas.task_result import TaskTimingResponse
+from web_api.schemas.task_result import TaskResultsQuery
+from web_api.dependencies.tasks import TaskFieldsGetDep
+from web_api.dependencies.tasks import TaskTextIterDep
+from web_api.dependencies.tasks import TaskTimingGetDep
+from web_api.dependencies.tasks import TasksGetDep
+from web_api.dependencies.tasks import TasksIterDep
+from web_api.dependencies.config import ConfigDep
+from web_api.dependencies.notifier import NotifierDep
+from web_api.dependencies.cache import ResultCacheDep
+from web_api.cache import CachedResult
+from web_api.notifier import FINAL_STATUSES
+from web_api.notifier import watch_results
 
 
 router = APIRouter(
@@ -14,7 +47,389 @@ router = APIRouter(
 )
 
 
-@router.get('/results/{task_id}')
+TASK_FIELDS = tuple(x for x in TaskResultResponse.model_fields if x != 'timings')
+
+FieldsQuery = Annotated[
+    list[str] | None,
+    Query(
+        description='Fields to return(comma-separated or repeated), all by '
+                    'default. `task_id` is always returned',
+        examples=['status,word_count'],
+    ),
+]
+
+
+def _parse_fields(fields: list[str] | None) -> list[str]:
+    if not fields:
+        return list(TASK_FIELDS)
+
+    names = [x.strip() for value in fields for x in value.split(',') if x.strip()]
+
+    if unknown := set(names).difference(TASK_FIELDS):
+        raise HTTPException(
+            status_code=422,
+            detail=f'Unknown fields: {sorted(unknown)}. Allowed: {list(TASK_FIELDS)}',
+        )
+
+    return list(dict.fromkeys(['task_id', *names]))
+
+
+def _result_json(task) -> str:
+    return TaskResultResponse.model_validate(task).model_dump_json(exclude_unset=True)
+
+
+def _stream_result_json(
+    result: TaskResultResponse,
+    task_id: UUID,
+    text_fields: list[str],
+    iter_text: Callable[..., Iterator[bytes]],
+) -> Iterator[bytes]:
+    """Appends the text fields to the JSON of `result`. The texts are read
+    from the DB and JSON-encoded in chunks, so the memory used does not
+    depend on the text size.
+    """
+    head = result.model_dump_json(exclude_unset=True).encode()
+    yield head[:-1]  # `task_id` is always set, so the object is not empty
+
+    for field in text_fields:
+        yield f',"{field}":"'.encode()
+        decoder = codecs.getincrementaldecoder('utf-8')()
+
+        with closing(iter_text(task_id, field)) as chunks:
+            for chunk in chunks:
+                yield orjson.dumps(decoder.decode(chunk))[1:-1]
+
+        yield orjson.dumps(decoder.decode(b'', final=True))[1:-1] + b'"'
+
+    yield b'}'
+
+
+def _validators(task_id: UUID, updated_at: datetime.datetime, variant: Any) -> dict[str, str]:
+    """Returns the `ETag` and `Last-Modified` headers of a result. The tag
+    changes with `updated_at` and the representation(fields, timings).
+    """
+    tag = hashlib.blake2b(
+        repr((task_id.hex, updated_at.isoformat(), variant)).encode(),
+        digest_size=12,
+    ).hexdigest()
+    return {
+        'ETag': f'"{tag}"',
+        'Last-Modified': format_datetime(
+            updated_at.replace(tzinfo=datetime.UTC), usegmt=True,
+        ),
+    }
+
+
+def _not_modified(
+    etag: str,
+    updated_at: datetime.datetime,
+    if_none_match: str | None,
+    if_modified_since: str | None,
+) -> bool:
+    if if_none_match is not None:
+        tags = [x.strip().removeprefix('W/') for x in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.UTC)
+
+        # `Last-Modified` has a resolution of seconds
+        return updated_at.replace(microsecond=0, tzinfo=datetime.UTC) <= since
+
+    return False
+
+
+def _parse_range(value: str, size: int) -> tuple[int, int] | None:
+    """Parses a single `bytes` range of the `Range` header. Returns the
+    `[start, end)` bytes or `None` if the header should be ignored.
+    """
+    unit, _, spec = value.partition('=')
+
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None  # Unsupported units and multiple ranges: the full text is sent
+
+    first, _, last = spec.strip().partition('-')
+
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            start = max(size - int(last), 0)
+            end = size if int(last) else 0
+    except ValueError:
+        return None
+
+    if start >= size or start >= end:
+        raise HTTPException(
+            status_code=416,
+            detail='Range not satisfiable',
+            headers={'Content-Range': f'bytes */{size}'},
+        )
+
+    return start, min(end, size)
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _stream_json_array(tasks: Iterator) -> Iterator[bytes]:
+    """Serializes the tasks to a JSON array as they are fetched. Runs in a
+    thread(sync iterator of `StreamingResponse`), items are sent in chunks.
+    """
+    buffer = bytearray(b'[')
+
+    try:
+        for i, task in enumerate(tasks):
+            if i:
+                buffer += b','
+
+            buffer += _result_json(task).encode()
+
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+    finally:
+        tasks.close()  # type: ignore[attr-defined]
+
+    buffer += b']'
+    yield bytes(buffer)
+
+
+def _query_results(
+    iter_tasks,
+    task_ids: list[UUID],
+    updated_since: datetime.datetime | None,
+    fields: list[str] | None,
+) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_json_array(
+            iter_tasks(
+                list(set(task_ids)),
+                updated_since,
+                _parse_fields(fields) if fields else None,
+            )
+        ),
+        media_type='application/json',
+    )
+
+
+_QUERY_RESPONSES = {
+    200: {
+        'description': 'JSON array of the found tasks(the fields of `/results/{task_id}`)',
+        'content': {
+            'application/json': {
+                'schema': {
+                    'type': 'array',
+                    'items': {'$ref': '#/components/schemas/TaskResultResponse'},
+                },
+            },
+        },
+    },
+}
+
+
+# Static routes are declared before `/results/{task_id}`.
+@router.post(
+    '/results/query',
+    response_class=StreamingResponse,
+    responses=_QUERY_RESPONSES,
+)
+async def query_results(
+    query: TaskResultsQuery,
+    iter_tasks: TasksIterDep,
+) -> StreamingResponse:
+    """Returns many tasks with one DB query. Unknown task ids are skipped.
+    With `updated_since`, only the tasks updated after it are returned, e.g.
+    to sync the statuses incrementally.
+    """
+    return _query_results(iter_tasks, query.task_ids, query.updated_since, query.fields)
+
+
+@router.get(
+    '/results',
+    response_class=StreamingResponse,
+    responses=_QUERY_RESPONSES,
+)
+async def get_results(
+    ids: Annotated[list[UUID], Query(description='Task ids')],
+    iter_tasks: TasksIterDep,
+    config: ConfigDep,
+    updated_since: Annotated[
+        datetime.datetime | None,
+        Query(description='Only the tasks updated after this time(UTC if no timezone)'),
+    ] = None,
+    fields: FieldsQuery = None,
+) -> StreamingResponse:
+    """The same as `POST /results/query`."""
+    if len(ids) > config.batch_max_items:
+        raise HTTPException(
+            status_code=422,
+            detail=f'At most {config.batch_max_items} task ids are allowed',
+        )
+
+    return _query_results(iter_tasks, ids, updated_since, fields)
+
+
+@router.get(
+    '/results/stream',
+    response_class=StreamingResponse,
+    responses={200: {'content': {'text/event-stream': {}}}},
+)
+async def stream_results(
+    ids: Annotated[
+        list[UUID],
+        Query(description='Task ids to wait for'),
+    ],
+    get_tasks: TasksGetDep,
+    notifier: NotifierDep,
+    config: ConfigDep,
+) -> StreamingResponse:
+    """Server-Sent Events stream: a `result` event is sent for each task when
+    it reaches a final status(`completed`, `failed_final`), then the stream
+    ends with an `end` event listing the tasks that are still pending.
+    """
+    task_ids = set(ids)
+
+    if len(task_ids) > config.batch_max_items:
+        raise HTTPException(
+            status_code=422,
+            detail=f'At most {config.batch_max_items} task ids are allowed',
+        )
+
+    async def events():
+        pending = set(task_ids)
+
+        async with aclosing(
+            watch_results(
+                task_ids,
+                get_tasks=get_tasks,
+                notifier=notifier,
+                timeout=config.results_stream_max_duration,
+                poll_interval=config.results_wait_poll_interval,
+            )
+        ) as results:
+            async for task in results:
+                if task is None:
+                    yield ': keep-alive\n\n'
+                    continue
+
+                pending.discard(task.task_id)
+                yield f'id: {task.task_id.hex}\nevent: result\ndata: {_result_json(task)}\n\n'
+
+        data = orjson.dumps({'pending': [x.hex for x in pending]}).decode()
+        yield f'event: end\ndata: {data}\n\n'
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.websocket('/results/ws')
+async def results_websocket(
+    websocket: WebSocket,
+    get_tasks: TasksGetDep,
+    notifier: NotifierDep,
+    config: ConfigDep,
+) -> None:
+    """The client sends `{"subscribe": [task_id, ..]}` messages, the server
+    sends the result of each subscribed task when it reaches a final status.
+    A socket can subscribe to at most `batch_max_items` tasks, the messages
+    exceeding it are rejected.
+    """
+    await websocket.accept()
+    queue: asyncio.Queue = asyncio.Queue()
+    pending: set[UUID] = set()
+    subscribed: set[UUID] = set()
+
+    async def receive() -> None:
+        while True:
+            try:
+                # `KeyError` for binary frames
+                message = orjson.loads(await websocket.receive_text())
+                task_ids = {UUID(x) for x in message['subscribe']}
+            except (orjson.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError):
+                await websocket.send_json(
+                    {'error': 'Expected {"subscribe": [task_id, ..]}'}
+                )
+                continue
+
+            task_ids -= subscribed
+
+            if len(subscribed) + len(task_ids) > config.batch_max_items:
+                await websocket.send_json(
+                    {'error': f'At most {config.batch_max_items} task ids are allowed'}
+                )
+                continue
+
+            subscribed.update(task_ids)
+            pending.update(task_ids)
+
+            if notifier:
+                notifier.add(queue, task_ids)
+
+            # The current status is checked as if an event was received.
+            for task_id in task_ids:
+                queue.put_nowait({'task_id': task_id.hex})
+
+    async def send() -> None:
+        while True:
+            try:
+                events = [
+                    await asyncio.wait_for(queue.get(), config.results_wait_poll_interval)
+                ]
+            except TimeoutError:
+                check = set(pending)
+            else:
+                while not queue.empty():
+                    events.append(queue.get_nowait())
+
+                check = {UUID(x['task_id']) for x in events} & pending
+
+            if not check:
+                continue
+
+            for task in await get_tasks(list(check)):
+                if task.status in FINAL_STATUSES and task.task_id in pending:
+                    pending.discard(task.task_id)
+                    await websocket.send_text(_result_json(task))
+
+    tasks = [asyncio.create_task(receive()), asyncio.create_task(send())]
+
+    try:
+        done, _ = await asyncio.wait(
+            tasks,
+            timeout=config.results_stream_max_duration,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+
+        for task in done:
+            if not isinstance(task.exception(), WebSocketDisconnect):
+                task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+        if notifier:
+            notifier.remove(queue, subscribed)
+
+    if not done:
+        await websocket.close(reason='Max duration reached')
+
+
+@router.get(
+    '/results/{task_id}',
+    response_model=TaskResultResponse,
+    response_model_exclude_unset=True,
+)
 async def process_text(
     task_id: Annotated[
         UUID,
@@ -24,11 +439,156 @@ async def process_text(
             examples=['8c8b4e08-34ac-41f9-8cad-44b9f938180a'],
         )
     ],
-    get_task: TaskGetDep,
-) -> Task:
-    task_result = await get_task(task_id)
+    get_task_fields: TaskFieldsGetDep,
+    iter_task_text: TaskTextIterDep,
+    get_task_timing: TaskTimingGetDep,
+    get_tasks: TasksGetDep,
+    notifier: NotifierDep,
+    results_cache: ResultCacheDep,
+    config: ConfigDep,
+    fields: FieldsQuery = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+    timings: Annotated[
+        bool,
+        Query(description='Include the processing timings of the task'),
+    ] = False,
+    wait: Annotated[
+        float,
+        Query(
+            ge=0,
+            description='Seconds to wait for a final status of the task'
+                        '(long polling), limited by the server',
+        ),
+    ] = 0,
+) -> Any:
+    """Only the requested `fields` are selected from the DB. Text fields
+    larger than `RESULTS_INLINE_TEXT_MAX` are streamed from the DB in chunks.
+    Results of tasks in a final status are immutable, so they are cached.
+    """
+    fields = _parse_fields(fields)
+    variant = (tuple(fields), timings)
+
+    if results_cache and (cached := results_cache.get((task_id, variant))):
+        headers = _validators(task_id, cached.updated_at, variant)
+
+        if _not_modified(cached.etag, cached.updated_at, if_none_match, if_modified_since):
+            return Response(status_code=304, headers=headers)
 
-    if task_result is None:
+        return Response(cached.body, media_type='application/json', headers=headers)
+
+    columns = list(dict.fromkeys([*fields, 'status', 'updated_at']))
+    text_max_size = config.results_inline_text_max
+    row = await get_task_fields(task_id, columns, text_max_size)
+
+    if row is None:
         raise HTTPException(status_code=404, detail='Task not found')
 
-    return task_result
+    if wait and row['status'] not in FINAL_STATUSES:
+        async with aclosing(
+            watch_results(
+                [task_id],
+                get_tasks=get_tasks,
+                notifier=notifier,
+                timeout=min(wait, config.results_max_wait),
+                poll_interval=config.results_wait_poll_interval,
+            )
+        ) as results:
+            async for task in results:
+                if task is not None:
+                    row = await get_task_fields(task_id, columns, text_max_size) or row
+                    break
+
+    updated_at = row['updated_at']
+    headers = _validators(task_id, updated_at, variant)
+
+    if _not_modified(headers['ETag'], updated_at, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    large_fields = [
+        x for x in fields
+        if x in TEXT_FIELDS and (row[f'{x}_size'] or 0) > text_max_size
+    ]
+    result = TaskResultResponse.model_validate(
+        {x: row[x] for x in fields if x not in large_fields}
+    )
+
+    if timings:
+        timing = await get_task_timing(task_id)
+        result.timings = timing and TaskTimingResponse.model_validate(timing)
+
+    if large_fields:
+        return StreamingResponse(
+            _stream_result_json(result, task_id, large_fields, iter_task_text),
+            media_type='application/json',
+            headers=headers,
+        )
+
+    body = result.model_dump_json(exclude_unset=True).encode()
+
+    if results_cache and row['status'] in FINAL_STATUSES:
+        results_cache.put(
+            (task_id, variant),
+            CachedResult(body=body, etag=headers['ETag'], updated_at=updated_at),
+        )
+
+    return Response(body, media_type='application/json', headers=headers)
+
+
+@router.get(
+    '/results/{task_id}/{field}',
+    response_class=StreamingResponse,
+    responses={
+        200: {'content': {'text/plain': {}}},
+        206: {'description': 'Partial Content', 'content': {'text/plain': {}}},
+        416: {'description': 'Range Not Satisfiable'},
+    },
+)
+async def get_result_text(
+    task_id: Annotated[
+        UUID,
+        Path(
+            title='Task Id',
+            description='UUID4 Task Id',
+            examples=['8c8b4e08-34ac-41f9-8cad-44b9f938180a'],
+        )
+    ],
+    field: Annotated[
+        Literal['original_text', 'processed_text'],
+        Path(title='Field', description='Text field'),
+    ],
+    get_task_fields: TaskFieldsGetDep,
+    iter_task_text: TaskTextIterDep,
+    range_: Annotated[
+        str | None,
+        Header(alias='Range', description='Single byte range, e.g. `bytes=0-1023`'),
+    ] = None,
+) -> StreamingResponse:
+    """Raw UTF-8 text streamed from the DB in chunks. Supports a single
+    byte range(`Range` header), offsets are in bytes of the UTF-8 text.
+    """
+    row = await get_task_fields(task_id, [field], text_max_size=0)
+
+    if row is None:
+        raise HTTPException(status_code=404, detail='Task not found')
+
+    size = row[f'{field}_size']
+
+    if size is None:
+        raise HTTPException(status_code=404, detail='Text not available')
+
+    headers = {'Accept-Ranges': 'bytes'}
+    byte_range = _parse_range(range_, size) if range_ else None
+    start, end = byte_range or (0, size)
+
+    if byte_range:
+        headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+
+    headers['Content-Length'] = str(end - start)
+
+    return StreamingResponse(
+        iter_task_text(task_id, field, start, end),
+        status_code=206 if byte_range else 200,
+        media_type='text/plain; charset=utf-8',
+        headers=headers,
+    )
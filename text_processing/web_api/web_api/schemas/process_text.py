@@ -1,14 +1,32 @@
+import datetime
+from enum import StrEnum
+from typing import Any
+from uuid import UUID
+
 from pydantic import Field
+from pydantic import field_serializer
 from pydantic import field_validator
 from pydantic import model_validator
 
 from shared.config import web_api_config
 
+from .base_schema import BaseModel
 from .base_schema import TaskIdMixin
 from .base_schema import TextTypeMixin
 from .base_schema import TextTypeEnum
 
 
+def text_max_length(type_: TextTypeEnum) -> int:
+    """Max length(characters) of a text of the type."""
+    match type_:
+        case TextTypeEnum.chat_item:
+            return 300
+        case TextTypeEnum.summary:
+            return 3_000
+        case TextTypeEnum.article:
+            return web_api_config.article_max_length
+
+
 class ProcessTextRequest(TaskIdMixin, TextTypeMixin):
     text: str = Field(
         min_length=1,
@@ -20,7 +38,7 @@ class ProcessTextRequest(TaskIdMixin, TextTypeMixin):
 
     @field_validator('text')
     def validate_non_empty(cls, value):
-        if value.strip():
+        if not value.isspace():  # No copy of the text, unlike `strip()`
             return value
         else:
             raise ValueError(
@@ -34,17 +52,17 @@ class ProcessTextRequest(TaskIdMixin, TextTypeMixin):
 
         match type_:
             case TextTypeEnum.chat_item:
-                if len(text) > 300:
+                if len(text) > text_max_length(type_):
                     raise ValueError(
                         'For "chat_item", the text must be at most 300 characters long'
                     )
             case TextTypeEnum.summary:
-                if len(text) > 3_000:
+                if len(text) > text_max_length(type_):
                     raise ValueError(
                         'For "summary", the text must be at most 3000 characters long'
                     )
             case TextTypeEnum.article:
-                if not (300_000 <= len(text) <= web_api_config.article_max_length):
+                if not (300_000 <= len(text) <= text_max_length(type_)):
                     raise ValueError(
                         'For "article," the text length must be at least 300,000 '
                         f'characters but not exceed {web_api_config.article_max_length}'
@@ -54,4 +72,35 @@ class ProcessTextRequest(TaskIdMixin, TextTypeMixin):
 
 
 class ProcessTextResponse(TaskIdMixin):
-    pass
+    estimated_completion_time: datetime.datetime | None = Field(
+        default=None,
+        title='Estimated completion time',
+        description='When the task is expected to be taken from the queue, '
+                    'based on the queue depth and the processing throughput. '
+                    'Absent if unknown',
+    )
+
+
+class BatchItemStatusEnum(StrEnum):
+    created = 'created'
+    exists = 'exists'
+    invalid = 'invalid'
+    error = 'error'
+
+
+class ProcessTextBatchItemResponse(BaseModel):
+    task_id: UUID | None = Field(
+        default=None,
+        title='Task Id',
+        description='UUID4 Task Id, absent for invalid items without a valid one',
+    )
+    status: BatchItemStatusEnum = Field(title='Status', description='Item status')
+    detail: Any = Field(
+        default=None,
+        title='Detail',
+        description='Validation errors or the cause of the error',
+    )
+
+    @field_serializer('task_id', when_used='json')
+    def serialize_uuid_as_hex(self, task_id: UUID | None) -> str | None:
+        return task_id and task_id.hex
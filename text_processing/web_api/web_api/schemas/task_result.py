@@ -0,0 +1,64 @@
+import datetime
+from uuid import UUID
+from typing import Any
+
+from pydantic import ConfigDict
+from pydantic import Field
+
+from shared.config import web_api_config
+
+from shared.db.models.tasks import TaskStatus
+from shared.db.models.tasks import TextTypeEnum
+
+from .base_schema import BaseModel
+
+
+class TaskTimingResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    published_at: datetime.datetime | None = None
+    received_at: datetime.datetime | None = None
+    started_at: datetime.datetime | None = None
+    queue_wait: float | None = None
+    executor_wait: float | None = None
+    wall: float | None = None
+    cpu: float | None = None
+    db_wall: float | None = None
+    peak_rss_delta: int | None = None
+    stages: dict[str, Any] | None = None
+
+
+class TaskResultResponse(BaseModel):
+    """`Task` fields. Only the fields that were set are returned."""
+    model_config = ConfigDict(from_attributes=True)
+
+    task_id: UUID | None = None
+    original_text: str | None = None
+    processed_text: str | None = None
+    word_count: int | None = None
+    language: str | None = None
+    status: TaskStatus | None = None
+    type: TextTypeEnum | None = None
+    cause: str | None = None
+    created_at: datetime.datetime | None = None
+    updated_at: datetime.datetime | None = None
+    timings: TaskTimingResponse | None = None
+
+
+class TaskResultsQuery(BaseModel):
+    task_ids: list[UUID] = Field(
+        min_length=1,
+        max_length=web_api_config.batch_max_items,
+        title='Task Ids',
+        description='Ids of the tasks to return',
+    )
+    updated_since: datetime.datetime | None = Field(
+        default=None,
+        title='Updated since',
+        description='Only the tasks updated after this time(UTC if no timezone)',
+    )
+    fields: list[str] | None = Field(
+        default=None,
+        title='Fields',
+        description='Fields to return, all by default. `task_id` is always returned',
+    )
@@ -0,0 +1,337 @@
+import time
+import signal
+import asyncio
+import logging
+import threading
+from functools import partial
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from multiprocessing.context import SpawnProcess
+
+import orjson
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Gauge
+from shared.metrics import MetricsServer
+from shared.metrics import CONTENT_TYPE
+from shared.metrics import default_registry
+
+
+WORKERS_READY = Gauge(
+    'web_api_workers_ready',
+    'Worker processes serving requests',
+)
+WORKER_RESTARTS = Counter(
+    'web_api_worker_restarts',
+    'Worker processes replaced by reason(crash, rolling)',
+    ['reason'],
+)
+
+STALE_REPORTS = 3  # A worker is unhealthy after this number of missed reports
+
+
+def _send(conn: Connection, lock: threading.Lock, kind: str) -> None:
+    try:
+        with lock:
+            conn.send((kind, default_registry.collect()))
+    except (OSError, ValueError):
+        pass  # The supervisor is gone
+
+
+def _report(
+    server: uvicorn.Server,
+    conn: Connection,
+    lock: threading.Lock,
+    interval: float,
+    stop: threading.Event,
+) -> None:
+    while not server.started:
+        if stop.wait(0.1):
+            return
+
+    _send(conn, lock, 'ready')
+
+    while not stop.wait(interval):
+        _send(conn, lock, 'metrics')
+
+
+def run_worker(
+    config: uvicorn.Config,
+    conn: Connection,
+    report_interval: float,
+    sockets: list,
+) -> None:
+    """Runs the server in a worker process. The metrics are sent to the
+    supervisor from a thread: once the server is started(`ready`), every
+    `report_interval` and on exit.
+    """
+    server = uvicorn.Server(config)
+    lock = threading.Lock()
+    stop = threading.Event()
+    reporter = threading.Thread(
+        target=_report,
+        args=(server, conn, lock, report_interval, stop),
+        daemon=True,
+    )
+    reporter.start()
+
+    try:
+        server.run(sockets=sockets)
+    finally:
+        stop.set()
+        reporter.join()
+        _send(conn, lock, 'metrics')
+        conn.close()
+
+
+class _Worker:
+    def __init__(self, process: SpawnProcess, conn: Connection) -> None:
+        self.process = process
+        self.conn = conn
+        self.started_at = time.monotonic()
+        self.reported_at: float | None = None
+        self.ready = asyncio.Event()
+        self.snapshot: dict = {}
+        self.stopping = False
+
+
+class Supervisor:
+    """Runs `workers_num` server processes accepting connections on one
+    socket bound by the supervisor. Each worker imports the app, so it has
+    its own producer connection, DB engine and caches.
+
+    - A worker that exits unexpectedly is replaced.
+    - `SIGHUP` restarts the workers one by one: a new worker is started and
+      the old one is stopped(gracefully) only when the new one is ready, so
+      the capacity does not drop.
+    - `SIGINT`, `SIGTERM` stop the workers gracefully.
+
+    The metrics of the workers(see `Registry.collect`) are aggregated and
+    served with the health of the workers on `metrics_host:metrics_port`.
+    The counters of replaced workers are kept.
+    """
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers_num: int,
+        start_timeout: float,
+        report_interval: float,
+        metrics_host: str,
+        metrics_port: int,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._config = config
+        self._workers_num = workers_num
+        self._start_timeout = start_timeout
+        self._report_interval = report_interval
+        self._metrics_host = metrics_host
+        self._metrics_port = metrics_port
+        self._sockets: list = []
+        self._workers: list[_Worker] = []
+        self._retired: dict = {}  # Counters and histograms of stopped workers
+        self._stopping: asyncio.Event | None = None
+        self._restart: asyncio.Task | None = None
+        WORKERS_READY.set_function(
+            lambda: sum(x.ready.is_set() and not x.stopping for x in self._workers)
+        )
+
+    def run(self) -> None:
+        asyncio.run(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._sockets = [self._config.bind_socket()]
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopping.set)
+
+        loop.add_signal_handler(signal.SIGHUP, self._on_hup)
+        metrics_server = MetricsServer(host=self._metrics_host, port=self._metrics_port)
+        metrics_server.add_handler('/metrics', self._metrics)
+        metrics_server.add_handler('/health', self._health)
+
+        async with metrics_server:
+            for _ in range(self._workers_num):
+                self._spawn()
+
+            self._log.info('Started %s workers', self._workers_num)
+
+            while True:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), 1.)
+                    break
+                except TimeoutError:
+                    await self._replace_dead()
+
+            if self._restart:
+                self._restart.cancel()
+
+            await asyncio.gather(*(self._stop_worker(x) for x in list(self._workers)))
+
+        for sock in self._sockets:
+            sock.close()
+
+        self._log.info('Stopped')
+
+    def _spawn(self) -> _Worker:
+        reader, writer = Pipe(duplex=False)
+        process = get_subprocess(
+            self._config,
+            partial(run_worker, self._config, writer, self._report_interval),
+            self._sockets,
+        )
+        process.start()
+        writer.close()
+        worker = _Worker(process, reader)
+        self._workers.append(worker)
+        asyncio.get_running_loop().add_reader(reader.fileno(), self._receive, worker)
+        self._log.info('Started worker %s', process.pid)
+        return worker
+
+    def _receive(self, worker: _Worker) -> None:
+        try:
+            kind, snapshot = worker.conn.recv()
+        except (EOFError, OSError):
+            # The worker exited
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            worker.conn.close()
+            return
+
+        worker.snapshot = snapshot
+        worker.reported_at = time.monotonic()
+
+        if kind == 'ready':
+            worker.ready.set()
+
+    def _retire(self, worker: _Worker) -> None:
+        # The last report is read, if it was not received yet.
+        while not worker.conn.closed and worker.conn.poll():
+            self._receive(worker)
+
+        if not worker.conn.closed:
+            asyncio.get_running_loop().remove_reader(worker.conn.fileno())
+            worker.conn.close()
+
+        counters = {
+            k: v for k, v in worker.snapshot.items()
+            if not isinstance(default_registry.get(k), Gauge)
+        }
+        self._retired = default_registry.aggregate([self._retired, counters])
+        self._workers.remove(worker)
+
+    async def _replace_dead(self) -> None:
+        for worker in list(self._workers):
+            if worker.stopping or worker.process.is_alive():
+                continue
+
+            self._log.error(
+                'Worker %s exited with code %s',
+                worker.process.pid, worker.process.exitcode,
+            )
+            self._retire(worker)
+
+            if not self._stopping.is_set():  # type: ignore[union-attr]
+                WORKER_RESTARTS.labels('crash').inc()
+                self._spawn()
+
+    async def _stop_worker(self, worker: _Worker) -> None:
+        worker.stopping = True
+        worker.process.terminate()  # SIGTERM: uvicorn finishes the pending requests
+        await asyncio.get_running_loop().run_in_executor(
+            None, worker.process.join, self._config.timeout_graceful_shutdown or None,
+        )
+
+        if worker.process.is_alive():
+            self._log.warning('Worker %s did not stop in time, killing', worker.process.pid)
+            worker.process.kill()
+            await asyncio.get_running_loop().run_in_executor(None, worker.process.join)
+
+        self._retire(worker)
+        self._log.info('Stopped worker %s', worker.process.pid)
+
+    def _on_hup(self) -> None:
+        if self._restart and not self._restart.done():
+            self._log.warning('Rolling restart is already in progress')
+            return
+
+        self._restart = asyncio.create_task(self._rolling_restart())
+
+    async def _rolling_restart(self) -> None:
+        self._log.info('Rolling restart of %s workers', len(self._workers))
+
+        for old in list(self._workers):
+            if old.stopping or old not in self._workers:
+                continue
+
+            new = self._spawn()
+
+            try:
+                await asyncio.wait_for(new.ready.wait(), self._start_timeout)
+            except TimeoutError:
+                self._log.error(
+                    'Worker %s did not start in %s seconds, the restart is aborted',
+                    new.process.pid, self._start_timeout,
+                )
+                await self._stop_worker(new)
+                return
+
+            await self._stop_worker(old)
+            WORKER_RESTARTS.labels('rolling').inc()
+
+        self._log.info('Rolling restart is completed')
+
+    def _is_healthy(self, worker: _Worker, now: float) -> bool:
+        return (
+            worker.ready.is_set()
+            and not worker.stopping
+            and worker.process.is_alive()
+            and now - (worker.reported_at or 0.) < self._report_interval * STALE_REPORTS
+        )
+
+    async def _metrics(self, query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+        snapshot = default_registry.aggregate([
+            default_registry.collect(),
+            self._retired,
+            *(x.snapshot for x in self._workers),
+        ])
+        return 200, CONTENT_TYPE, default_registry.render(snapshot).encode()
+
+    async def _health(self, query: dict[str, list[str]]) -> tuple[int, str, bytes]:
+        """`ok` if all workers are healthy, `degraded` if some are, `503`
+        if none is.
+        """
+        now = time.monotonic()
+        workers = [
+            {
+                'pid': x.process.pid,
+                'healthy': self._is_healthy(x, now),
+                'ready': x.ready.is_set(),
+                'stopping': x.stopping,
+                'uptime': round(now - x.started_at, 3),
+                'last_report_age': (
+                    None if x.reported_at is None else round(now - x.reported_at, 3)
+                ),
+            }
+            for x in self._workers
+        ]
+        healthy = sum(x['healthy'] for x in workers)
+
+        if healthy >= self._workers_num:
+            status, code = 'ok', 200
+        elif healthy:
+            status, code = 'degraded', 200
+        else:
+            status, code = 'down', 503
+
+        body = {
+            'status': status,
+            'workers_num': self._workers_num,
+            'workers_healthy': healthy,
+            'workers': workers,
+        }
+        return code, 'application/json', orjson.dumps(body)
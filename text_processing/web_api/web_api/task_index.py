@@ -0,0 +1,171 @@
+import os
+import math
+import asyncio
+import hashlib
+import logging
+import threading
+from uuid import UUID
+from typing import Iterable
+
+from shared.logging import get_app_logger
+from shared.metrics import Counter
+from shared.metrics import Gauge
+from shared.db.core import Session
+from shared.db.models import Task
+
+
+TASK_INDEX_LOOKUPS = Counter(
+    'task_index_lookups',
+    'Lookups of task ids in the index by result(absent, maybe)',
+    ['result'],
+)
+TASK_INDEX_FALSE_POSITIVES = Counter(
+    'task_index_false_positives',
+    'Task ids reported by the index as maybe existing, but absent in the DB',
+)
+TASK_INDEX_SIZE = Gauge(
+    'task_index_size_bytes',
+    'Size of the bit arrays of the task id index',
+)
+TASK_INDEX_ITEMS = Gauge(
+    'task_index_items',
+    'Task ids added to the index',
+    multiprocess_mode='max',
+)
+
+GROWTH = 2  # Capacity ratio of the next filter of `TaskIndex`
+TIGHTENING = 0.5  # Error rate ratio of the next filter of `TaskIndex`
+
+
+class BloomFilter:
+    """Bloom filter of a fixed capacity. The bit positions are derived from
+    one keyed `blake2b` digest(double hashing), so client-chosen ids cannot
+    be crafted to collide.
+    """
+    def __init__(self, capacity: int, error_rate: float, key: bytes) -> None:
+        self.capacity = capacity
+        self.count = 0
+        self._size = max(
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8,
+        )
+        self._hashes = max(round(self._size / capacity * math.log(2)), 1)
+        self._bits = bytearray(math.ceil(self._size / 8))
+        self._key = key
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+    def _positions(self, item: bytes) -> Iterable[int]:
+        digest = hashlib.blake2b(item, digest_size=16, key=self._key).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self._size
+        return ((h1 + i * h2) % size for i in range(self._hashes))
+
+    def add(self, item: bytes) -> None:
+        bits = self._bits
+
+        for pos in self._positions(item):
+            bits[pos >> 3] |= 1 << (pos & 7)
+
+        self.count += 1
+
+    def __contains__(self, item: bytes) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TaskIndex:
+    """Probabilistic set of the existing task ids, so the existence check
+    of a new(e.g. freshly generated) task id does not query the DB. A
+    negative answer is definite, a positive one must be checked in the DB.
+
+    A scalable Bloom filter: once the last filter is full, a filter with
+    `GROWTH` times the capacity and `TIGHTENING` times the error rate is
+    added, so the overall error rate stays bounded by about
+    `error_rate / (1 - TIGHTENING)`.
+
+    Until seeded from the DB(see `seed`), every id is reported as maybe
+    existing. The ids of tasks created by other processes are only known
+    after a restart, so duplicates are still rejected by the DB on insert
+    (`AlreadyExistsError`). Ids are only added, never removed.
+    """
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float,
+        logger: logging.Logger | None=None,
+    ) -> None:
+        self._log = logger or get_app_logger()
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._key = os.urandom(16)
+        self._filters: list[BloomFilter] = []
+        # Ids are added from the event loop and from the seeding thread.
+        self._lock = threading.Lock()
+        self.ready = False
+        self._absent = TASK_INDEX_LOOKUPS.labels('absent')
+        self._maybe = TASK_INDEX_LOOKUPS.labels('maybe')
+        TASK_INDEX_SIZE.set_function(lambda: sum(x.nbytes for x in self._filters))
+        TASK_INDEX_ITEMS.set_function(lambda: sum(x.count for x in self._filters))
+
+    def _new_filter(self, capacity: int) -> BloomFilter:
+        error_rate = self._error_rate * TIGHTENING ** len(self._filters)
+        res = BloomFilter(capacity, error_rate, self._key)
+        self._filters.append(res)
+        return res
+
+    def add(self, task_id: UUID) -> None:
+        with self._lock:
+            last = self._filters[-1] if self._filters else None
+
+            if last is None:
+                last = self._new_filter(self._capacity)
+            elif last.count >= last.capacity:
+                last = self._new_filter(last.capacity * GROWTH)
+
+            last.add(task_id.bytes)
+
+    def add_many(self, task_ids: Iterable[UUID]) -> None:
+        for task_id in task_ids:
+            self.add(task_id)
+
+    def might_contain(self, task_id: UUID) -> bool:
+        if not self.ready:
+            return True
+
+        item = task_id.bytes
+        res = any(item in x for x in self._filters)
+        (self._maybe if res else self._absent).inc()
+        return res
+
+    def false_positive(self, count: int=1) -> None:
+        """Records ids reported as maybe existing, but absent in the DB."""
+        TASK_INDEX_FALSE_POSITIVES.inc(count)
+
+    def _seed(self) -> int:
+        with Session() as session:
+            count = Task.count(session)
+
+            with self._lock:
+                if not self._filters:
+                    # Sized for the existing tasks and as many new ones
+                    self._new_filter(max(self._capacity, count * GROWTH))
+
+            self.add_many(Task.iter_ids(session))
+
+        return count
+
+    async def seed(self) -> None:
+        """Adds the ids of all tasks in the DB, in a thread. The ids added
+        meanwhile are kept, so the index is consistent once it is ready.
+        """
+        try:
+            count = await asyncio.get_running_loop().run_in_executor(None, self._seed)
+        except Exception as exc:
+            self._log.error('Unable to seed the task index: %r', exc)
+            return
+
+        self.ready = True
+        self._log.info('Task index seeded with %s tasks', count)